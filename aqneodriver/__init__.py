@@ -2,4 +2,13 @@ from ._version import __version__
 from .config import get_config
 from .driver import AquariumETLDriver
 
-__all__ = ["__version__", "get_config", "AquariumETLDriver"]
+__all__ = ["__version__", "get_config", "AquariumETLDriver", "AsyncAquariumETLDriver"]
+
+
+def __getattr__(name):
+    # the async client is only imported when it is used
+    if name == "AsyncAquariumETLDriver":
+        from .async_driver import AsyncAquariumETLDriver
+
+        return AsyncAquariumETLDriver
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,460 @@
+"""Asyncio driver for Neo4j.
+
+Writing to Neo4j is I/O bound, so a single process running many
+concurrent transactions on the async Neo4j client can keep the database
+busy without the fork and serialization costs of the process pool.
+
+.. code-block::
+
+    with driver.pool(32, mode="async") as pool:
+        pool.write(payloads)
+"""
+import asyncio
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import TypeVar
+from typing import Union
+
+from neo4j import AsyncGraphDatabase
+
+from .driver import _dispatch_batch_errors
+from .driver import AquariumETLDriver
+from .driver import PooledAquariumETLDriver
+from .loggers import logger
+from .payload import Payload
+from .payload import payload_nbytes
+from .types import FormatData
+from .utils.batching import iter_batches
+
+T = TypeVar("T")
+S = TypeVar("S")
+
+
+async def aiter_apply(
+    fun: Callable[..., Awaitable[S]],
+    args: Iterable[Tuple[Any, ...]],
+    max_in_flight: int,
+    ordered: bool = True,
+    error_callback: Optional[Callable[[Exception], None]] = None,
+) -> AsyncIterator[Tuple[int, S]]:
+    """Lazily apply a coroutine function to an iterable of arguments, with at
+    most `max_in_flight` coroutines running at once.
+
+    This is the asyncio counterpart of
+    :func:`iter_apply_async_map <aqneodriver.driver.iter_apply_async_map>`
+    and has the same ordering and error semantics. The arguments are pulled
+    in the default executor of the loop, so that a slow generator (e.g.
+    fetching pages from Aquarium) does not block the running coroutines.
+
+    :return: async iterator of `(idx, result)`
+    """
+    max_in_flight = max(max_in_flight, 1)
+    loop = asyncio.get_event_loop()
+    args = enumerate(args)
+    exhausted = False
+    pending = {}
+    next_idx = 0
+    buffer = {}
+
+    while True:
+        # results completed out of order count as in flight until yielded
+        while not exhausted and len(pending) + len(buffer) < max_in_flight:
+            item = await loop.run_in_executor(None, next, args, None)
+            if item is None:
+                exhausted = True
+                break
+            idx, arg = item
+            pending[asyncio.ensure_future(fun(*arg))] = idx
+        if not pending:
+            break
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            idx = pending.pop(future)
+            e = future.exception()
+            if e is not None:
+                if error_callback:
+                    error_callback(e)
+                else:
+                    for other in pending:
+                        other.cancel()
+                    raise e
+                result = (False, e)
+            else:
+                result = (True, future.result())
+            if not ordered:
+                if result[0]:
+                    yield idx, result[1]
+            else:
+                buffer[idx] = result
+        while next_idx in buffer:
+            ok, result = buffer.pop(next_idx)
+            if ok:
+                yield next_idx, result
+            next_idx += 1
+
+
+async def _read(
+    etl: "AsyncAquariumETLDriver",
+    query: Union[str, Payload],
+    data: Dict[str, FormatData],
+):
+    return await etl.read(query, data)
+
+
+async def _write(
+    etl: "AsyncAquariumETLDriver",
+    query: Union[str, Payload],
+    data: Dict[str, FormatData],
+):
+    return await etl.write(query, data)
+
+
+async def _write_batch(
+    etl: "AsyncAquariumETLDriver", queries: List[Payload], split_on_error: bool = True
+) -> List[T]:
+    """Async counterpart of :func:`aqneodriver.driver._write_batch`."""
+    try:
+        return await etl.write_many(queries)
+    except Exception as e:
+        if not split_on_error or len(queries) == 1:
+            raise e
+        logger.info(
+            "batch of {} payloads failed ({}). Retrying payloads individually.".format(
+                len(queries), e.__class__.__name__
+            )
+        )
+    results = []
+    for query in queries:
+        try:
+            results.append(await etl.write(query))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+class AsyncAquariumETLDriver:
+    """Driver for connecting with Neo4j using asyncio.
+
+    .. code-block::
+
+        etl = AsyncAquariumETLDriver(uri, user, password, concurrency=32)
+        async for result in etl.iter_write(payloads):
+            ...
+        await etl.close()
+    """
+
+    DEFAULT_CONCURRENCY = 16
+
+    def __init__(self, uri, user, password, concurrency: int = DEFAULT_CONCURRENCY):
+        """Initialize async ETL session.
+
+        :param uri:
+        :param user:
+        :param password:
+        :param concurrency: max number of concurrent transactions
+        """
+        self.driver = AsyncGraphDatabase.driver(uri, auth=(user, password))
+        self.concurrency = concurrency
+
+    async def close(self):
+        """Close the driver."""
+        await self.driver.close()
+
+    async def _run_tx(self, access_mode: str, transaction, **data) -> Any:
+        async with self.driver.session() as sess:
+            if access_mode == "write":
+                return await sess.execute_write(transaction, **data)
+            return await sess.execute_read(transaction, **data)
+
+    async def _do_tx(
+        self,
+        query: Union[str, Payload],
+        access_mode: str,
+        data: Optional[Dict[str, FormatData]] = None,
+    ) -> Any:
+        query, data = AquariumETLDriver._query_and_data(query, data)
+
+        async def transaction(tx, **tx_data):
+            r = await tx.run(query, **tx_data)
+            return await r.values()
+
+        return await self._run_tx(access_mode, transaction, **data)
+
+    async def write(
+        self,
+        query: Union[str, Payload],
+        data: Optional[Dict[str, FormatData]] = None,
+    ) -> T:
+        """Submit a 'write' query to the Neo4j database.
+
+        :param query:
+        :param data:
+        :return:
+        """
+        return await self._do_tx(query, "write", data)
+
+    async def read(
+        self,
+        query: Union[str, Payload],
+        data: Optional[Dict[str, FormatData]] = None,
+    ) -> T:
+        """Submit a 'read' query to the Neo4j database.
+
+        :param query:
+        :param data:
+        :return:
+        """
+        return await self._do_tx(query, "read", data)
+
+    async def write_many(self, queries: Sequence[Union[str, Payload]]) -> List[T]:
+        """Submit several 'write' queries in a single transaction.
+
+        See :meth:`AquariumETLDriver.write_many
+        <aqneodriver.driver.AquariumETLDriver.write_many>`.
+        """
+        queries = [AquariumETLDriver._query_and_data(q) for q in queries]
+
+        async def transaction(tx):
+            results = []
+            for q, d in queries:
+                r = await tx.run(q, **d)
+                results.append(await r.values())
+            return results
+
+        return await self._run_tx("write", transaction)
+
+    def imap(
+        self,
+        func: Callable[..., Awaitable[S]],
+        args: Iterable[Tuple[Any, ...]],
+        *,
+        max_in_flight: Optional[int] = None,
+        ordered: bool = True,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> AsyncIterator[S]:
+        """Lazily apply `func(self, *arg)` to each argument tuple with bounded
+        concurrency (:attr:`concurrency` by default).
+
+        :return: async iterator of results
+        """
+
+        async def bound(*arg):
+            return await func(self, *arg)
+
+        async def results():
+            async for _, result in aiter_apply(
+                bound,
+                args,
+                max_in_flight or self.concurrency,
+                ordered=ordered,
+                error_callback=error_callback,
+            ):
+                yield result
+
+        return results()
+
+    def iter_read(
+        self,
+        queries: Iterable[Union[Payload, Tuple[str, Dict]]],
+        **kwargs,
+    ) -> AsyncIterator[S]:
+        """Lazily read payloads with bounded concurrency."""
+        return self.imap(_read, queries, **kwargs)
+
+    def iter_write(
+        self,
+        queries: Iterable[Union[Payload, Tuple[str, Dict]]],
+        *,
+        batch_size: int = 1,
+        batch_bytes: Optional[int] = None,
+        split_on_error: bool = True,
+        **kwargs,
+    ) -> AsyncIterator[S]:
+        """Lazily write payloads with bounded concurrency.
+
+        See :meth:`PooledAquariumETLDriver.iter_write
+        <aqneodriver.driver.PooledAquariumETLDriver.iter_write>`.
+        """
+        if batch_size > 1 or batch_bytes is not None:
+            batches = (
+                (batch, split_on_error)
+                for batch in iter_batches(
+                    queries, batch_size, max_bytes=batch_bytes, sizeof=payload_nbytes
+                )
+            )
+            batch_results = self.imap(_write_batch, batches, **kwargs)
+            error_callback = kwargs.get("error_callback")
+
+            async def results():
+                async for batch_result in batch_results:
+                    for result in _dispatch_batch_errors(batch_result, error_callback):
+                        yield result
+
+            return results()
+        return self.imap(_write, queries, **kwargs)
+
+
+class AsyncPooledAquariumETLDriver:
+    """Runs the :class:`PooledAquariumETLDriver
+    <aqneodriver.driver.PooledAquariumETLDriver>` interface on a single
+    :class:`AsyncAquariumETLDriver` and event loop, with `n` concurrent
+    transactions instead of `n` processes.
+
+    Typically instantiated from an :class:`AquariumETLDriver` instance:
+
+    .. code-block::
+
+        with driver.pool(32, mode="async") as pool:
+            pool.write(payloads)
+    """
+
+    def __init__(self, n, binder: AquariumETLDriver):
+        self.binder = binder
+        self.n = n or AsyncAquariumETLDriver.DEFAULT_CONCURRENCY
+        self.etl: Optional[AsyncAquariumETLDriver] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.etl is not None
+
+    def open(self) -> "AsyncPooledAquariumETLDriver":
+        if self.etl is None:
+            self._loop = asyncio.new_event_loop()
+            self.etl = AsyncAquariumETLDriver(
+                *self.binder._credentials(), concurrency=self.n
+            )
+        return self
+
+    def close(self):
+        if self.etl is not None:
+            etl, self.etl = self.etl, None
+            loop, self._loop = self._loop, None
+            loop.run_until_complete(etl.close())
+            loop.close()
+
+    terminate = close
+
+    def __enter__(self) -> "AsyncPooledAquariumETLDriver":
+        return self.open()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _iter_sync(
+        self,
+        make_results: Callable[[AsyncAquariumETLDriver], AsyncIterator[S]],
+        callback: Optional[Callable[[S], None]] = None,
+    ) -> Iterator[S]:
+        if not self.is_open:
+            with self:
+                yield from self._iter_sync(make_results, callback)
+            return
+        results = make_results(self.etl)
+        while True:
+            try:
+                result = self._loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                break
+            if callback:
+                callback(result)
+            yield result
+
+    def imap(
+        self,
+        func: Callable[..., Awaitable[S]],
+        args: Iterable[Tuple[Any, ...]],
+        *,
+        chunksize: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        ordered: bool = True,
+        callback: Optional[Callable[[S], None]] = None,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> Iterator[S]:
+        """Lazily apply an async function `func(etl, *arg)`. `chunksize` is
+        accepted for compatibility and ignored."""
+        return self._iter_sync(
+            lambda etl: etl.imap(
+                func,
+                args,
+                max_in_flight=max_in_flight,
+                ordered=ordered,
+                error_callback=error_callback,
+            ),
+            callback,
+        )
+
+    def __call__(
+        self,
+        func: Callable[..., Awaitable[S]],
+        args: Iterable[Tuple[Any, ...]],
+        chunksize: Optional[int] = None,
+        callback: Optional[Callable[[S], None]] = None,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> List[S]:
+        return list(
+            self.imap(func, args, callback=callback, error_callback=error_callback)
+        )
+
+    def iter_read(
+        self,
+        queries: Iterable[Union[Payload, Tuple[str, Dict]]],
+        *,
+        chunksize: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        ordered: bool = True,
+        callback: Optional[Callable[[S], None]] = None,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> Iterator[S]:
+        return self.imap(
+            _read,
+            map(PooledAquariumETLDriver._validate_query, queries),
+            max_in_flight=max_in_flight,
+            ordered=ordered,
+            callback=callback,
+            error_callback=error_callback,
+        )
+
+    def read(self, queries, **kwargs) -> List[S]:
+        PooledAquariumETLDriver._validate_queries(queries)
+        return list(self.iter_read(queries, **kwargs))
+
+    def iter_write(
+        self,
+        queries: Iterable[Union[Payload, Tuple[str, Dict]]],
+        *,
+        chunksize: Optional[int] = None,
+        batch_size: int = 1,
+        batch_bytes: Optional[int] = None,
+        split_on_error: bool = True,
+        max_in_flight: Optional[int] = None,
+        ordered: bool = True,
+        callback: Optional[Callable[[S], None]] = None,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> Iterator[S]:
+        queries = map(PooledAquariumETLDriver._validate_query, queries)
+        return self._iter_sync(
+            lambda etl: etl.iter_write(
+                queries,
+                batch_size=batch_size,
+                batch_bytes=batch_bytes,
+                split_on_error=split_on_error,
+                max_in_flight=max_in_flight,
+                ordered=ordered,
+                error_callback=error_callback,
+            ),
+            callback,
+        )
+
+    def write(self, queries, **kwargs) -> List[S]:
+        PooledAquariumETLDriver._validate_queries(queries)
+        return list(self.iter_write(queries, **kwargs))
@@ -1,15 +1,36 @@
+import hashlib
+import re
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
 from pydent import ModelBase
 from pydent import ModelRegistry
+from pydent.relationships import HasMany
+from pydent.relationships import HasManyGeneric
+from pydent.relationships import HasOne
+
+#: label of the node recording the schema version applied to the graph
+SCHEMA_LABEL = "_AqneodriverSchema"
+
+
+def _constraint_name(model: ModelBase, pk: str) -> str:
+    return "{server_name}_{pk}_primary_key".format(
+        server_name=model.get_tableized_name(), pk=pk
+    )
 
 
 def _create_primary_key_constraint(model: ModelBase, pk: str) -> str:
     model: ModelBase
     model_name = model.get_server_model_name()
-    server_name = model.get_tableized_name()
     return (
-        "CREATE CONSTRAINT {server_name}_{pk}_primary_key "
+        "CREATE CONSTRAINT {name} "
         "ON (node:{model_name}) ASSERT node.{pk} IS UNIQUE".format(
-            server_name=server_name, model_name=model_name, pk=pk
+            name=_constraint_name(model, pk), model_name=model_name, pk=pk
         )
     )
 
@@ -17,11 +38,153 @@ def _create_primary_key_constraint(model: ModelBase, pk: str) -> str:
 # CREATE CONSTRAINT ON (r:owns) ASSERT r.TIMESTAMP IS UNIQUE
 
 
-def iter_constraints():
-    """Iterate through model constraints for the neo driver."""
+def iter_named_constraints() -> Iterator[Tuple[str, str]]:
+    """Iterate through model constraints for the neo driver as
+    `(name, statement)` tuples."""
 
     for model in ModelRegistry.models.values():
-        yield _create_primary_key_constraint(model, "id")
+        yield _constraint_name(model, "id"), _create_primary_key_constraint(model, "id")
     for model_name in ["Sample", "SampleType", "ObjectType"]:
         model = ModelRegistry.get_model(model_name)
-        yield _create_primary_key_constraint(model, "name")
+        yield _constraint_name(model, "name"), _create_primary_key_constraint(
+            model, "name"
+        )
+
+
+def iter_constraints():
+    """Iterate through model constraints for the neo driver."""
+    for _, constraint in iter_named_constraints():
+        yield constraint
+
+
+class PropertyIndex(NamedTuple):
+    """A property index on a node label."""
+
+    label: str
+    properties: Tuple[str, ...]
+
+    @property
+    def name(self) -> str:
+        return "{}_{}_index".format(self.label.lower(), "_".join(self.properties))
+
+    def statement(self) -> str:
+        return "CREATE INDEX {name} FOR (n:{label}) ON ({props})".format(
+            name=self.name,
+            label=self.label,
+            props=", ".join("n." + p for p in self.properties),
+        )
+
+
+def _server_name(model_name: str) -> str:
+    try:
+        return ModelRegistry.get_model(model_name).get_server_model_name()
+    except Exception:
+        return model_name
+
+
+def iter_foreign_key_indexes() -> Iterator[PropertyIndex]:
+    """Iterate through the property indexes for the foreign keys of the
+    pydent models.
+
+    Walks the `HasOne` and `HasMany` fields of every model in the
+    `ModelRegistry` (the same metadata used by the auto relationships):
+
+    * `HasOne` on model `A` joins `A.ref = B.id`, indexing `A.ref`
+    * `HasMany` on model `A` joins `B.ref = A.id`, indexing `B.ref`
+
+    Polymorphic keys (`parent_id`, which references different models
+    depending on `parent_class`) also get a composite
+    `(parent_class, parent_id)` index.
+    """
+    seen = set()
+    for model in ModelRegistry.models.values():
+        for field in getattr(model, "fields", {}).values():
+            if isinstance(field, HasOne):
+                label, ref = model.get_server_model_name(), field.ref
+            elif isinstance(field, HasMany):
+                label, ref = _server_name(field.nested), field.ref
+            else:
+                continue
+            if not ref or ref == "id":
+                continue
+            indexes = [PropertyIndex(label, (ref,))]
+            if isinstance(field, HasManyGeneric) or ref == "parent_id":
+                indexes.append(PropertyIndex(label, ("parent_class", ref)))
+            for index in indexes:
+                if index not in seen:
+                    seen.add(index)
+                    yield index
+
+
+def iter_named_indexes() -> Iterator[Tuple[str, str]]:
+    """Iterate through the foreign key indexes as `(name, statement)`
+    tuples."""
+    for index in iter_foreign_key_indexes():
+        yield index.name, index.statement()
+
+
+def iter_schema() -> Iterator[Tuple[str, str]]:
+    """Iterate through the constraints and indexes as `(name, statement)`
+    tuples."""
+    yield from iter_named_constraints()
+    yield from iter_named_indexes()
+
+
+def _uses_index(query: str, index: PropertyIndex) -> bool:
+    variables = re.findall(r"\(\s*(\w+)\s*:\s*{}\b".format(index.label), query)
+    for prop in index.properties:
+        used = any(
+            re.search(r"\b{}\.{}\b".format(var, prop), query) for var in variables
+        )
+        if not used:
+            # property may be matched inline, as in (a:Label { prop: ... })
+            used = bool(
+                re.search(
+                    r"\(\s*\w*\s*:\s*{}\s*{{[^}}]*\b{}\s*:".format(index.label, prop),
+                    query,
+                )
+            )
+        if not used:
+            return False
+    return True
+
+
+def index_report(queries: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """Report which queries may use each foreign key index.
+
+    A query may use an index if it binds a node with the index label and
+    matches every property of the index (as `var.prop` or inline as
+    `{prop: ...}`).
+
+    :param queries: queries to check (default: the statements of
+        `relationships.cypher`)
+    :return: dict of index name to the first line of each query that may
+        use it
+    """
+    if queries is None:
+        from aqneodriver.structured_queries.cypher import get_relationships_queries
+
+        queries = get_relationships_queries()
+    queries = [q for q in queries if not q.strip().startswith("//")]
+    report = {}
+    for index in iter_foreign_key_indexes():
+        report[index.name] = [
+            q.strip().splitlines()[0] for q in queries if _uses_index(q, index)
+        ]
+    return report
+
+
+def schema_version(constraints: Optional[Iterable[str]] = None) -> str:
+    """Return a hash identifying a set of constraint statements.
+
+    :param constraints: constraint and index statements (default: the
+        statements of :func:`iter_schema`)
+    :return: hex digest
+    """
+    if constraints is None:
+        constraints = (statement for _, statement in iter_schema())
+    h = hashlib.sha1()
+    for constraint in sorted(set(constraints)):
+        h.update(constraint.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
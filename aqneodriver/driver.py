@@ -1,30 +1,43 @@
+import functools
+import hashlib
 import logging
+import multiprocessing
 from abc import ABC
 from abc import abstractmethod
 from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from multiprocessing.util import Finalize
+from queue import Queue
 from typing import Any
 from typing import Callable
 from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import NamedTuple
 from typing import Optional
+from typing import Sequence
 from typing import Tuple
 from typing import TypeVar
 from typing import Union
 
 import dill
 from neo4j import GraphDatabase
+from neo4j import READ_ACCESS
 from neo4j.exceptions import ClientError
 from pydent import ModelBase
 
-from .constraints import iter_constraints
+from .constraints import iter_schema
+from .constraints import SCHEMA_LABEL
+from .constraints import schema_version
+from .utils.batching import iter_batches
 from .utils.crypto import Cryptography
 from .utils.format_queries import format_cypher_query
 from aqneodriver.payload import Payload
+from aqneodriver.payload import payload_nbytes
 from aqneodriver.types import ArgsList
 from aqneodriver.types import FormatData
 
-# from multiprocessing.pool import ThreadPool as Pool
-
 T = TypeVar("T")
 S = TypeVar("S")
 
@@ -37,12 +50,295 @@ DataType = Dict[
 ]
 logger = logging.getLogger(__name__)
 
+#: the long-lived driver owned by a pool worker process
+_worker_etl: Optional["AquariumETLDriver"] = None
+
+#: functions registered in this (worker) process, keyed by their digest
+_worker_functions: Dict[str, Callable] = {}
+
+#: max number of elements deleted per transaction by :meth:`AquariumETLDriver.clear`
+DEFAULT_CLEAR_BATCH_SIZE = 10000
+
+#: schema versions known to be applied, keyed by database uri
+_applied_schemas: Dict[str, str] = {}
+
+
+class RegisteredFunction(NamedTuple):
+    """Reference to a function registered in the pool workers.
+
+    Only this reference (not the function itself) is sent with each chunk
+    of arguments. `encoded` is included only when the function was
+    registered after the workers started, in which case each worker decodes
+    it once and caches it.
+    """
+
+    key: str
+    encoded: Optional[bytes] = None
+
+
+def encode_function(fun: Callable) -> Tuple[str, bytes]:
+    """Dill encode a function and compute its registry key."""
+    encoded = dill.dumps(fun)
+    return hashlib.sha1(encoded).hexdigest(), encoded
+
+
+def register_worker_functions(functions: Dict[str, bytes]):
+    """Decode and register functions in this process. Used as (part of) a
+    pool initializer."""
+    for key, encoded in functions.items():
+        _worker_functions[key] = dill.loads(encoded)
+
+
+def _resolve_function(func: RegisteredFunction) -> Callable:
+    fun = _worker_functions.get(func.key)
+    if fun is None:
+        if func.encoded is None:
+            raise KeyError(
+                "Function {} is not registered in process".format(func.key)
+            )
+        fun = dill.loads(func.encoded)
+        _worker_functions[func.key] = fun
+    return fun
+
+
+def _init_worker(
+    token: bytes, functions: Dict[str, bytes], key: Optional[bytes] = None
+):
+    """Pool initializer. Opens a single Neo4j driver for this worker process
+    that is reused for every payload the worker receives, and registers
+    the functions the pool will run.
+
+    The credentials are received encrypted. The key is inherited from the
+    parent when the worker is forked, so it is only passed (as `key`) when
+    the workers are spawned.
+
+    The driver is closed when the worker exits (i.e. on
+    :meth:`PooledAquariumETLDriver.close`).
+    """
+    global _worker_etl
+    creds = Cryptography.decrypt(
+        key or Cryptography.process_key(), token, literal_eval=True
+    )
+    _worker_etl = AquariumETLDriver(*creds, setup=False)
+    Finalize(None, _close_worker, exitpriority=10)
+    register_worker_functions(functions)
+
+
+def _close_worker():
+    global _worker_etl
+    if _worker_etl is not None:
+        _worker_etl.close()
+        _worker_etl = None
+
+
+def _call_with_worker_etl(f: Callable[["AquariumETLDriver", ArgsList], T], *args):
+    if _worker_etl is None:
+        raise RuntimeError(
+            "No driver found in this process. Bound functions must be run"
+            " in a pool opened by PooledAquariumETLDriver."
+        )
+    return f(_worker_etl, *args)
+
+
+def _read(
+    etl: "AquariumETLDriver", query: Union[str, Payload], data: Dict[str, FormatData]
+):
+    return etl.read(query, data)
+
+
+def _write(
+    etl: "AquariumETLDriver", query: Union[str, Payload], data: Dict[str, FormatData]
+):
+    return etl.write(query, data)
+
+
+def _write_batch(
+    etl: "AquariumETLDriver", queries: List[Payload], split_on_error: bool = True
+) -> List[T]:
+    """Write a batch of payloads in a single transaction.
+
+    If the batch fails and `split_on_error` is True, each payload is
+    retried in its own transaction so that a single bad payload does not
+    discard the rest of the batch. The exception of each payload that
+    fails is returned in place of its result (see
+    :func:`_dispatch_batch_errors`).
+    """
+    try:
+        return etl.write_many(queries)
+    except Exception as e:
+        if not split_on_error or len(queries) == 1:
+            raise e
+        logger.info(
+            "batch of {} payloads failed ({}). Retrying payloads individually.".format(
+                len(queries), e.__class__.__name__
+            )
+        )
+    results = []
+    for query in queries:
+        try:
+            results.append(etl.write(query))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _dispatch_batch_errors(
+    results: List[Union[T, Exception]],
+    error_callback: Optional[Callable[[Exception], None]] = None,
+) -> Iterator[T]:
+    """Yield the results of :func:`_write_batch`, passing the exception of
+    each payload that failed to `error_callback` (or raising it if there is
+    no `error_callback`)."""
+    for result in results:
+        if isinstance(result, Exception):
+            if error_callback is None:
+                raise result
+            error_callback(result)
+        else:
+            yield result
+
 
 def run_dill_encoded(payload: bytes) -> Tuple[int, T]:
     fun, args, idx = dill.loads(payload)
     return idx, fun(*args)
 
 
+def _run_chunk(
+    fun: Callable, chunk: List[Tuple[int, Tuple[Any, ...]]]
+) -> List[Tuple[int, bool, Any]]:
+    results = []
+    for idx, args in chunk:
+        try:
+            results.append((idx, True, fun(*args)))
+        except Exception as e:
+            results.append((idx, False, e))
+    return results
+
+
+def run_dill_encoded_chunk(payload: bytes) -> List[Tuple[int, bool, Any]]:
+    """Run a dill encoded chunk of `(idx, args)` items.
+
+    Exceptions are caught per item and returned (rather than raised) so
+    that one failing item does not discard the results of the rest of the
+    chunk.
+
+    :return: list of `(idx, ok, result_or_exception)`
+    """
+    fun, chunk = dill.loads(payload)
+    return _run_chunk(fun, chunk)
+
+
+def run_registered_chunk(
+    func: RegisteredFunction, chunk: List[Tuple[int, Tuple[Any, ...]]]
+) -> List[Tuple[int, bool, Any]]:
+    """Run a chunk of `(idx, args)` items with a function registered in this
+    process. Only the function reference and the arguments are sent to the
+    worker, using standard pickling.
+
+    :return: list of `(idx, ok, result_or_exception)`
+    """
+    return _run_chunk(_resolve_function(func), chunk)
+
+
+def iter_apply_async_map(
+    pool: Pool,
+    fun: Union[Callable[[T], S], RegisteredFunction],
+    args: Iterable[Tuple[T, ...]],
+    chunksize: int = 1,
+    max_in_flight: Optional[int] = None,
+    ordered: bool = True,
+    error_callback: Optional[Callable[[Exception], None]] = None,
+) -> Iterator[Tuple[int, S]]:
+    """Lazily apply a function to an iterable of arguments using a pool.
+
+    Arguments are pulled from `args` only when there is room for them, so
+    at most `max_in_flight` chunks (of `chunksize` items each) are
+    serialized and waiting in the pool at any time. Results are yielded as
+    soon as they are available. If `ordered` is True, results are yielded
+    in the order of `args` using a reorder buffer, otherwise they are
+    yielded in the order they complete.
+
+    Items that raise are passed to `error_callback` (or re-raised if no
+    `error_callback` is provided) and are not yielded.
+
+    If `fun` is a :class:`RegisteredFunction`, only the reference and the
+    arguments are sent per chunk. Otherwise the function is dill encoded
+    with every chunk, unless `pool` is a :class:`ThreadPool
+    <multiprocessing.pool.ThreadPool>`, in which case nothing is serialized.
+
+    :param pool: the process (or thread) pool
+    :param fun: function (or reference to a registered function) to apply
+    :param args: iterable of argument tuples
+    :param chunksize: number of items sent to a worker at a time
+    :param max_in_flight: max number of chunks submitted but not yet
+        consumed (default: twice the number of pool processes)
+    :param ordered: whether to yield results in the order of `args`
+    :param error_callback: called with each exception raised by a worker
+    :return: iterator of `(idx, result)`
+    """
+    if max_in_flight is None:
+        max_in_flight = 2 * pool._processes
+    max_in_flight = max(max_in_flight, 1)
+
+    done = Queue()
+    chunks = iter_batches(enumerate(args), chunksize)
+    exhausted = False
+    in_flight = 0
+    n_submitted = 0
+    n_released = 0
+    buffer = {}
+
+    def handle_error(e: Exception):
+        if error_callback:
+            error_callback(e)
+        else:
+            raise e
+
+    while True:
+        while not exhausted and in_flight < max_in_flight:
+            chunk = next(chunks, None)
+            if chunk is None:
+                exhausted = True
+                break
+            if isinstance(fun, RegisteredFunction):
+                runner, runner_args = run_registered_chunk, (fun, chunk)
+            elif isinstance(pool, ThreadPool):
+                runner, runner_args = _run_chunk, (fun, chunk)
+            else:
+                runner = run_dill_encoded_chunk
+                runner_args = (dill.dumps((fun, chunk)),)
+            pool.apply_async(
+                runner,
+                runner_args,
+                callback=lambda r, n=n_submitted: done.put((n, r)),
+                error_callback=lambda e, n=n_submitted, c=chunk: done.put(
+                    (n, [(idx, False, e) for idx, _ in c])
+                ),
+            )
+            n_submitted += 1
+            in_flight += 1
+        if in_flight == 0:
+            break
+        n, results = done.get()
+        if ordered:
+            # chunks completed out of order wait in the buffer, and still
+            # count as in flight, until every earlier chunk is yielded
+            buffer[n] = results
+            released = []
+            while n_released in buffer:
+                released.append(buffer.pop(n_released))
+                n_released += 1
+        else:
+            released = [results]
+        for results in released:
+            in_flight -= 1
+            for idx, ok, result in results:
+                if ok:
+                    yield idx, result
+                else:
+                    handle_error(result)
+
+
 def apply_async_map(
     pool: Pool,
     fun: Callable[[T], S],
@@ -51,25 +347,14 @@ def apply_async_map(
     callback: Optional[Callable[[S], None]] = None,
     error_callback: Optional[Callable[[Exception], None]] = None,
 ) -> List[S]:
-    payloads = [dill.dumps((fun, arg, idx)) for idx, arg in enumerate(args)]
-    results = pool.imap_unordered(run_dill_encoded, payloads, chunksize=chunksize)
-    unordered_results = []
-
-    while True:
-        try:
-            result = next(results)
-            if callback:
-                callback(result)
-            unordered_results.append(result)
-        except StopIteration:
-            break
-        except Exception as e:
-            if error_callback:
-                error_callback(e)
-            else:
-                raise e
-
-    return [r[1] for r in sorted(unordered_results)]
+    results = []
+    for _, result in iter_apply_async_map(
+        pool, fun, args, chunksize=chunksize, error_callback=error_callback
+    ):
+        if callback:
+            callback(result)
+        results.append(result)
+    return results
 
 
 class AquariumETLDriverABC(ABC):
@@ -95,33 +380,166 @@ class PooledAquariumETLDriver:
     .. code-block::
 
         driver.pool(n_jobs=12).write(payloads)
+
+    Each worker process opens a single Neo4j driver when the pool starts
+    and reuses it for every payload. To reuse the same workers across
+    several calls, use the pool as a context manager. The workers are shut
+    down when the context exits:
+
+    .. code-block::
+
+        with driver.pool(n_jobs=12) as pool:
+            pool.write(node_payloads)
+            pool.write(edge_payloads)
+
+    Payloads may also be streamed from a generator with bounded memory
+    using :meth:`iter_write` and :meth:`iter_read`:
+
+    .. code-block::
+
+        with driver.pool(n_jobs=12) as pool:
+            for result in pool.iter_write(payload_generator()):
+                ...
+
+    Functions are shipped to the workers once, through the pool initializer
+    (see :meth:`register`), so only the payloads are serialized per item.
     """
 
     def __init__(self, n, binder: AquariumETLDriverABC):
         self.binder = binder
         self.n = n
+        self._pool: Optional[Pool] = None
+        self._functions: Dict[str, bytes] = {}
+        self._initialized_functions = set()
+        for func in [_read, _write, _write_batch]:
+            self.register(func)
 
-    def __call__(
+    def register(
+        self, func: Callable[["AquariumETLDriver", ArgsList], T]
+    ) -> RegisteredFunction:
+        """Register a function to be run by the workers.
+
+        Functions registered before the pool is opened are sent to each
+        worker once by the pool initializer. Functions registered while
+        the pool is open are sent along with their arguments until the
+        pool is reopened, but are only decoded once per worker.
+
+        :param func: function taking the worker's driver and arguments
+        :return: reference to the registered function
+        """
+        key, encoded = encode_function(self.binder._bind(func))
+        self._functions[key] = encoded
+        if key in self._initialized_functions:
+            return RegisteredFunction(key)
+        return RegisteredFunction(key, encoded)
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the worker processes are running."""
+        return self._pool is not None
+
+    def open(self) -> "PooledAquariumETLDriver":
+        """Start the worker processes. Each worker opens its own Neo4j
+        driver.
+
+        :return: self
+        """
+        if self._pool is None:
+            token, key = self.binder._credentials_token()
+            if multiprocessing.get_start_method() == "fork":
+                key = None
+            self._pool = Pool(
+                self.n,
+                initializer=_init_worker,
+                initargs=(token, dict(self._functions), key),
+            )
+            self._initialized_functions = set(self._functions)
+        return self
+
+    def close(self):
+        """Let the workers finish outstanding work, close their drivers and
+        exit."""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            pool.close()
+            pool.join()
+
+    def terminate(self):
+        """Stop the workers immediately without waiting for outstanding
+        work."""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            pool.terminate()
+            pool.join()
+
+    def __enter__(self) -> "PooledAquariumETLDriver":
+        return self.open()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def imap(
         self,
         func,
-        args: Union[List[Tuple[str, Dict]], Tuple[Tuple[str, Dict], ...]],
+        args: Iterable[Tuple[Any, ...]],
+        *,
         chunksize: Optional[int] = 1,
+        max_in_flight: Optional[int] = None,
+        ordered: bool = True,
         callback: Optional[Callable[[S], None]] = None,
         error_callback: Optional[Callable[[Exception], None]] = None,
-    ):
-        with Pool(self.n) as pool:
-            try:
-                result = apply_async_map(
-                    pool,
-                    self.binder._bind(func),
+    ) -> Iterator[S]:
+        """Lazily apply a bound function to an iterable of arguments. See
+        :func:`iter_apply_async_map`.
+
+        If the pool is not open, it is opened for the lifetime of the
+        iterator.
+        """
+        if not self.is_open:
+            with self:
+                yield from self.imap(
+                    func,
                     args,
+                    chunksize=chunksize,
+                    max_in_flight=max_in_flight,
+                    ordered=ordered,
                     callback=callback,
                     error_callback=error_callback,
                 )
-            except Exception as e:
-                # TODO: catch things here
-                raise e
-        return result
+            return
+        for _, result in iter_apply_async_map(
+            self._pool,
+            self.register(func),
+            args,
+            chunksize=chunksize or 1,
+            max_in_flight=max_in_flight,
+            ordered=ordered,
+            error_callback=error_callback,
+        ):
+            if callback:
+                callback(result)
+            yield result
+
+    def __call__(
+        self,
+        func,
+        args: Union[List[Tuple[str, Dict]], Tuple[Tuple[str, Dict], ...]],
+        chunksize: Optional[int] = 1,
+        callback: Optional[Callable[[S], None]] = None,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ):
+        return list(
+            self.imap(
+                func,
+                args,
+                chunksize=chunksize,
+                callback=callback,
+                error_callback=error_callback,
+            )
+        )
 
     def read(
         self,
@@ -131,18 +549,36 @@ class PooledAquariumETLDriver:
         callback: Optional[Callable[[S], None]] = None,
         error_callback: Optional[Callable[[Exception], None]] = None,
     ):
-        def read(
-            etl: AquariumETLDriver,
-            query: Union[str, Payload],
-            data: Dict[str, FormatData],
-        ):
-            results = etl.read(query, data)
-            return results
+        self._validate_queries(queries)
+        return list(
+            self.iter_read(
+                queries,
+                chunksize=chunksize,
+                callback=callback,
+                error_callback=error_callback,
+            )
+        )
 
-        return self._bind_func(
-            read,
-            queries,
+    def iter_read(
+        self,
+        queries: Iterable[Union[Payload, Tuple[str, Dict]]],
+        *,
+        chunksize: Optional[int] = 1,
+        max_in_flight: Optional[int] = None,
+        ordered: bool = True,
+        callback: Optional[Callable[[S], None]] = None,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> Iterator[S]:
+        """Lazily read payloads from an iterable using the pool.
+
+        See :meth:`iter_write`.
+        """
+        return self.imap(
+            _read,
+            map(self._validate_query, queries),
             chunksize=chunksize,
+            max_in_flight=max_in_flight,
+            ordered=ordered,
             callback=callback,
             error_callback=error_callback,
         )
@@ -165,26 +601,122 @@ class PooledAquariumETLDriver:
             ):
                 raise TypeError(msg)
 
+    @staticmethod
+    def _validate_query(
+        query: Union[Payload, Tuple[str, Dict]]
+    ) -> Union[Payload, Tuple[str, Dict]]:
+        if (
+            not isinstance(query, (tuple, Payload, list))
+            or not isinstance(query[0], str)
+            or not isinstance(query[1], dict)
+        ):
+            raise TypeError(
+                "Queries must be Union[Payload, Tuple[str, dict]], not {}".format(
+                    query.__class__.__name__
+                )
+            )
+        return query
+
     def write(
         self,
         queries: Union[List[str], Tuple[str, ...], List[Payload], Tuple[Payload, ...]],
         *,
         chunksize: Optional[int] = 1,
+        batch_size: int = 1,
+        batch_bytes: Optional[int] = None,
+        split_on_error: bool = True,
         callback: Optional[Callable[[S], None]] = None,
         error_callback: Optional[Callable[[Exception], None]] = None,
     ):
-        def write(
-            etl: AquariumETLDriver,
-            query: Union[str, Payload],
-            data: Dict[str, FormatData],
-        ):
-            results = etl.write(query, data)
-            return results
+        """Write payloads using the pool.
+
+        By default, each payload is committed in its own transaction. If
+        `batch_size > 1` or `batch_bytes` is provided, consecutive payloads
+        are grouped and each group is committed in a single transaction
+        (see :meth:`AquariumETLDriver.write_many`), trading one commit per
+        payload for one commit per batch.
+
+        :param queries: list of payloads
+        :param chunksize: number of items sent to a worker at a time
+        :param batch_size: max number of payloads committed per transaction
+        :param batch_bytes: max approximate serialized size of payloads
+            committed per transaction
+        :param split_on_error: if a batch fails, retry its payloads in
+            separate transactions so only the failing payloads are lost
+        :param callback: called with the result of each payload
+        :param error_callback: called with each exception raised by a worker.
+            In batch mode, this is called once per failed payload if
+            `split_on_error` is True, once per failed batch otherwise.
+        :return: list of results
+        """
+        self._validate_queries(queries)
+        return list(
+            self.iter_write(
+                queries,
+                chunksize=chunksize,
+                batch_size=batch_size,
+                batch_bytes=batch_bytes,
+                split_on_error=split_on_error,
+                callback=callback,
+                error_callback=error_callback,
+            )
+        )
 
-        return self._bind_func(
-            write,
+    def iter_write(
+        self,
+        queries: Iterable[Union[Payload, Tuple[str, Dict]]],
+        *,
+        chunksize: Optional[int] = 1,
+        batch_size: int = 1,
+        batch_bytes: Optional[int] = None,
+        split_on_error: bool = True,
+        max_in_flight: Optional[int] = None,
+        ordered: bool = True,
+        callback: Optional[Callable[[S], None]] = None,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> Iterator[S]:
+        """Lazily write payloads from an iterable (e.g. a generator) using the
+        pool.
+
+        Payloads are consumed only as fast as the workers can write them;
+        at most `max_in_flight` chunks are waiting in the pool at once.
+        Results are yielded as they complete (in input order if `ordered`
+        is True). See :meth:`write` for the remaining arguments.
+
+        :return: iterator of results, one per payload
+        """
+        queries = map(self._validate_query, queries)
+        if batch_size > 1 or batch_bytes is not None:
+            batches = (
+                (batch, split_on_error)
+                for batch in iter_batches(
+                    queries, batch_size, max_bytes=batch_bytes, sizeof=payload_nbytes
+                )
+            )
+            batch_results = self.imap(
+                _write_batch,
+                batches,
+                chunksize=chunksize,
+                max_in_flight=max_in_flight,
+                ordered=ordered,
+                error_callback=error_callback,
+            )
+
+            def results():
+                for batch_result in batch_results:
+                    for result in _dispatch_batch_errors(batch_result, error_callback):
+                        if callback:
+                            callback(result)
+                        yield result
+
+            return results()
+
+        return self.imap(
+            _write,
             queries,
             chunksize=chunksize,
+            max_in_flight=max_in_flight,
+            ordered=ordered,
             callback=callback,
             error_callback=error_callback,
         )
@@ -205,9 +737,10 @@ class PooledAquariumETLDriver:
     ):
         self._validate_queries(queries)
         if isinstance(func, str):
+            method_name = func
 
             def func(etl: AquariumETLDriver, payload: Payload, data: Dict[FormatData]):
-                results = getattr(etl, func)(payload, data)
+                results = getattr(etl, method_name)(payload, data)
                 return results
 
         return self(
@@ -219,22 +752,63 @@ class PooledAquariumETLDriver:
         )
 
 
+class ThreadPooledAquariumETLDriver(PooledAquariumETLDriver):
+    """Pooled driver that uses threads to complete tasks.
+
+    Every thread shares the Neo4j driver (and so the bolt connection pool)
+    of the :class:`AquariumETLDriver` that created the pool. Each
+    transaction still runs in its own session, as sessions are not thread
+    safe. Functions and payloads are passed to the threads directly, so
+    nothing is serialized and unpicklable functions (e.g. closures) can be
+    used.
+
+    .. code-block::
+
+        with driver.pool(n_jobs=32, mode="thread") as pool:
+            pool.write(payloads)
+
+    Threads are a good fit when the work is dominated by waiting on the
+    database rather than by building payloads in Python.
+    """
+
+    def register(
+        self, func: Callable[["AquariumETLDriver", ArgsList], T]
+    ) -> Callable[[S], T]:
+        """Bind a function to the shared driver.
+
+        :param func: function taking the driver and arguments
+        :return: the bound function
+        """
+        return functools.partial(func, self.binder)
+
+    def open(self) -> "ThreadPooledAquariumETLDriver":
+        """Start the worker threads.
+
+        :return: self
+        """
+        if self._pool is None:
+            self._pool = ThreadPool(self.n)
+        return self
+
+
 class AquariumETLDriver:
     """The main driver for connecting with Neo4j."""
 
-    DEBUG_PASSWORD = "debug"
+    POOL_MODES = ("process", "thread", "async")  #: available executor backends
 
-    def __init__(self, uri, user, password):
+    def __init__(self, uri, user, password, setup: bool = True):
         """Initialize ETL session.
 
         :param uri:
         :param user:
         :param password:
+        :param setup: if True, add the graphdb constraints (see :meth:`setup`)
         """
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
-        self.__key = Cryptography.generate_key(self.DEBUG_PASSWORD)
+        self.__key = Cryptography.process_key()
         self.__config = Cryptography.encrypt(self.__key, (uri, user, password))
-        self.setup()
+        if setup:
+            self.setup()
 
     @staticmethod
     def fmt(query: str, **kwargs: FormatData) -> str:
@@ -248,54 +822,281 @@ class AquariumETLDriver:
         """Close the driver."""
         self.driver.close()
 
-    def setup(self):
-        """Add the graphdb constraints.
+    def setup(
+        self, force: bool = False, wait: bool = True, timeout: int = 300
+    ) -> bool:
+        """Add the graphdb constraints and foreign key indexes.
 
-        :return:
+        The hash of the schema (see
+        :func:`schema_version <aqneodriver.constraints.schema_version>`) is
+        recorded in the graph on a `_AqneodriverSchema` node. If the
+        recorded version matches, setup is skipped. Otherwise, only the
+        constraints and indexes missing from the database are created, in a
+        single transaction. Versions known to be applied are also remembered
+        per process, so constructing more drivers for the same database does
+        not query the schema again. If a constraint or index cannot be
+        created, the version is not recorded, so the next setup retries it.
+
+        :param force: if True, check the schema even if the recorded
+            version matches
+        :param wait: if True, wait for the indexes to come online before
+            returning, so that bulk writes do not start against indexes that
+            are still populating
+        :param timeout: max seconds to wait for the indexes
+        :return: whether the schema was (re)applied and recorded
         """
+        named_schema = dict(iter_schema())
+        version = schema_version(named_schema.values())
+        uri = self._credentials()[0]
+        if not force and _applied_schemas.get(uri) == version:
+            return False
         with self.driver.session() as session:
-            for constraint in iter_constraints():
-                try:
-                    session.run(constraint)
-                except ClientError:
-                    pass
+            if not force and self._schema_version(session) == version:
+                _applied_schemas[uri] = version
+                logger.debug("schema {} already applied".format(version))
+                return False
+            existing = self._schema_names(session)
+            missing = [
+                statement
+                for name, statement in named_schema.items()
+                if name not in existing
+            ]
+            logger.info(
+                "applying schema {} ({} missing constraints and indexes)".format(
+                    version, len(missing)
+                )
+            )
+            complete = not missing or self._create_schema(session, missing)
+            if wait:
+                session.run("CALL db.awaitIndexes($timeout)", timeout=timeout).consume()
+            if not complete:
+                logger.warning(
+                    "schema {} was not fully applied and will be retried".format(
+                        version
+                    )
+                )
+                return False
+            session.run(
+                "MERGE (s:{label} {{name: 'constraints'}}) "
+                "SET s.version = $version, s.updated_at = timestamp()".format(
+                    label=SCHEMA_LABEL
+                ),
+                version=version,
+            ).consume()
+        _applied_schemas[uri] = version
+        return True
 
-    # TODO: this should not be easy to run
-    def clear(self):
+    @staticmethod
+    def _schema_version(session) -> Optional[str]:
+        record = session.run(
+            "MATCH (s:{label} {{name: 'constraints'}}) RETURN s.version".format(
+                label=SCHEMA_LABEL
+            )
+        ).single()
+        if record is None:
+            return None
+        return record[0]
+
+    @staticmethod
+    def _schema_names(session) -> set:
+        """Return the names of the existing constraints and indexes."""
+        names = set()
+        for show, fallback in [
+            ("SHOW CONSTRAINTS YIELD name", "CALL db.constraints() YIELD name"),
+            ("SHOW INDEXES YIELD name", "CALL db.indexes() YIELD name"),
+        ]:
+            try:
+                result = session.run(show)
+                names.update(record[0] for record in result)
+            except ClientError:
+                # servers older than 4.2
+                result = session.run(fallback)
+                names.update(record[0] for record in result)
+        return names
+
+    @staticmethod
+    def _create_schema(session, statements: List[str]) -> bool:
+        """Create constraints and indexes in one transaction, falling back to
+        creating them one at a time if the batch fails (e.g. if an equivalent
+        but differently named constraint or index already exists).
+
+        :return: whether every constraint and index was created or already
+            exists
         """
-        Clear the graphdb
-        :return:
+
+        def transaction(tx):
+            for statement in statements:
+                tx.run(statement)
+
+        try:
+            session.execute_write(transaction)
+            return True
+        except ClientError:
+            pass
+        complete = True
+        for statement in statements:
+            try:
+                session.run(statement).consume()
+            except ClientError as e:
+                if (e.code or "").endswith("AlreadyExists"):
+                    logger.debug("skipping {}: {}".format(statement, e))
+                else:
+                    logger.warning("unable to create {}: {}".format(statement, e))
+                    complete = False
+        return complete
+
+    # TODO: this should not be easy to run
+    def clear(
+        self,
+        batch_size: int = DEFAULT_CLEAR_BATCH_SIZE,
+        labels: Optional[Sequence[str]] = None,
+        callback: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Clear the graphdb.
+
+        Relationships are deleted first, then nodes, each in transactions of
+        at most `batch_size` elements, so that clearing a large graph does
+        not run out of transaction memory.
+
+        :param batch_size: max number of relationships or nodes to delete
+            per transaction
+        :param labels: if provided, only delete the nodes with these labels
+            (and their relationships), one label at a time
+        :param callback: called with the number of elements deleted after
+            each transaction
+        :return: total number of relationships and nodes deleted
         """
-        with self.driver.session() as sess:
-            sess.run("MATCH (a) -[r]-> () DELETE a, r")
-            sess.run("MATCH (a) DELETE a")
+        if labels is None:
+            n = self.clear_relationships(batch_size, callback=callback)
+            n += self._delete_batches(
+                "MATCH (a) WITH a LIMIT $batch_size DETACH DELETE a RETURN count(*)",
+                batch_size,
+                callback,
+            )
+        else:
+            n = 0
+            for label in labels:
+                n += self._delete_batches(
+                    "MATCH (:`{label}`) -[r]- () WITH DISTINCT r LIMIT $batch_size "
+                    "DELETE r RETURN count(*)".format(label=label),
+                    batch_size,
+                    callback,
+                )
+                n += self._delete_batches(
+                    "MATCH (a:`{label}`) WITH a LIMIT $batch_size "
+                    "DETACH DELETE a RETURN count(*)".format(label=label),
+                    batch_size,
+                    callback,
+                )
+        _applied_schemas.pop(self._credentials()[0], None)
+        return n
 
-    def clear_relationships(self):
-        with self.driver.session() as sess:
-            sess.run("MATCH () -[r]-> () DELETE r")
+    def clear_relationships(
+        self,
+        batch_size: int = DEFAULT_CLEAR_BATCH_SIZE,
+        callback: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Delete every relationship in the graphdb, in transactions of at
+        most `batch_size` relationships.
 
-    def _do_tx(
+        :param batch_size: max number of relationships to delete per
+            transaction
+        :param callback: called with the number of relationships deleted
+            after each transaction
+        :return: number of relationships deleted
+        """
+        return self._delete_batches(
+            "MATCH () -[r]-> () WITH r LIMIT $batch_size DELETE r RETURN count(*)",
+            batch_size,
+            callback,
+        )
+
+    def _delete_batches(
         self,
-        query: Union[str, Payload],
-        sess_func,
-        data: FormatData = None,
-        callback: Optional[Callable[[S], None]] = None,
-        error_callback: Optional[Callable[[Exception], None]] = T,
-    ) -> Any:
+        query: str,
+        batch_size: int,
+        callback: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Run a delete query returning the number of deleted elements until
+        it deletes nothing."""
+        total = 0
+        with self.driver.session() as session:
+            while True:
+                n = session.execute_write(
+                    lambda tx: tx.run(query, batch_size=batch_size).single()[0]
+                )
+                if not n:
+                    return total
+                total += n
+                if callback:
+                    callback(n)
+
+    def recreate_database(self, database: str = "neo4j") -> bool:
+        """Drop and recreate a database, the fastest way to clear it.
+
+        This requires a server that supports `CREATE OR REPLACE DATABASE`
+        (Neo4j Enterprise 4.2+). The constraints and indexes are dropped
+        along with the data (see :meth:`setup`).
 
+        :param database: name of the database
+        :return: False if the server does not support recreating databases
+        """
+        try:
+            with self.driver.session(database="system") as session:
+                session.run(
+                    "CREATE OR REPLACE DATABASE `{}` WAIT".format(database)
+                ).consume()
+        except ClientError as e:
+            logger.info("unable to recreate database {}: {}".format(database, e))
+            return False
+        _applied_schemas.pop(self._credentials()[0], None)
+        return True
+
+    @staticmethod
+    def _query_and_data(
+        query: Union[str, Payload], data: Optional[Dict[str, FormatData]] = None
+    ) -> Tuple[str, Dict[str, FormatData]]:
         data = data or dict()
-        if isinstance(query, Payload):
+        if isinstance(query, (Payload, tuple, list)):
             query, pldata = query
             if data:
                 pldata.update(data)
             data = dict(pldata)
         else:
             data = dict(data)
+        return query, data
+
+    def _do_tx(
+        self,
+        query: Union[str, Payload],
+        sess_func,
+        data: FormatData = None,
+        callback: Optional[Callable[[S], None]] = None,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> Any:
+        query, data = self._query_and_data(query, data)
 
         def transaction(tx, **tx_data):
             r = tx.run(query, **tx_data)
             return r.values()
 
+        return self._run_tx(
+            sess_func,
+            transaction,
+            data,
+            callback=callback,
+            error_callback=error_callback,
+        )
+
+    def _run_tx(
+        self,
+        sess_func,
+        transaction,
+        data: Dict[str, FormatData],
+        callback: Optional[Callable[[S], None]] = None,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> Any:
+        result = None
         with self.driver.session() as sess:
             try:
                 result = sess_func(sess)(transaction, **data)
@@ -308,6 +1109,38 @@ class AquariumETLDriver:
                 callback(result)
             return result
 
+    def write_many(
+        self,
+        queries: Sequence[Union[str, Payload]],
+        callback: Optional[Callable[[List[S]], None]] = None,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> List[T]:
+        """Submit several 'write' queries in a single transaction.
+
+        The batch is committed atomically: either every query is
+        committed or, if any query fails, none of them are. Transient
+        errors (e.g. deadlocks, leader switches) are retried for the
+        whole batch by the Neo4j managed transaction, so queries should
+        be idempotent (MERGE rather than CREATE).
+
+        :param queries: list of query strings or :class:`Payload`
+        :param callback: called with the list of results
+        :param error_callback: called with the exception if the batch fails
+        :return: list of results, one per query
+        """
+        queries = [self._query_and_data(q) for q in queries]
+
+        def transaction(tx):
+            return [tx.run(q, **d).values() for q, d in queries]
+
+        return self._run_tx(
+            lambda x: x.execute_write,
+            transaction,
+            {},
+            callback=callback,
+            error_callback=error_callback,
+        )
+
     def write(
         self,
         query: Union[str, Payload],
@@ -325,7 +1158,7 @@ class AquariumETLDriver:
         """
         return self._do_tx(
             query,
-            lambda x: x.write_transaction,
+            lambda x: x.execute_write,
             data,
             callback=callback,
             error_callback=error_callback,
@@ -348,12 +1181,94 @@ class AquariumETLDriver:
         """
         return self._do_tx(
             query,
-            lambda x: x.read_transaction,
+            lambda x: x.execute_read,
             data,
             callback=callback,
             error_callback=error_callback,
         )
 
+    def stream(
+        self,
+        query: Union[str, Payload],
+        data: Optional[Dict[str, FormatData]] = None,
+        fetch_size: int = 1000,
+    ) -> Iterator[List[Any]]:
+        """Lazily stream the records of a 'read' query.
+
+        Unlike :meth:`read`, which materializes every record inside the
+        transaction, records are pulled from the server `fetch_size` at a
+        time as the generator is consumed. The session stays open until
+        the generator is exhausted or closed, so consume it promptly.
+
+        .. code-block::
+
+            for values in driver.stream("MATCH (n:Sample) RETURN n.id, n.name"):
+                ...
+
+        :param query: query string or :class:`Payload`
+        :param data: query parameters
+        :param fetch_size: number of records pulled from the server at a time
+        :return: iterator of record values, as returned by :meth:`read`
+        """
+        query, data = self._query_and_data(query, data)
+        with self.driver.session(
+            default_access_mode=READ_ACCESS, fetch_size=fetch_size
+        ) as sess:
+            for record in sess.run(query, **data):
+                yield record.values()
+
+    def iter_ids(
+        self,
+        label: str,
+        batch_size: int = 1000,
+        limit: Optional[int] = None,
+        key: str = "id",
+    ) -> Iterator[List[Any]]:
+        """Iterate over the keys of every node with a label in batches,
+        using keyset pagination.
+
+        Each batch is read in its own short transaction, seeking past the
+        last key of the previous batch (`WHERE n.id > $after ORDER BY n.id`)
+        so that the primary key index is used and no batch rescans earlier
+        nodes. Memory use is bounded by `batch_size`.
+
+        :param label: node label (e.g. "Sample")
+        :param batch_size: number of keys per batch
+        :param limit: max number of keys to return (default: all)
+        :param key: the (indexed) key property
+        :return: iterator of lists of keys
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        first = self.fmt(
+            "MATCH (n:{label}) WHERE n.{key} IS NOT NULL "
+            "RETURN n.{key} ORDER BY n.{key} LIMIT $limit",
+            label=label,
+            key=key,
+        )
+        following = self.fmt(
+            "MATCH (n:{label}) WHERE n.{key} > $after "
+            "RETURN n.{key} ORDER BY n.{key} LIMIT $limit",
+            label=label,
+            key=key,
+        )
+        n = 0
+        after = None
+        while limit is None or n < limit:
+            size = batch_size if limit is None else min(batch_size, limit - n)
+            if after is None:
+                results = self.read(first, {"limit": size})
+            else:
+                results = self.read(following, {"limit": size, "after": after})
+            ids = [r[0] for r in results]
+            if not ids:
+                return
+            yield ids
+            n += len(ids)
+            after = ids[-1]
+            if len(ids) < size:
+                return
+
     def aq_create(self, model: ModelBase, data: FormatData = None) -> T:
         node_label = model.get_server_model_name()
         data = data or model.dump()
@@ -383,34 +1298,59 @@ class AquariumETLDriver:
         payload = Payload(query, data)
         return self.write(payload)
 
+    def _credentials(self) -> Tuple[str, str, str]:
+        return Cryptography.decrypt(self.__key, self.__config, literal_eval=True)
+
+    def _credentials_token(self) -> Tuple[bytes, bytes]:
+        """Return the encrypted credentials and the key to decrypt them.
+
+        The key is the per-process key (see
+        :meth:`Cryptography.process_key
+        <aqneodriver.utils.crypto.Cryptography.process_key>`), which forked
+        pool workers already have.
+        """
+        return self.__config, self.__key
+
     def _bind(
         self, f: Callable[["AquariumETLDriver", ArgsList], T]
     ) -> Callable[[S], T]:
-        """Bind a function to the encrypted credentials of this instance.
+        """Bind a function to the driver of the pool worker that runs it.
 
         :param f:
         :return:
         """
-        creds = Cryptography.decrypt(self.__key, self.__config, literal_eval=True)
-
-        def bound(*args):
-            etl = AquariumETLDriver(*creds)
-            return f(etl, *args)
-
-        return bound
+        return functools.partial(_call_with_worker_etl, f)
 
     def bind_pool(
         self, n, f: Callable[["AquariumETLDriver", ArgsList], T], args: ArgsList
     ) -> List[T]:
-        with Pool(n) as pool:
-            results = apply_async_map(pool, self._bind(f), args)
-        return results
+        return self.pool(n)(f, args)
 
-    def pool(self, n: Optional[int] = None) -> PooledAquariumETLDriver:
+    def pool(
+        self, n: Optional[int] = None, mode: str = "process"
+    ) -> PooledAquariumETLDriver:
         """Create a pool of Neo4j sessions to run a query with multiple
         processes.
 
-        :param n: number of processors to use
+        :param n: number of processes (or threads) to use. For
+            `mode="async"`, the number of concurrent transactions.
+        :param mode: the executor backend. One of :attr:`POOL_MODES`:
+            "process" to use a pool of worker processes, each with its own
+            driver, "thread" to use a pool of threads sharing this driver,
+            or "async" to use a single :class:`AsyncAquariumETLDriver
+            <aqneodriver.async_driver.AsyncAquariumETLDriver>`
         :return: A pooled ETL interface.
         """
-        return PooledAquariumETLDriver(n, self)
+        if mode == "process":
+            return PooledAquariumETLDriver(n, self)
+        elif mode == "thread":
+            return ThreadPooledAquariumETLDriver(n, self)
+        elif mode == "async":
+            from .async_driver import AsyncPooledAquariumETLDriver
+
+            return AsyncPooledAquariumETLDriver(n, self)
+        raise ValueError(
+            "Pool mode must be one of {}, not '{}'".format(
+                ", ".join(repr(m) for m in self.POOL_MODES), mode
+            )
+        )
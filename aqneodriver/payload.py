@@ -22,6 +22,10 @@ class Payload(Sequence):
             raise ValidationError("Data must be a dict")
         json.dumps(self.data)
 
+    def nbytes(self) -> int:
+        """Approximate serialized size of the payload (query and JSON data)."""
+        return payload_nbytes(self)
+
     def __iter__(self):
         yield self.query
         yield self.data
@@ -36,3 +40,10 @@ class Payload(Sequence):
 
     def __len__(self):
         return 2
+
+
+def payload_nbytes(payload: Sequence) -> int:
+    """Approximate serialized size of a :class:`Payload` or (query, data)
+    tuple."""
+    query, data = payload
+    return len(query) + len(json.dumps(data))
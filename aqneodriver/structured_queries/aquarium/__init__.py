@@ -1,4 +1,14 @@
 """Structured Aquarium queries."""
+from ._content_hash import content_hash
+from ._content_hash import ContentHashFilter
+from ._fk_joins import FOREIGN_KEY_JOINS
+from ._fk_joins import ForeignKeyJoin
+from ._fk_joins import iter_foreign_key_edges
+from ._model_cache import ModelCache
+from ._pagination import fetch_sharded
+from ._pagination import iter_pages
+from ._reference_data import ReferenceData
+from ._struct_aq_query import edges_to_payloads
 from ._struct_inv_query import StructuredInvQuery
 from ._struct_jobs_query import StructuredJobQuery
 from ._struct_samples_query import StructuredSamplesQuery
@@ -6,6 +16,24 @@ from ._struct_samples_query import StructuredSamplesQuery
 aq_samples_to_cypher = StructuredSamplesQuery().__call__
 aq_inventory_to_cypher = StructuredInvQuery().__call__
 aq_jobs_to_cypher = StructuredJobQuery().__call__
+iter_aq_samples_to_cypher = StructuredSamplesQuery().iter_payloads
 
 
-__all__ = ["aq_samples_to_cypher", "aq_inventory_to_cypher", "aq_jobs_to_cypher"]
+__all__ = [
+    "aq_samples_to_cypher",
+    "aq_inventory_to_cypher",
+    "aq_jobs_to_cypher",
+    "StructuredInvQuery",
+    "StructuredJobQuery",
+    "iter_aq_samples_to_cypher",
+    "iter_foreign_key_edges",
+    "edges_to_payloads",
+    "ForeignKeyJoin",
+    "FOREIGN_KEY_JOINS",
+    "content_hash",
+    "ContentHashFilter",
+    "ModelCache",
+    "iter_pages",
+    "fetch_sharded",
+    "ReferenceData",
+]
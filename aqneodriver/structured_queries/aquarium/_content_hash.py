@@ -0,0 +1,111 @@
+"""Skip writing models that have not changed since they were last written.
+
+Every row written by :class:`MergeModels
+<aqneodriver.structured_queries.cypher.MergeModels>` carries a compact hash
+of its properties (:data:`HASH_KEY`). Before payloads are generated, the
+hashes stored in the graph db are looked up for a whole batch of rows, and
+the rows whose hash did not change are dropped.
+"""
+import hashlib
+import json
+import threading
+from collections import Counter
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import List
+from typing import Optional
+
+from aqneodriver.utils.batching import iter_batches
+
+#: node property storing the content hash of the other properties
+HASH_KEY = "content_hash"
+
+#: max number of ids looked up per read transaction
+DEFAULT_LOOKUP_SIZE = 10000
+
+# properties that change without the model changing (the pydent `rid` is a
+# per-process counter)
+_IGNORED_KEYS = (HASH_KEY, "rid")
+
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """Return a compact hash of the properties of a row.
+
+    The hash does not depend on the order of the keys. The :data:`HASH_KEY`
+    property itself and the pydent `rid` are ignored.
+
+    :param row: the properties of a node
+    :return: 16 character hex digest
+    """
+    data = {k: v for k, v in row.items() if k not in _IGNORED_KEYS}
+    s = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.blake2b(s.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ContentHashFilter:
+    """Drop the rows whose content hash matches the hash stored in the
+    graph db, counting the skipped and written rows of each model type.
+
+    .. code-block::
+
+        row_filter = ContentHashFilter(etl.read)
+        payloads = aq_inventory_to_cypher(aq, models, row_filter=row_filter)
+        print(row_filter.skipped, row_filter.written)
+
+    :param read: function running a read query with parameters, returning
+        a list of records (e.g. :meth:`AquariumETLDriver.read
+        <aqneodriver.driver.AquariumETLDriver.read>`)
+    :param lookup_size: max number of ids looked up per read
+    """
+
+    def __init__(
+        self,
+        read: Callable[[str, Dict[str, Any]], List[List[Any]]],
+        lookup_size: Optional[int] = DEFAULT_LOOKUP_SIZE,
+    ):
+        self.read = read
+        self.lookup_size = lookup_size
+        self.skipped = Counter()  #: number of rows skipped, by model type
+        self.written = Counter()  #: number of rows kept, by model type
+        self._lock = threading.Lock()
+
+    def lookup(self, model_type: str, ids: List[Hashable]) -> Dict[Hashable, str]:
+        """Return the stored content hashes of the nodes with the given ids."""
+        records = self.read(
+            "MATCH (n:`{label}`) WHERE n.id IN $ids AND n.{key} IS NOT NULL "
+            "RETURN n.id, n.{key}".format(label=model_type, key=HASH_KEY),
+            {"ids": ids},
+        )
+        return {i: h for i, h in records}
+
+    def __call__(self, model_type: str, rows: List[Dict[str, Any]]) -> List[dict]:
+        """Return the rows that changed.
+
+        :param model_type: label of the rows
+        :param rows: rows with their :data:`HASH_KEY`
+        :return: changed rows
+        """
+        changed = []
+        for batch in iter_batches(rows, self.lookup_size):
+            existing = self.lookup(model_type, [row["id"] for row in batch])
+            for row in batch:
+                if existing.get(row["id"]) != row[HASH_KEY]:
+                    changed.append(row)
+        with self._lock:
+            self.skipped[model_type] += len(rows) - len(changed)
+            self.written[model_type] += len(changed)
+        return changed
+
+    def summary(self) -> str:
+        """Return a line per model type with the number of rows skipped and
+        written."""
+        lines = []
+        for model_type in sorted(set(self.skipped) | set(self.written)):
+            lines.append(
+                "{}: {} unchanged, {} written".format(
+                    model_type, self.skipped[model_type], self.written[model_type]
+                )
+            )
+        return "\n".join(lines)
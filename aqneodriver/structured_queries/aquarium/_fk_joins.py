@@ -0,0 +1,140 @@
+"""Compute relationships between models client-side from their foreign
+keys.
+
+The joins mirror the `MATCH (a) MATCH (b) WHERE a.x = b.y MERGE (a)-[]->(b)`
+statements of `structured_queries/cypher/relationships.cypher`, but are
+computed locally with a hash index per join rather than by the server
+joining whole labels. The resulting edges reference nodes by id, so they
+can be written with :class:`MergeEdges
+<aqneodriver.structured_queries.cypher.MergeEdges>` payloads.
+"""
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from pydent import ModelBase
+
+Edge = Tuple[Tuple[str, Hashable], Tuple[str, Hashable], Dict[str, Any]]
+
+
+class ForeignKeyJoin(NamedTuple):
+    """The relationship `(a:src_label) -[:etype]-> (b:tgt_label)` for every
+    pair where `a.src_key = b.tgt_key`, optionally restricted to nodes with
+    the given properties."""
+
+    src_label: str
+    src_key: str
+    etype: str
+    tgt_label: str
+    tgt_key: str
+    src_props: Dict[str, Any] = {}
+    tgt_props: Dict[str, Any] = {}
+
+
+#: joins mirroring the foreign key relationships of relationships.cypher
+FOREIGN_KEY_JOINS = [
+    ForeignKeyJoin("Sample", "sample_type_id", "hasMetaType", "SampleType", "id"),
+    ForeignKeyJoin("FieldValue", "field_type_id", "hasMetaType", "FieldType", "id"),
+    ForeignKeyJoin(
+        "SampleType",
+        "id",
+        "hasFieldType",
+        "FieldType",
+        "parent_id",
+        tgt_props={"parent_class": "SampleType"},
+    ),
+    ForeignKeyJoin(
+        "FieldValue",
+        "child_sample_id",
+        "hasSampleProperty",
+        "Sample",
+        "id",
+        src_props={"parent_class": "Sample"},
+    ),
+    ForeignKeyJoin(
+        "Sample",
+        "id",
+        "hasFieldValue",
+        "FieldValue",
+        "parent_id",
+        tgt_props={"parent_class": "Sample"},
+    ),
+    ForeignKeyJoin("Item", "object_type_id", "hasMetaType", "ObjectType", "id"),
+    ForeignKeyJoin("Item", "sample_id", "memberOf", "Sample", "id"),
+    ForeignKeyJoin(
+        "Operation", "operation_type_id", "hasMetaType", "OperationType", "id"
+    ),
+    ForeignKeyJoin(
+        "OperationType",
+        "id",
+        "hasFieldType",
+        "FieldType",
+        "parent_id",
+        tgt_props={"parent_class": "OperationType"},
+    ),
+    ForeignKeyJoin(
+        "FieldValue",
+        "child_item_id",
+        "hasItem",
+        "Item",
+        "id",
+        src_props={"parent_class": "Operation"},
+    ),
+    ForeignKeyJoin("Sample", "id", "hasItem", "Item", "child_sample_id"),
+]
+
+
+def _matches(data: Dict[str, Any], props: Dict[str, Any]) -> bool:
+    return all(data.get(k) == v for k, v in props.items())
+
+
+def iter_foreign_key_edges(
+    models: Iterable[ModelBase],
+    joins: Optional[List[ForeignKeyJoin]] = None,
+    edge_type_key: str = "type",
+) -> Iterator[Edge]:
+    """Iterate over the edges between models implied by their foreign keys.
+
+    For each join, the target models are indexed by `tgt_key` in a dict
+    and each source model is looked up by its `src_key`, so each join takes
+    linear time in the number of models. Only models in `models` are
+    joined; foreign keys to models that are not present produce no edge.
+
+    :param models: models (of any type)
+    :param joins: joins to compute (default: :data:`FOREIGN_KEY_JOINS`)
+    :param edge_type_key: key of the edge type in the edge data
+    :return: iterator of `((src_label, src_id), (tgt_label, tgt_id), edata)`
+    """
+    if joins is None:
+        joins = FOREIGN_KEY_JOINS
+
+    by_label = {}
+    for m in models:
+        by_label.setdefault(m.get_server_model_name(), list()).append(m._get_data())
+
+    for join in joins:
+        sources = by_label.get(join.src_label)
+        targets = by_label.get(join.tgt_label)
+        if not sources or not targets:
+            continue
+        index = {}
+        for data in targets:
+            value = data.get(join.tgt_key)
+            if value is not None and _matches(data, join.tgt_props):
+                index.setdefault(value, list()).append(data["id"])
+        for data in sources:
+            value = data.get(join.src_key)
+            if value is None or not _matches(data, join.src_props):
+                continue
+            for tgt_id in index.get(value, ()):
+                yield (
+                    (join.src_label, data["id"]),
+                    (join.tgt_label, tgt_id),
+                    {edge_type_key: join.etype},
+                )
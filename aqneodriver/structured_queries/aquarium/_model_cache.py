@@ -0,0 +1,338 @@
+"""Persistent on-disk cache of Aquarium models, shared across runs.
+
+The structured queries start every run with an empty pydent
+:class:`Browser <pydent.browser.Browser>`, so the same reference models
+(samples, sample types, field types, object types) are requested over HTTP
+by every task. A :class:`ModelCache` stores the data of these models in a
+SQLite database keyed by model class and id. While attached to a browser,
+lookups of models by id consult the cache before the Aquarium API, and the
+models fetched from the API are stored in the cache.
+
+Entries are validated by `updated_at`: storing a model whose `updated_at`
+differs from the cached entry replaces it (and counts as an invalidation),
+and entries older than `max_age` seconds are ignored and fetched again.
+Before cached entries are served, the server is asked for the requested
+models updated since their cached `updated_at` (a query returning only
+the models that changed), so a model edited in Aquarium is never served
+stale.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from pydent import Browser
+from pydent import ModelBase
+from pydent import ModelRegistry
+from pydent.interfaces import QueryInterface
+
+from aqneodriver.utils.batching import iter_batches
+from aqneodriver.utils.timestamps import sql_timestamp
+
+#: default location of the cache
+DEFAULT_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "aqneodriver", "models.db"
+)
+
+#: model classes cached by default
+DEFAULT_MODEL_CLASSES = ("Sample", "SampleType", "FieldType", "ObjectType")
+
+# max number of ids per statement (sqlite limits the number of parameters)
+_MAX_PARAMS = 500
+
+# max number of models revalidated per request
+_MAX_REVALIDATED = 500
+
+
+def _dump(m: ModelBase) -> Dict[str, Any]:
+    return {k: v for k, v in m._get_data().items() if k not in m.fields}
+
+
+class ModelCache:
+    """Persistent cache of Aquarium models.
+
+    .. code-block::
+
+        cache = ModelCache(max_bytes=2 ** 30)
+        payloads = aq_samples_to_cypher(aq, samples, model_cache=cache)
+        print(cache.summary())
+
+    :param path: path of the SQLite database (created if missing)
+    :param model_classes: names of the model classes to cache
+    :param max_entries: max number of cached models
+    :param max_bytes: max total size of the cached model data
+    :param max_age: seconds after which a cached model is fetched again
+        (never if None)
+    :param revalidate: if True, cached models served to an attached browser
+        are revalidated against the server (see :meth:`get`)
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        model_classes: Sequence[str] = DEFAULT_MODEL_CLASSES,
+        max_entries: Optional[int] = 10 ** 6,
+        max_bytes: Optional[int] = 2 ** 30,
+        max_age: Optional[float] = 24 * 60 * 60,
+        revalidate: bool = True,
+    ):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.model_classes = set(model_classes)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.revalidate = revalidate
+        self.hits = Counter()  #: models found in the cache, by model class
+        self.misses = Counter()  #: models not found in the cache, by model class
+        self.invalidated = Counter()  #: cached models that were updated, by model class
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS models ("
+                "model TEXT NOT NULL, id INTEGER NOT NULL, updated_at TEXT, "
+                "data TEXT NOT NULL, nbytes INTEGER NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+                "PRIMARY KEY (model, id))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS models_accessed_at ON models (accessed_at)"
+            )
+
+    def get(
+        self,
+        model_class: str,
+        ids: Iterable[Hashable],
+        interface: Optional[QueryInterface] = None,
+    ) -> Dict[Hashable, dict]:
+        """Return the cached data of the models with the given ids.
+
+        If an `interface` is given, the models updated since they were
+        cached are requested from the server, stored, and returned in place
+        of the cached data (and count as misses). Cached models without a
+        valid `updated_at` are not returned.
+
+        :param model_class: name of the model class
+        :param ids: model ids
+        :param interface: the model interface (e.g. `aq.Sample`) used to
+            revalidate the cached models
+        :return: dict of id to model data, for the ids found
+        """
+        ids = list(ids)
+        found = {}
+        now = time.time()
+        oldest = now - self.max_age if self.max_age is not None else float("-inf")
+        with self._lock, self._conn:
+            for batch in iter_batches(ids, _MAX_PARAMS):
+                params = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    "SELECT id, data FROM models WHERE model = ? AND stored_at >= ? "
+                    "AND id IN ({})".format(params),
+                    [model_class, oldest] + batch,
+                ).fetchall()
+                if not rows:
+                    continue
+                for i, data in rows:
+                    found[i] = json.loads(data)
+                self._conn.execute(
+                    "UPDATE models SET accessed_at = ? WHERE model = ? "
+                    "AND id IN ({})".format(",".join("?" * len(rows))),
+                    [now, model_class] + [i for i, _ in rows],
+                )
+        updated = {}
+        if interface is not None and found:
+            updated = self._updated(interface, found)
+        with self._lock:
+            self.hits[model_class] += len(found) - len(updated)
+            self.misses[model_class] += len(ids) - len(found) + len(updated)
+        return found
+
+    def _updated(
+        self, interface: QueryInterface, found: Dict[Hashable, dict]
+    ) -> Dict[Hashable, dict]:
+        """Request the models updated on the server since they were cached,
+        replace their entries and data in `found`, and remove the entries
+        without a valid `updated_at` from `found`.
+
+        :return: dict of id to the updated model data
+        """
+        criteria = []
+        for i, data in list(found.items()):
+            try:
+                updated_at = sql_timestamp(data["updated_at"])
+            except (KeyError, TypeError, AttributeError, ValueError):
+                del found[i]
+                continue
+            criteria.append(
+                "(id = {} AND updated_at > '{}')".format(int(i), updated_at)
+            )
+        models = []
+        for batch in iter_batches(criteria, _MAX_REVALIDATED):
+            models += interface.where(" OR ".join(batch))
+        self.put(models)
+        updated = {m.id: _dump(m) for m in models if m.id in found}
+        found.update(updated)
+        return updated
+
+    def put(self, models: Iterable[ModelBase]):
+        """Store models in the cache, replacing the cached models that were
+        updated since, then evict models beyond the size limits.
+
+        :param models: models (models of other classes than
+            :attr:`model_classes` are ignored)
+        """
+        grouped = {}
+        for m in models:
+            name = m.__class__.__name__
+            if name in self.model_classes and m.id is not None:
+                grouped.setdefault(name, {})[m.id] = _dump(m)
+        if not grouped:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            for model_class, rows in grouped.items():
+                for batch in iter_batches(list(rows), _MAX_PARAMS):
+                    cached = self._conn.execute(
+                        "SELECT id, updated_at FROM models WHERE model = ? "
+                        "AND id IN ({})".format(",".join("?" * len(batch))),
+                        [model_class] + batch,
+                    ).fetchall()
+                    for i, updated_at in cached:
+                        if updated_at != rows[i].get("updated_at"):
+                            self.invalidated[model_class] += 1
+                    values = []
+                    for i in batch:
+                        data = json.dumps(rows[i], default=str)
+                        values.append(
+                            (
+                                model_class,
+                                i,
+                                rows[i].get("updated_at"),
+                                data,
+                                len(data),
+                                now,
+                                now,
+                            )
+                        )
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        values,
+                    )
+            self._evict()
+
+    def _evict(self):
+        """Delete the least recently accessed models beyond the size
+        limits."""
+        n, nbytes = self._conn.execute(
+            "SELECT count(*), coalesce(sum(nbytes), 0) FROM models"
+        ).fetchone()
+        excess_entries = n - self.max_entries if self.max_entries is not None else 0
+        excess_bytes = nbytes - self.max_bytes if self.max_bytes is not None else 0
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return
+        evicted = []
+        for model_class, i, size in self._conn.execute(
+            "SELECT model, id, nbytes FROM models ORDER BY accessed_at"
+        ):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            evicted.append((model_class, i))
+            excess_entries -= 1
+            excess_bytes -= size
+        self._conn.executemany("DELETE FROM models WHERE model = ? AND id = ?", evicted)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM models").fetchone()[0]
+
+    def clear(self):
+        """Delete every cached model."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM models")
+
+    def close(self):
+        self._conn.close()
+
+    def _preload(self, browser: Browser, model_class: str, ids: List[Hashable]):
+        """Load the cached models missing from the browser into the
+        browser."""
+        in_browser = browser.model_cache.get(model_class, {})
+        missing = [i for i in ids if i not in in_browser]
+        if not missing:
+            return []
+        interface = browser.interface(model_class) if self.revalidate else None
+        found = self.get(model_class, missing, interface)
+        if not found:
+            return []
+        model = ModelRegistry.get_model(model_class)
+        models = model.load_from(list(found.values()), browser.session)
+        browser.update_cache(models, recursive=False)
+        return list(found)
+
+    @contextmanager
+    def attach(self, browser: Browser):
+        """Consult the cache when the browser finds models by id, and store
+        the models the browser fetched from Aquarium on exit.
+
+        :param browser: the browser
+        """
+        cached_where = browser.cached_where
+        cached_find = browser.cached_find
+        served = set()
+
+        def where(query, model, primary_key="id", **kwargs):
+            if (
+                model in self.model_classes
+                and isinstance(query, dict)
+                and list(query) == [primary_key]
+                and primary_key == "id"
+            ):
+                ids = query[primary_key]
+                if not isinstance(ids, list):
+                    ids = [ids]
+                served.update((model, i) for i in self._preload(browser, model, ids))
+            return cached_where(query, model, primary_key=primary_key, **kwargs)
+
+        def find(model_class, id):
+            if model_class in self.model_classes and not isinstance(id, list):
+                served.update(
+                    (model_class, i) for i in self._preload(browser, model_class, [id])
+                )
+            return cached_find(model_class, id)
+
+        browser.cached_where = where
+        browser.cached_find = find
+        try:
+            yield self
+        finally:
+            del browser.cached_where
+            del browser.cached_find
+        self.put(
+            m for m in browser.models if (m.__class__.__name__, m.id) not in served
+        )
+
+    def summary(self) -> str:
+        """Return a line per model class with the cache hits and misses."""
+        lines = []
+        for model_class in sorted(set(self.hits) | set(self.misses)):
+            lines.append(
+                "{}: {} hits, {} misses, {} updated".format(
+                    model_class,
+                    self.hits[model_class],
+                    self.misses[model_class],
+                    self.invalidated[model_class],
+                )
+            )
+        return "\n".join(lines)
@@ -0,0 +1,212 @@
+"""Concurrent pagination of Aquarium queries.
+
+:meth:`QueryInterface.pagination <pydent.interfaces.QueryInterface.pagination>`
+requests a page only once the previous page was received, so a large query
+on a slow server mostly waits on network latency. :func:`iter_pages`
+requests the next `max_in_flight` pages (by offset) at once, in threads, and
+yields them in order as they arrive.
+
+A query on a long list of ids (e.g. the items of 100k samples) makes a huge
+request and a slow server-side query. :func:`fetch_sharded` splits the list
+into shards of `shard_size` ids, requests the shards concurrently and
+retries the shards that fail.
+"""
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+import requests
+from pydent import Browser
+from pydent import ModelBase
+from pydent.exceptions import TridentRequestError
+from pydent.exceptions import TridentTimeoutError
+from pydent.interfaces import QueryInterface
+
+from aqneodriver.loggers import logger
+from aqneodriver.utils.batching import iter_batches
+
+#: default number of models requested per page
+DEFAULT_PAGE_SIZE = 1000
+
+#: default max number of pages requested at once
+DEFAULT_MAX_IN_FLIGHT = 4
+
+#: default max number of ids in a single request
+DEFAULT_SHARD_SIZE = 500
+
+#: default number of times a failed shard is requested again
+DEFAULT_RETRIES = 2
+
+#: errors after which a shard is requested again
+RETRY_ERRORS = (
+    TridentRequestError,
+    TridentTimeoutError,
+    requests.exceptions.RequestException,
+)
+
+PageCallback = Callable[[int, List[ModelBase]], Any]
+
+
+def iter_pages(
+    interface: QueryInterface,
+    query: Dict[str, Any],
+    page_size: int = DEFAULT_PAGE_SIZE,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    *,
+    methods: Optional[List[str]] = None,
+    include: Optional[List[str]] = None,
+    opts: Optional[Dict[str, Any]] = None,
+    page_callback: Optional[PageCallback] = None
+) -> Iterator[List[ModelBase]]:
+    """Yield the pages of a query, requesting up to `max_in_flight` pages
+    at once.
+
+    Pages are yielded in order. The query stops at the first page with
+    less than `page_size` models, or at the `limit` option.
+
+    :param interface: the model interface (e.g. `aq.Item`)
+    :param query: the query
+    :param page_size: number of models per page
+    :param max_in_flight: max number of pages requested at once
+    :param methods: server side methods
+    :param include: relationships to include
+    :param opts: additional options ("limit", "reverse", etc.)
+    :param page_callback: called with (page_num, models) for each page, as
+        by :meth:`QueryInterface.pagination
+        <pydent.interfaces.QueryInterface.pagination>`
+    :return: iterator of lists of models
+    """
+    opts = dict(opts or {})
+    limit = opts.get("limit", -1)
+
+    def fetch(offset: int) -> List[ModelBase]:
+        page_opts = dict(opts)
+        page_opts["offset"] = offset
+        page_opts["limit"] = page_size
+        if limit >= 0:
+            page_opts["limit"] = min(page_size, limit - offset)
+        return interface.where(query, methods=methods, include=include, opts=page_opts)
+
+    offsets = iter(range(0, limit if limit >= 0 else 2 ** 63, page_size))
+    with ThreadPoolExecutor(max_in_flight) as executor:
+        in_flight = deque()
+        for offset in offsets:
+            in_flight.append(executor.submit(fetch, offset))
+            if len(in_flight) >= max_in_flight:
+                break
+        page_num = 0
+        try:
+            while in_flight:
+                models = in_flight.popleft().result()
+                if not models:
+                    return
+                yield models
+                if page_callback:
+                    page_callback(page_num, models)
+                page_num += 1
+                if len(models) < page_size:
+                    return
+                offset = next(offsets, None)
+                if offset is not None:
+                    in_flight.append(executor.submit(fetch, offset))
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def _cache_unique(
+    browser: Browser, model_class: str, pages: Iterable[List[ModelBase]]
+) -> List[ModelBase]:
+    models = {}
+    for page in pages:
+        for m in page:
+            models.setdefault(m.id, m)
+    if not models:
+        return []
+    return browser.update_cache(list(models.values())).get(model_class, [])
+
+
+def fetch_sharded(
+    browser: Browser,
+    model_class: str,
+    query: Dict[str, Any],
+    key: str,
+    ids: Iterable[Hashable],
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    *,
+    page_size: Optional[int] = DEFAULT_PAGE_SIZE,
+    opts: Optional[Dict[str, Any]] = None,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = 1.0,
+    page_callback: Optional[PageCallback] = None
+) -> List[ModelBase]:
+    """Fetch the models matching `query` and `key IN ids`, requesting
+    shards of at most `shard_size` ids concurrently, and add the models to
+    the browser cache.
+
+    A shard failing with one of :data:`RETRY_ERRORS` is requested again
+    (from its first page) up to `retries` times, waiting `backoff`
+    seconds, then twice as long, etc. The models returned by several
+    shards are deduplicated by id.
+
+    :param browser: the browser
+    :param model_class: name of the model class
+    :param query: the query, without `key`
+    :param key: the key of the ids (e.g. "sample_id")
+    :param ids: the ids
+    :param shard_size: max number of ids per shard
+    :param max_in_flight: max number of requests at once, shared by the
+        shards and the pages of each shard
+    :param page_size: number of models per page (no pagination if None)
+    :param opts: additional options ("limit", "reverse", etc.)
+    :param retries: number of times a failed shard is requested again
+    :param backoff: seconds to wait before the first retry
+    :param page_callback: called with (shard_num, models) for each shard
+    :return: the models, as cached in the browser
+    """
+    shards = list(iter_batches(list(dict.fromkeys(ids)), shard_size))
+    if not shards:
+        return []
+    interface = browser.interface(model_class)
+    pages_in_flight = max(1, max_in_flight // len(shards))
+
+    def fetch(shard: List[Hashable]) -> List[ModelBase]:
+        shard_query = dict(query)
+        shard_query[key] = shard
+        for attempt in range(retries + 1):
+            try:
+                if page_size is None:
+                    return interface.where(shard_query, opts=dict(opts or {}))
+                models = []
+                for page in iter_pages(
+                    interface, shard_query, page_size, pages_in_flight, opts=opts
+                ):
+                    models += page
+                return models
+            except RETRY_ERRORS as e:
+                if attempt == retries:
+                    raise
+                logger.warning(
+                    "{} shard of {} ids failed ({}), retrying".format(
+                        model_class, len(shard), e
+                    )
+                )
+                time.sleep(backoff * 2 ** attempt)
+
+    def iter_shards():
+        with ThreadPoolExecutor(min(max_in_flight, len(shards))) as executor:
+            for shard_num, models in enumerate(executor.map(fetch, shards)):
+                if page_callback:
+                    page_callback(shard_num, models)
+                yield models
+
+    return _cache_unique(browser, model_class, iter_shards())
@@ -0,0 +1,182 @@
+"""Reference data (the Aquarium type models), loaded once per run.
+
+The structured queries resolve the `sample_type`, `field_types`,
+`field_type` and `object_type` relationships of every batch of models, at
+every level of the traversal. The type tables are small and rarely change,
+so :class:`ReferenceData` loads all of them at once (from Aquarium, or from
+a JSON snapshot saved by a previous run) and injects them into the browser
+of each query. Relationships fetched by id (e.g. `Sample.sample_type`,
+`FieldValue.field_type`, `Item.object_type`) are then found in the browser
+cache, and the relationships between the type models themselves (e.g.
+`SampleType.field_types`) are linked beforehand, so the browser only
+requests instance data from Aquarium.
+
+Types created after the reference data was loaded are still fetched from
+Aquarium, but field types added to an existing sample type are only seen
+once the snapshot expires (see `max_age`).
+"""
+import json
+import os
+import time
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from pydent import AqSession
+from pydent import Browser
+from pydent import ModelBase
+from pydent import ModelRegistry
+
+#: model classes loaded by default
+REFERENCE_MODELS = ("SampleType", "FieldType", "ObjectType", "OperationType")
+
+
+def _dump(m: ModelBase) -> Dict[str, Any]:
+    return {k: v for k, v in m._get_data().items() if k not in m.fields and k != "rid"}
+
+
+class ReferenceData:
+    """The data of every model of the reference model classes.
+
+    .. code-block::
+
+        reference_data = ReferenceData.load_or_fetch(aq, "types.json")
+        payloads = aq_samples_to_cypher(aq, samples, reference_data=reference_data)
+
+    :param rows: dict of model class to the data of its models
+    :param created_at: time the data was fetched from Aquarium
+    """
+
+    def __init__(
+        self, rows: Dict[str, List[Dict[str, Any]]], created_at: Optional[float] = None
+    ):
+        self.rows = rows
+        self.created_at = time.time() if created_at is None else created_at
+
+    @classmethod
+    def fetch(
+        cls, aq: AqSession, model_classes: Sequence[str] = REFERENCE_MODELS
+    ) -> "ReferenceData":
+        """Fetch every model of the model classes from Aquarium.
+
+        :param aq: the Aquarium session
+        :param model_classes: names of the model classes
+        :return: the reference data
+        """
+        rows = {}
+        for model_class in model_classes:
+            rows[model_class] = [_dump(m) for m in getattr(aq, model_class).all()]
+        return cls(rows)
+
+    def save(self, path: str):
+        """Save a JSON snapshot of the reference data."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {"created_at": self.created_at, "rows": self.rows}, f, default=str
+            )
+
+    @classmethod
+    def load(
+        cls, path: str, max_age: Optional[float] = None
+    ) -> Optional["ReferenceData"]:
+        """Load a JSON snapshot of the reference data.
+
+        :param path: path of the snapshot
+        :param max_age: seconds after which the snapshot is ignored (never if
+            None)
+        :return: the reference data, or None if the snapshot is missing or
+            too old
+        """
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r") as f:
+            data = json.load(f)
+        if max_age is not None and time.time() - data["created_at"] > max_age:
+            return None
+        return cls(data["rows"], created_at=data["created_at"])
+
+    @classmethod
+    def load_or_fetch(
+        cls,
+        aq: AqSession,
+        path: Optional[str] = None,
+        max_age: Optional[float] = 24 * 60 * 60,
+        model_classes: Sequence[str] = REFERENCE_MODELS,
+    ) -> "ReferenceData":
+        """Load the snapshot at `path` if it is recent enough, else fetch
+        the reference data from Aquarium and save the snapshot.
+
+        :param aq: the Aquarium session
+        :param path: path of the snapshot (never saved if None)
+        :param max_age: seconds after which the snapshot is fetched again
+        :param model_classes: names of the model classes to fetch
+        :return: the reference data
+        """
+        if path is not None:
+            reference_data = cls.load(path, max_age=max_age)
+            if reference_data is not None:
+                return reference_data
+        reference_data = cls.fetch(aq, model_classes)
+        if path is not None:
+            reference_data.save(path)
+        return reference_data
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.rows.values())
+
+    def models(self, browser: Browser) -> Dict[str, Dict[Hashable, ModelBase]]:
+        """Return new models of the reference data, indexed by model class
+        and id, with the relationships between them linked.
+
+        :param browser: the browser whose session the models are bound to
+        :return: dict of model class to dict of id to model
+        """
+        indexed = {}
+        for model_class, rows in self.rows.items():
+            models = ModelRegistry.get_model(model_class).load_from(
+                rows, browser.session
+            )
+            indexed[model_class] = {m.id: m for m in models}
+        self._link(indexed)
+        return indexed
+
+    @staticmethod
+    def _link(indexed: Dict[str, Dict[Hashable, ModelBase]]):
+        # the browser resolves HasMany relationships with a query, even when
+        # every model is cached, so these are set explicitly
+        sample_types = indexed.get("SampleType", {})
+        operation_types = indexed.get("OperationType", {})
+        parents = {"SampleType": sample_types, "OperationType": operation_types}
+        field_types = {
+            name: {i: [] for i in models} for name, models in parents.items()
+        }
+        for ft in indexed.get("FieldType", {}).values():
+            parent = parents.get(ft.parent_class, {}).get(ft.parent_id)
+            if parent is None:
+                continue
+            field_types[ft.parent_class][ft.parent_id].append(ft)
+            if ft.parent_class == "SampleType":
+                ft.sample_type = parent
+            else:
+                ft.operation_type = parent
+        if "FieldType" in indexed:
+            for name, models in parents.items():
+                for i, m in models.items():
+                    m.field_types = field_types[name][i]
+        for ot in indexed.get("ObjectType", {}).values():
+            if ot.sample_type_id in sample_types:
+                ot.sample_type = sample_types[ot.sample_type_id]
+
+    def inject(self, browser: Browser) -> List[ModelBase]:
+        """Add the reference models to the browser cache.
+
+        :param browser: the browser
+        :return: the models added
+        """
+        models = [m for by_id in self.models(browser).values() for m in by_id.values()]
+        browser.update_cache(models, recursive=False)
+        return models
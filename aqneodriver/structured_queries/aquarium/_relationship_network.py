@@ -1,5 +1,13 @@
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import NamedTuple
 from typing import Optional
+from typing import Set
+from typing import Tuple
 
 import networkx as nx
 from pydent import Browser
@@ -13,6 +21,99 @@ from ._types import NewEdgeCallback
 from ._types import NewNodeCallback
 
 
+class Level(NamedTuple):
+    """Models and edges discovered at one level of a traversal."""
+
+    depth: int  #: number of relationships from the starting models
+    nodes: List[Tuple[Hashable, ModelBase, Dict[str, Any]]]  #: (key, model, ndata)
+    edges: List[Tuple[Hashable, Hashable, Dict[str, Any]]]  #: (key2, key1, edata)
+
+
+def _default_key_func(m: ModelBase) -> Tuple[Hashable, Dict[str, Any]]:
+    return (m.__class__.__name__, m._primary_key), {}
+
+
+def _iter_levels(
+    browser: Browser,
+    models: Iterable[ModelBase],
+    get_models: GetModelsCallable,
+    cache_func: Optional[CacheFuncCallable],
+    key_func: KeyFuncCallable,
+    visited: Set[Hashable],
+    strict_cache: bool = True,
+    max_depth: Optional[int] = None,
+    max_frontier: Optional[int] = None,
+) -> Iterator[Level]:
+    """Iterative breadth first traversal of model relationships.
+
+    Yields one :class:`Level` per frontier slice. The first level contains
+    the (unvisited) starting models and no edges. Each following level
+    contains the models first discovered from the previous frontier and
+    every edge from the previous frontier, including edges to models that
+    were already visited. The key of each model is computed exactly once,
+    when it is discovered, and `visited` (a set of keys) is updated in
+    place.
+
+    :param max_depth: max number of levels to expand beyond the starting
+        models (unbounded if None)
+    :param max_frontier: max number of models expanded at a time. Larger
+        frontiers are expanded in slices of this size, each with its own
+        `cache_func` call, which bounds the size of each cache request.
+    """
+    if strict_cache:
+        kwargs = {"using_requests": False, "session_swap": True}
+    else:
+        kwargs = {}
+
+    frontier = []
+    nodes = []
+    for m in models:
+        key, ndata = key_func(m)
+        if key not in visited:
+            visited.add(key)
+            frontier.append((key, m))
+            nodes.append((key, m, ndata))
+    if not frontier:
+        return
+    yield Level(0, nodes, [])
+
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        depth += 1
+        next_frontier = []
+        if max_frontier:
+            chunks = (
+                frontier[i : i + max_frontier]
+                for i in range(0, len(frontier), max_frontier)
+            )
+        else:
+            chunks = [frontier]
+        for chunk in chunks:
+            if cache_func:
+                cache_func(browser, [m for _, m in chunk])
+            nodes = []
+            edges = []
+            with browser.session(**kwargs):
+                try:
+                    for k1, m1 in chunk:
+                        for m2, edata in get_models(browser, m1):
+                            k2, ndata = key_func(m2)
+                            if k2 not in visited:
+                                visited.add(k2)
+                                next_frontier.append((k2, m2))
+                                nodes.append((k2, m2, ndata))
+                            edges.append((k2, k1, edata))
+                except ForbiddenRequestError as e:
+                    msg = (
+                        "An exception occurred while strict_cache == True.\n"
+                        "This is most likely due to the cache_func not being"
+                        " thorough.\n{}".format(str(e))
+                    )
+                    raise e.__class__(msg)
+            yield Level(depth, nodes, edges)
+        frontier = next_frontier
+
+
 def relationship_network(
     browser: Browser,
     models: List[ModelBase],
@@ -24,10 +125,17 @@ def relationship_network(
     strict_cache: bool = True,
     new_node_callback: Optional[NewNodeCallback] = None,
     new_edge_callback: Optional[NewEdgeCallback] = None,
+    max_depth: Optional[int] = None,
+    max_frontier: Optional[int] = None,
 ):
     """Build a DAG of related models based on some relationships. By default
     are built from a model using (model.__class__.__name__, model._primary_key)
 
+    The graph is built iteratively, one breadth first level at a time, so
+    the depth of the relationships is not limited by the recursion limit.
+    Each model is visited once (tracked in a set of keys) and its key is
+    computed once.
+
     .. seealso::
         Usage example :meth:`sample_network <pydent.browser.Browser.sample_network>`
 
@@ -44,131 +152,82 @@ def relationship_network(
     :param reverse: whether to reverse the edge list
     :param strict_cache: if True, if a request occurs after the cache step,
         a ForbiddenRequestException will be raised.
-    :param
     :param new_edge_callback:
     :param new_node_callback:
+    :param max_depth: max number of relationship levels to follow from
+        `models` (unbounded if None)
+    :param max_frontier: max number of models expanded (and passed to
+        `cache_func`) at a time (unbounded if None)
     :return: the relationship graph
     """
-
-    def add_node(g, key, ndata):
-        g.add_node(key, attr_dict=ndata)
-        if new_node_callback:
-            new_node_callback(key, ndata)
-
-    def add_edge(g, k1, k2, edata):
-        g.add_edge(k1, k2, attr_dict=edata)
-        if new_edge_callback:
-            new_edge_callback(k1, k2, edata)
-
     if key_func is None:
-
-        def key_func(m):
-            return (m.__class__.__name__, m._primary_key), {}
+        key_func = _default_key_func
 
     if g is None:
         g = nx.DiGraph()
 
-    models = list(models)
-
-    if not models:
-        return g
-
-    for m in models:
-        key, ndata = key_func(m)
-        add_node(g, key, ndata)
-
-    visited = list(g.nodes)
+    for level in _iter_levels(
+        browser,
+        models,
+        get_models,
+        cache_func,
+        key_func,
+        visited=set(g.nodes),
+        strict_cache=strict_cache,
+        max_depth=max_depth,
+        max_frontier=max_frontier,
+    ):
+        for key, _, ndata in level.nodes:
+            g.add_node(key, attr_dict=ndata)
+            if new_node_callback:
+                new_node_callback(key, ndata)
+        for n1, n2, edata in level.edges:
+            if reverse:
+                n1, n2 = n2, n1
+            g.add_edge(n1, n2, attr_dict=edata)
+            if new_edge_callback:
+                new_edge_callback(n1, n2, edata)
+
+    return g
+
+
+def iter_relationships(
+    browser: Browser,
+    models: List[ModelBase],
+    get_models: GetModelsCallable,
+    cache_func: Optional[CacheFuncCallable] = None,
+    key_func: Optional[KeyFuncCallable] = None,
+    strict_cache: bool = True,
+    max_depth: Optional[int] = None,
+    max_frontier: Optional[int] = None,
+) -> Iterator[Level]:
+    """Lazily traverse relationships, yielding each breadth first level as
+    soon as it is fetched.
 
-    if cache_func:
-        cache_func(browser, models)
+    Unlike :func:`relationship_network`, no graph is built, so the models of
+    the first levels can be consumed (e.g. written to the graph db) while
+    the next levels are still being fetched.
 
-    new_models = []
-    new_edges = []
+    .. code-block::
 
-    if strict_cache:
-        kwargs = {"using_requests": False, "session_swap": True}
-    else:
-        kwargs = {}
+        for level in iter_relationships(browser, models, get_models, cache_func):
+            for key, model, ndata in level.nodes:
+                ...
 
-    with browser.session(**kwargs):
-        try:
-            for m1 in models:
-                for m2, data in get_models(browser, m1):
-                    if key_func(m2)[0] not in visited:
-                        new_models.append(m2)
-                    new_edges.append((key_func(m2)[0], key_func(m1)[0], data))
-        except ForbiddenRequestError as e:
-            msg = (
-                "An exception occurred while strict_cache == True.\n"
-                "This is most likely due to the cache_func not being thorough.\n"
-                "{}".format(str(e))
-            )
-            raise e.__class__(msg)
-
-    for n1, n2, edata in new_edges:
-        if reverse:
-            add_edge(g, n2, n1, edata)
-        else:
-            add_edge(g, n1, n2, edata)
+    See :func:`relationship_network` for the arguments.
 
-    return relationship_network(
+    :return: iterator of :class:`Level`
+    """
+    if key_func is None:
+        key_func = _default_key_func
+    yield from _iter_levels(
         browser,
-        new_models,
+        models,
         get_models,
         cache_func,
-        key_func=key_func,
-        g=g,
-        reverse=reverse,
+        key_func,
+        visited=set(),
         strict_cache=strict_cache,
-        new_node_callback=new_node_callback,
-        new_edge_callback=new_edge_callback,
+        max_depth=max_depth,
+        max_frontier=max_frontier,
     )
-
-
-def iter_relationships(browser, models, get_models, cache_func, key_func):
-    if key_func is None:
-        def key_func(m):
-            return (m.__class__.__name__, m._primary_key), {}
-    if cache_func:
-        cache_func(browser, models)
-    yield from _iter_relationships(browser, models, get_models, cache_func, key_func, _visited=set())
-
-
-def _iter_relationships(
-    browser, models, get_models, cache_func, key_func,
-    _visited=None, strict_cache: bool = True,
-        yield_nodes: bool = True,
-        yield_edges: bool = False
-):
-    if strict_cache:
-        kwargs = {"using_requests": False, "session_swap": True}
-    else:
-        kwargs = {}
-    if cache_func:
-        cache_func(browser, models)
-
-    new_models = []
-    with browser.session(**kwargs):
-        try:
-            for m1 in models:
-                k1 = key_func(m1)[0]
-                for m2, edata in get_models(browser, m1):
-                    k2, ndata = key_func(m2)[0]
-                    if k2 not in _visited:
-                        _visited[k2] = ndata
-                        new_models.append(m2)
-                        if yield_nodes:
-                            yield m2, ndata
-                    if yield_edges:
-                        yield k1, k2, edata
-        except ForbiddenRequestError as e:
-            msg = (
-                "An exception occurred while strict_cache == True.\n"
-                "This is most likely due to the cache_func not being thorough.\n"
-                "{}".format(str(e))
-            )
-            raise e.__class__(msg)
-    yield from _iter_relationships(
-        browser, models, get_models, cache_func, key_func,
-        _visited=_visited, strict_cache=strict_cache,
-        yield_nodes=yield_nodes, yield_edges=yield_edges)
\ No newline at end of file
@@ -1,15 +1,37 @@
+import json
 from abc import abstractmethod
+from contextlib import contextmanager
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Tuple
 
 from pydent import AqSession
 from pydent import ModelBase
 
 from aqneodriver.payload import Payload
+from aqneodriver.structured_queries.aquarium._content_hash import content_hash
+from aqneodriver.structured_queries.aquarium._content_hash import HASH_KEY
+from aqneodriver.structured_queries.aquarium._fk_joins import iter_foreign_key_edges
+from aqneodriver.structured_queries.aquarium._model_cache import ModelCache
+from aqneodriver.structured_queries.aquarium._reference_data import ReferenceData
 from aqneodriver.structured_queries.aquarium._types import NewNodeCallback
+from aqneodriver.structured_queries.aquarium._types import RowFilter
+from aqneodriver.structured_queries.cypher import MergeEdges
 from aqneodriver.structured_queries.cypher import MergeModels
 from aqneodriver.utils.abstract_interface import abstract_interface
 from aqneodriver.utils.abstract_interface import AbstractInterface
+from aqneodriver.utils.batching import iter_batches
+
+#: default max number of rows in a single MergeModels payload
+DEFAULT_BATCH_SIZE = 1000
+
+#: default max (approximate) serialized size of the rows of a single payload
+DEFAULT_BATCH_BYTES = 2 ** 20
 
 
 def dump(m: ModelBase) -> dict:
@@ -17,6 +39,60 @@ def dump(m: ModelBase) -> dict:
     return data
 
 
+def dump_with_hash(m: ModelBase) -> dict:
+    """Dump a model along with the content hash of its properties (see
+    :func:`content_hash
+    <aqneodriver.structured_queries.aquarium._content_hash.content_hash>`)."""
+    data = dump(m)
+    data[HASH_KEY] = content_hash(data)
+    return data
+
+
+def _row_nbytes(row: dict) -> int:
+    return len(json.dumps(row, default=str))
+
+
+def edges_to_payloads(
+    edges: Iterable[Tuple[Tuple[str, Hashable], Tuple[str, Hashable], Dict[str, Any]]],
+    edge_type_key: str = "type",
+    batch_size: Optional[int] = None,
+    batch_bytes: Optional[int] = None,
+) -> List[Payload]:
+    """Convert edges to :class:`MergeEdges` payloads.
+
+    Edges are grouped by (source label, edge type, target label), as
+    the labels and type cannot be query parameters, and each group is
+    split into payloads like
+    :meth:`StructuredAquariumQuery.models_to_payloads`. Edges without an
+    edge type are skipped.
+
+    :param edges: iterable of `((label1, id1), (label2, id2), edata)`
+    :param edge_type_key: key of the edge type in `edata`
+    :param batch_size: max number of edges per payload (unbounded if None)
+    :param batch_bytes: max serialized bytes per payload (unbounded if None)
+    :return: list of payloads
+    """
+    grouped = {}
+    for (label1, id1), (label2, id2), edata in edges:
+        etype = edata.get(edge_type_key)
+        if etype is None:
+            continue
+        grouped.setdefault((label1, etype, label2), list())
+        grouped[(label1, etype, label2)].append({"src": id1, "tgt": id2})
+
+    payloads = []
+    for (src_label, etype, tgt_label), rows in grouped.items():
+        for batch in iter_batches(
+            rows, batch_size, max_bytes=batch_bytes, sizeof=_row_nbytes
+        ):
+            payloads.append(
+                MergeEdges(edges=batch).payload(
+                    src_label=src_label, etype=etype, tgt_label=tgt_label
+                )
+            )
+    return payloads
+
+
 # TODO: refactor queries
 @abstract_interface
 class StructuredAquariumQuery(AbstractInterface):
@@ -24,7 +100,51 @@ class StructuredAquariumQuery(AbstractInterface):
     DEFAULT_WRITE_MODE = "CREATE"
 
     @staticmethod
-    def models_to_payloads(models: List[ModelBase]) -> List[Payload]:
+    @contextmanager
+    def cached_session(
+        aq: AqSession, timeout: int, model_cache: Optional[ModelCache] = None
+    ) -> Iterator[AqSession]:
+        """Open a cached Aquarium session, consulting the persistent model
+        cache (if any) before the Aquarium API.
+
+        :param aq: the Aquarium session
+        :param timeout: timeout of the cached session
+        :param model_cache: persistent cache attached to the session browser
+            (see :meth:`ModelCache.attach
+            <aqneodriver.structured_queries.aquarium._model_cache.ModelCache.attach>`)
+        :return: the cached session
+        """
+        with aq.with_cache(timeout=timeout) as sess:
+            if model_cache is None:
+                yield sess
+            else:
+                with model_cache.attach(sess.browser):
+                    yield sess
+
+    @staticmethod
+    def models_to_payloads(
+        models: List[ModelBase],
+        batch_size: Optional[int] = None,
+        batch_bytes: Optional[int] = None,
+        row_filter: Optional[RowFilter] = None,
+    ) -> List[Payload]:
+        """Convert models to :class:`MergeModels` payloads.
+
+        Models are grouped by model type. Each group is split into
+        payloads of at most `batch_size` rows and `batch_bytes` (approximate)
+        serialized bytes, so that large groups become many evenly sized
+        transactions that the pool can write in parallel, rather than one
+        huge UNWIND. Each row carries the content hash of its properties.
+
+        :param models: list of models
+        :param batch_size: max number of rows per payload (unbounded if None)
+        :param batch_bytes: max serialized bytes per payload (unbounded if None)
+        :param row_filter: called with the model type and rows of each group,
+            returning the rows to write (e.g. a :class:`ContentHashFilter
+            <aqneodriver.structured_queries.aquarium._content_hash.ContentHashFilter>`
+            to skip unchanged rows)
+        :return: list of payloads
+        """
         grouped_by_class = {}
         for m in models:
             grouped_by_class.setdefault(m.get_server_model_name(), list())
@@ -32,10 +152,16 @@ class StructuredAquariumQuery(AbstractInterface):
 
         payloads = []
         for model_type, model_list in grouped_by_class.items():
-            query_str, query_data = MergeModels(
-                datalist=[dump(m) for m in model_list]
-            ).payload(model_type=model_type)
-            payloads.append(Payload(query_str, query_data))
+            rows = [dump_with_hash(m) for m in model_list]
+            if row_filter is not None:
+                rows = row_filter(model_type, rows)
+            for datalist in iter_batches(
+                rows, batch_size, max_bytes=batch_bytes, sizeof=_row_nbytes
+            ):
+                query_str, query_data = MergeModels(datalist=datalist).payload(
+                    model_type=model_type
+                )
+                payloads.append(Payload(query_str, query_data))
         return payloads
 
     @abstractmethod
@@ -44,7 +170,9 @@ class StructuredAquariumQuery(AbstractInterface):
         aq: AqSession,
         models: List[ModelBase],
         *,
-        new_node_callback: Optional[NewNodeCallback] = None
+        new_node_callback: Optional[NewNodeCallback] = None,
+        model_cache: Optional[ModelCache] = None,
+        reference_data: Optional[ReferenceData] = None
     ) -> List[ModelBase]:
         pass
 
@@ -53,7 +181,52 @@ class StructuredAquariumQuery(AbstractInterface):
         aq: AqSession,
         models: List[ModelBase],
         *,
-        new_node_callback: Optional[NewNodeCallback] = None
-    ):
-        models = self.run(aq, models, new_node_callback=new_node_callback)
-        return self.models_to_payloads(models)
+        new_node_callback: Optional[NewNodeCallback] = None,
+        batch_size: Optional[int] = DEFAULT_BATCH_SIZE,
+        batch_bytes: Optional[int] = DEFAULT_BATCH_BYTES,
+        edges: bool = False,
+        row_filter: Optional[RowFilter] = None,
+        model_cache: Optional[ModelCache] = None,
+        reference_data: Optional[ReferenceData] = None
+    ) -> List[Payload]:
+        """Collect models and convert them to payloads.
+
+        :param aq: the Aquarium session
+        :param models: models to start from
+        :param new_node_callback: callback called on each new model
+        :param batch_size: max number of rows per payload (unbounded if None)
+        :param batch_bytes: max serialized bytes per payload (unbounded if None)
+        :param edges: if True, also return :class:`MergeEdges` payloads for
+            the relationships between the collected models implied by their
+            foreign keys (see :func:`iter_foreign_key_edges
+            <aqneodriver.structured_queries.aquarium._fk_joins.iter_foreign_key_edges>`)
+        :param row_filter: filter of the rows to write (see
+            :meth:`models_to_payloads`)
+        :param model_cache: persistent model cache consulted before the
+            Aquarium API (see :meth:`cached_session`)
+        :param reference_data: type models injected into the browser, so
+            that only instance data is requested from Aquarium (see
+            :class:`ReferenceData
+            <aqneodriver.structured_queries.aquarium._reference_data.ReferenceData>`)
+        :return: list of payloads
+        """
+        models = self.run(
+            aq,
+            models,
+            new_node_callback=new_node_callback,
+            model_cache=model_cache,
+            reference_data=reference_data,
+        )
+        payloads = self.models_to_payloads(
+            models,
+            batch_size=batch_size,
+            batch_bytes=batch_bytes,
+            row_filter=row_filter,
+        )
+        if edges:
+            payloads += edges_to_payloads(
+                iter_foreign_key_edges(models),
+                batch_size=batch_size,
+                batch_bytes=batch_bytes,
+            )
+        return payloads
@@ -1,10 +1,18 @@
 from typing import List
+from typing import Optional
 from typing import TypeVar
 
 from pydent import AqSession
 from pydent import Browser
 from pydent.models import Sample
 
+from ._model_cache import ModelCache
+from ._pagination import DEFAULT_MAX_IN_FLIGHT
+from ._pagination import DEFAULT_PAGE_SIZE
+from ._pagination import DEFAULT_RETRIES
+from ._pagination import DEFAULT_SHARD_SIZE
+from ._pagination import fetch_sharded
+from ._reference_data import ReferenceData
 from ._struct_aq_query import StructuredAquariumQuery
 from aqneodriver.utils.progress import infinite_task_context
 from rich.progress import Progress
@@ -15,14 +23,57 @@ _GT = TypeVar("GT")
 
 # TODO: set timeout
 class StructuredInvQuery(StructuredAquariumQuery):
-    def run(self, aq: AqSession, models: List[Sample], new_node_callback=None):
-        with aq.with_cache(timeout=60) as sess:
-            page_size = 1000
+    """Query Aquarium for the items of samples.
+
+    :param page_size: number of items requested per page
+    :param max_in_flight: max number of requests at once
+    :param shard_size: max number of sample ids per request
+    :param retries: number of times a failed request is sent again
+    """
+
+    def __init__(
+        self,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        retries: int = DEFAULT_RETRIES,
+    ):
+        self.page_size = page_size
+        self.max_in_flight = max_in_flight
+        self.shard_size = shard_size
+        self.retries = retries
+
+    def run(
+        self,
+        aq: AqSession,
+        models: List[Sample],
+        new_node_callback=None,
+        model_cache: Optional[ModelCache] = None,
+        reference_data: Optional[ReferenceData] = None,
+    ):
+        with self.cached_session(aq, timeout=60, model_cache=model_cache) as sess:
+            if reference_data is not None:
+                reference_data.inject(sess.browser)
             with Progress() as progress:
-                task0 = progress.add_task("getting items...", total=page_size*2)
+                task0 = progress.add_task("getting items...", total=self.page_size*2)
                 with infinite_task_context(progress, task_id=task0) as callback:
-                    items = sess.Item.where({"sample_id": [m.id for m in models]}, page_size=page_size, page_callback=callback)
+                    items = fetch_sharded(
+                        sess.browser,
+                        "Item",
+                        {},
+                        "sample_id",
+                        [m.id for m in models],
+                        self.shard_size,
+                        self.max_in_flight,
+                        page_size=self.page_size,
+                        retries=self.retries,
+                        page_callback=callback,
+                    )
                     sess.browser.get(items, {'object_type'})
-                    return list(sess.browser.models)
+                    # only the object types of the items, not every injected type
+                    object_types = {
+                        i.object_type.id: i.object_type for i in items if i.object_type
+                    }
+                    return items + list(object_types.values())
 
 aq_inventory_to_cypher = StructuredInvQuery()
@@ -10,12 +10,29 @@ from pydent.interfaces import QueryInterface
 from pydent.models import Sample
 from rich.progress import Progress
 
+from ._model_cache import ModelCache
+from ._pagination import DEFAULT_MAX_IN_FLIGHT
+from ._pagination import DEFAULT_PAGE_SIZE
+from ._pagination import DEFAULT_RETRIES
+from ._pagination import DEFAULT_SHARD_SIZE
+from ._pagination import fetch_sharded
+from ._pagination import iter_pages
+from ._reference_data import ReferenceData
 from ._struct_aq_query import StructuredAquariumQuery
 from ._types import NewNodeCallback
 from aqneodriver.utils.progress import infinite_task_context
 
-def paginated_query(interface: QueryInterface, *queries, page_size=50, callback=None):
-    pages_list = [interface.pagination(query, page_size=page_size) for query in queries]
+def paginated_query(
+    interface: QueryInterface,
+    *queries,
+    page_size=50,
+    callback=None,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+):
+    pages_list = [
+        iter_pages(interface, query, page_size=page_size, max_in_flight=max_in_flight)
+        for query in queries
+    ]
     models = []
     for page in chain(*pages_list):
         if callback:
@@ -24,41 +41,71 @@ def paginated_query(interface: QueryInterface, *queries, page_size=50, callback=
     return models
 
 
-
 class StructuredJobQuery(StructuredAquariumQuery):
+    """Query Aquarium for the operations, plans and jobs of samples.
+
+    :param page_size: number of field values requested per page
+    :param max_in_flight: max number of requests at once
+    :param shard_size: max number of sample ids per request
+    :param retries: number of times a failed request is sent again
+    """
+
+    def __init__(
+        self,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        retries: int = DEFAULT_RETRIES,
+    ):
+        self.page_size = page_size
+        self.max_in_flight = max_in_flight
+        self.shard_size = shard_size
+        self.retries = retries
+
     def run(
         self,
         aq: AqSession,
         models: List[Sample],
         *,
-        new_node_callback: Optional[NewNodeCallback] = None
+        new_node_callback: Optional[NewNodeCallback] = None,
+        model_cache: Optional[ModelCache] = None,
+        reference_data: Optional[ReferenceData] = None
     ) -> List[ModelBase]:
-        with aq.with_cache(timeout=60) as sess:
+        # `reference_data` is not used: every model of the browser is
+        # returned, so every injected type would be written
+        with self.cached_session(aq, timeout=60, model_cache=model_cache) as sess:
             sess: AqSession
-            # non_browser_sess = aq(using_cache=False)
-            page_size = 1000
             browser: Browser = sess.browser
             with Progress() as progress:
-                task0 = progress.add_task("collecting samples", total=page_size*2)
+                task0 = progress.add_task(
+                    "collecting samples", total=self.page_size * 2
+                )
                 with infinite_task_context(progress, task0) as callback:
-                    query = {
-                        '__model__': 'FieldValue',
-                        '__query__': {
-                            'parent_class': 'Operation',
-                            'child_sample_id': [m.id for m in models],
-                            '__return__': {
-                                'operation': {
-                                    'plan_associations': {},
-                                    'job_associations': {},
-                                    'operation_type': 'field_types',
-                                    'field_values': {
-                                        'sample', 'item'
-                                    }
-                                },
-                                'field_type': {}
-                            }
-                        }
-                    }
-                    results = sess.query(query, use_cache=True, page_size=page_size, page_callback=callback)
-                    browser.update_cache(results)
+                    field_values = fetch_sharded(
+                        browser,
+                        "FieldValue",
+                        {"parent_class": "Operation"},
+                        "child_sample_id",
+                        [m.id for m in models],
+                        self.shard_size,
+                        self.max_in_flight,
+                        page_size=self.page_size,
+                        opts={"reverse": True},
+                        retries=self.retries,
+                        page_callback=callback,
+                    )
+                    browser.get(
+                        field_values,
+                        {
+                            "operation": {
+                                "plan_associations": {},
+                                "job_associations": {},
+                                "operation_type": "field_types",
+                                "field_values": {"sample", "item"},
+                            },
+                            "field_type": {},
+                        },
+                        page_size=self.page_size,
+                        page_callback=callback,
+                    )
             return list(browser.models)
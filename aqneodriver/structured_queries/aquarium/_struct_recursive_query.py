@@ -2,6 +2,9 @@ from abc import abstractmethod
 from typing import Any
 from typing import Dict
 from typing import Generator
+from typing import Hashable
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
 from typing import Tuple
@@ -11,12 +14,23 @@ from pydent import AqSession
 from pydent import Browser
 from pydent import ModelBase
 
+from ._struct_aq_query import DEFAULT_BATCH_BYTES
+from ._struct_aq_query import DEFAULT_BATCH_SIZE
+from ._model_cache import ModelCache
+from ._reference_data import ReferenceData
+from ._struct_aq_query import edges_to_payloads
 from ._struct_aq_query import StructuredAquariumQuery
+from aqneodriver.payload import Payload
+from aqneodriver.structured_queries.aquarium._relationship_network import (
+    iter_relationships,
+)
+from aqneodriver.structured_queries.aquarium._relationship_network import Level
 from aqneodriver.structured_queries.aquarium._relationship_network import (
     relationship_network,
 )
 from aqneodriver.structured_queries.aquarium._types import NewEdgeCallback
 from aqneodriver.structured_queries.aquarium._types import NewNodeCallback
+from aqneodriver.structured_queries.aquarium._types import RowFilter
 from aqneodriver.utils.abstract_interface import abstract_interface
 
 
@@ -69,6 +83,39 @@ class StructuredRecursiveQuery(StructuredAquariumQuery):
             models.append(model)
         return models
 
+    @staticmethod
+    def _network_to_edges(
+        g: nx.DiGraph,
+    ) -> Iterator[Tuple[Hashable, Hashable, Dict[str, Any]]]:
+        for n1, n2, edata in g.edges(data=True):
+            yield n1, n2, edata["attr_dict"]
+
+    @classmethod
+    def edges_to_payloads(
+        cls,
+        edges: Iterable[Tuple[Tuple[str, int], Tuple[str, int], Dict[str, Any]]],
+        batch_size: Optional[int] = None,
+        batch_bytes: Optional[int] = None,
+    ) -> List[Payload]:
+        """Convert traversal edges to :class:`MergeEdges` payloads.
+
+        See :func:`edges_to_payloads
+        <aqneodriver.structured_queries.aquarium._struct_aq_query.edges_to_payloads>`.
+        Edges without an edge type (:attr:`EDGETYPE`) are skipped.
+
+        :param edges: iterable of `(key1, key2, edata)`, where keys are
+            `(label, id)` as returned by :meth:`key_func`
+        :param batch_size: max number of edges per payload (unbounded if None)
+        :param batch_bytes: max serialized bytes per payload (unbounded if None)
+        :return: list of payloads
+        """
+        return edges_to_payloads(
+            edges,
+            edge_type_key=cls.EDGETYPE,
+            batch_size=batch_size,
+            batch_bytes=batch_bytes,
+        )
+
     @classmethod
     def _create_network(
         cls,
@@ -76,12 +123,16 @@ class StructuredRecursiveQuery(StructuredAquariumQuery):
         models: List[ModelBase],
         new_node_callback: NewNodeCallback = None,
         new_edge_callback: NewEdgeCallback = None,
+        model_cache: Optional[ModelCache] = None,
+        reference_data: Optional[ReferenceData] = None,
     ) -> nx.DiGraph:
 
-        with aq.with_cache(timeout=120) as sess:
+        with cls.cached_session(aq, timeout=120, model_cache=model_cache) as sess:
             browser: Browser = sess.browser
             browser.clear()
             browser.update_cache(models)
+            if reference_data is not None:
+                reference_data.inject(browser)
             g = relationship_network(
                 sess.browser,
                 models,
@@ -100,7 +151,9 @@ class StructuredRecursiveQuery(StructuredAquariumQuery):
         aq: AqSession,
         models: List[ModelBase],
         *,
-        new_node_callback: Optional[NewNodeCallback] = None
+        new_node_callback: Optional[NewNodeCallback] = None,
+        model_cache: Optional[ModelCache] = None,
+        reference_data: Optional[ReferenceData] = None
     ) -> List[ModelBase]:
         """Execute the aquarium query, recursively finding relationships.
 
@@ -110,7 +163,184 @@ class StructuredRecursiveQuery(StructuredAquariumQuery):
                                   (:code:`Tuple[Hashable, Dict[str, Any]`)
         :param new_edge_callback: Callback to be called on each (node1, node2, edata) tuple
                                   (:code:`Tuple[Hashable, Hashable, Dict[str, Any]`)
+        :param model_cache: persistent model cache consulted before the
+            Aquarium API (see :meth:`cached_session`)
+        :param reference_data: type models injected into the browser (see
+            :meth:`StructuredAquariumQuery.__call__`)
         :return: tuple of (node_payloads, edge_payloads)
         """
-        graph = self._create_network(aq, models, new_node_callback=new_node_callback)
+        graph = self._create_network(
+            aq,
+            models,
+            new_node_callback=new_node_callback,
+            model_cache=model_cache,
+            reference_data=reference_data,
+        )
         return self._network_to_models(graph)
+
+    def _iter_levels(
+        self,
+        aq: AqSession,
+        models: List[ModelBase],
+        new_node_callback: Optional[NewNodeCallback] = None,
+        max_depth: Optional[int] = None,
+        model_cache: Optional[ModelCache] = None,
+        reference_data: Optional[ReferenceData] = None,
+    ) -> Iterator[Level]:
+        with self.cached_session(aq, timeout=120, model_cache=model_cache) as sess:
+            browser: Browser = sess.browser
+            browser.clear()
+            browser.update_cache(models)
+            if reference_data is not None:
+                reference_data.inject(browser)
+            for level in iter_relationships(
+                browser,
+                models,
+                get_models=self.get_models,
+                cache_func=self.cache_func,
+                key_func=self.key_func,
+                strict_cache=False,
+                max_depth=max_depth,
+            ):
+                if new_node_callback:
+                    for key, _, ndata in level.nodes:
+                        new_node_callback(key, ndata)
+                yield level
+
+    def iter_levels(
+        self,
+        aq: AqSession,
+        models: List[ModelBase],
+        *,
+        new_node_callback: Optional[NewNodeCallback] = None,
+        max_depth: Optional[int] = None,
+        model_cache: Optional[ModelCache] = None,
+        reference_data: Optional[ReferenceData] = None
+    ) -> Iterator[List[ModelBase]]:
+        """Lazily execute the aquarium query, yielding the models of each
+        level of relationships as soon as they are fetched.
+
+        The models yielded are the same as those returned by :meth:`run`,
+        but the first levels are available before the later levels are
+        requested. The Aquarium cache stays open until the iterator is
+        exhausted.
+
+        :param aq: The :class:`pydent.aqsession.AqSession` instance to use
+        :param models: List of Aquarium models to begin the recursive search
+        :param new_node_callback: Callback to be called on each (node, ndata) tuple
+        :param max_depth: max number of relationship levels to follow from
+            the models (unbounded if None)
+        :param model_cache: persistent model cache consulted before the
+            Aquarium API (see :meth:`cached_session`)
+        :param reference_data: type models injected into the browser (see
+            :meth:`StructuredAquariumQuery.__call__`)
+        :return: iterator of lists of models, one per level
+        """
+        for level in self._iter_levels(
+            aq, models, new_node_callback, max_depth, model_cache, reference_data
+        ):
+            yield [ndata["model"] for _, _, ndata in level.nodes]
+
+    def iter_payloads(
+        self,
+        aq: AqSession,
+        models: List[ModelBase],
+        *,
+        new_node_callback: Optional[NewNodeCallback] = None,
+        batch_size: Optional[int] = DEFAULT_BATCH_SIZE,
+        batch_bytes: Optional[int] = DEFAULT_BATCH_BYTES,
+        edges: bool = False,
+        max_depth: Optional[int] = None,
+        row_filter: Optional[RowFilter] = None,
+        model_cache: Optional[ModelCache] = None,
+        reference_data: Optional[ReferenceData] = None
+    ) -> Iterator[Payload]:
+        """Lazily execute the aquarium query, yielding the payloads of each
+        level as soon as it is fetched (see :meth:`iter_levels`). Pass the
+        iterator to :meth:`PooledAquariumETLDriver.iter_write
+        <aqneodriver.driver.PooledAquariumETLDriver.iter_write>` to write
+        the first levels while later levels are fetched.
+
+        :param edges: if True, also yield the :class:`MergeEdges` payloads
+            of the relationships found at each level (see
+            :meth:`edges_to_payloads`)
+        :param max_depth: max number of relationship levels to follow from
+            the models (unbounded if None). Edges to the models of the last
+            level are still yielded, so an update limited to the
+            neighborhood of some models still links them to the rest of
+            the graph.
+        :param row_filter: filter of the rows to write (see
+            :meth:`models_to_payloads`)
+        :param model_cache: persistent model cache consulted before the
+            Aquarium API (see :meth:`cached_session`)
+        :param reference_data: type models injected into the browser (see
+            :meth:`StructuredAquariumQuery.__call__`)
+        :return: iterator of payloads
+        """
+        for level in self._iter_levels(
+            aq, models, new_node_callback, max_depth, model_cache, reference_data
+        ):
+            yield from self.models_to_payloads(
+                [ndata["model"] for _, _, ndata in level.nodes],
+                batch_size=batch_size,
+                batch_bytes=batch_bytes,
+                row_filter=row_filter,
+            )
+            if edges:
+                # traversal edges point from the found model to its parent
+                yield from self.edges_to_payloads(
+                    ((k1, k2, edata) for k2, k1, edata in level.edges),
+                    batch_size=batch_size,
+                    batch_bytes=batch_bytes,
+                )
+
+    def __call__(
+        self,
+        aq: AqSession,
+        models: List[ModelBase],
+        *,
+        new_node_callback: Optional[NewNodeCallback] = None,
+        batch_size: Optional[int] = DEFAULT_BATCH_SIZE,
+        batch_bytes: Optional[int] = DEFAULT_BATCH_BYTES,
+        edges: bool = False,
+        row_filter: Optional[RowFilter] = None,
+        model_cache: Optional[ModelCache] = None,
+        reference_data: Optional[ReferenceData] = None
+    ) -> List[Payload]:
+        """Collect models and convert them to payloads.
+
+        :param aq: the Aquarium session
+        :param models: models to start from
+        :param new_node_callback: callback called on each new model
+        :param batch_size: max number of rows per payload (unbounded if None)
+        :param batch_bytes: max serialized bytes per payload (unbounded if None)
+        :param edges: if True, also return the :class:`MergeEdges` payloads
+            of the relationships found (see :meth:`edges_to_payloads`)
+        :param row_filter: filter of the rows to write (see
+            :meth:`models_to_payloads`)
+        :param model_cache: persistent model cache consulted before the
+            Aquarium API (see :meth:`cached_session`)
+        :param reference_data: type models injected into the browser (see
+            :meth:`StructuredAquariumQuery.__call__`)
+        :return: list of payloads
+        """
+        graph = self._create_network(
+            aq,
+            models,
+            new_node_callback=new_node_callback,
+            model_cache=model_cache,
+            reference_data=reference_data,
+        )
+        payloads = self.models_to_payloads(
+            self._network_to_models(graph),
+            batch_size=batch_size,
+            batch_bytes=batch_bytes,
+            row_filter=row_filter,
+        )
+        if edges:
+            payloads += self.edges_to_payloads(
+                self._network_to_edges(graph),
+                batch_size=batch_size,
+                batch_bytes=batch_bytes,
+            )
+        return payloads
@@ -17,3 +17,4 @@ GetModelsCallable = Callable[
 KeyFuncCallable = Callable[[ModelBase], Tuple[Hashable, Dict[str, Any]]]
 NewNodeCallback = Callable[[Hashable, Dict[str, Any]], None]
 NewEdgeCallback = Callable[[Hashable, Hashable, Dict[str, Any]], None]
+RowFilter = Callable[[str, List[Dict[str, Any]]], List[Dict[str, Any]]]
@@ -1,15 +1,27 @@
+from ._auto_relationships import get_auto_relationship_queries
+from ._auto_relationships import independent_groups
+from ._cyp_queries import MergeEdges
 from ._cyp_queries import MergeModels
 from ._cypher_file_to_payloads import parse_cypher_file
+from ._partition_query import merges_nodes
+from ._partition_query import partition_query
 from ._relationships_query import get_relationships_queries
 from ._struct_cyp_query import StructuredCypherQuery
 from ._struct_cyp_query import StructuredCypherQueryMeta
+from ._cyp_queries import AutoEdge
 from ._cyp_queries import AutoStub
 
 __all__ = [
     "MergeModels",
+    "MergeEdges",
     "parse_cypher_file",
+    "partition_query",
+    "merges_nodes",
     "get_relationships_queries",
     "StructuredCypherQuery",
     "StructuredCypherQueryMeta",
-    "AutoStub"
+    "AutoStub",
+    "AutoEdge",
+    "get_auto_relationship_queries",
+    "independent_groups",
 ]
@@ -1,7 +1,7 @@
 from pydent.relationships import HasOne, HasMany
 from pydent import ModelBase, ModelRegistry
-from ._cyp_queries import AutoRelationship
-from typing import Type, List
+from ._cyp_queries import AutoRelationship, AutoStub
+from typing import Hashable, Type, List, Sequence, TypeVar
 
 from ...payload import Payload
 
@@ -40,6 +40,55 @@ def aq_model_to_auto_relationships(model_type: Type[ModelBase]) -> List[AutoRela
     return qlist
 
 
+T = TypeVar("T", bound=AutoStub)
+
+
+def _query_key(query: AutoStub) -> Hashable:
+    if type(query) is AutoStub:
+        # stubs do not depend on the edge type, so the hasOne and hasMany
+        # sides of a foreign key create the same stubs
+        return query.m1, query.m2, query.ref, tuple(sorted(query.m1_props.items()))
+    return query.describe()
+
+
+def get_auto_relationship_queries(query_type: Type[T] = AutoRelationship) -> List[T]:
+    """Return the unique auto relationship queries of every registered model.
+
+    :param query_type: :class:`AutoRelationship` to create the stubs and
+        edges in one query, or :class:`AutoStub` and :class:`AutoEdge` to
+        create them in separate stages (the stubs first)
+    :return: list of queries
+    """
+    queries = {}
+    for model in ModelRegistry.models.values():
+        for query_str, name in field_strs(model):
+            query = query_type.from_string(query_str, etype=name)
+            queries.setdefault(_query_key(query), query)
+    return sorted(queries.values(), key=lambda q: q.describe())
+
+
+def independent_groups(queries: Sequence[T]) -> List[List[T]]:
+    """Group queries so that no two queries of a group touch the same label.
+
+    Queries of a group can run concurrently without contending for the
+    locks of the same nodes. Groups are assigned greedily, in order.
+
+    :param queries: auto relationship queries
+    :return: list of groups
+    """
+    groups = []
+    for query in queries:
+        labels = set(query.labels)
+        for group_labels, group in groups:
+            if not group_labels & labels:
+                group_labels.update(labels)
+                group.append(query)
+                break
+        else:
+            groups.append((labels, [query]))
+    return [group for _, group in groups]
+
+
 def get_auto_relationships() -> List[Payload]:
     payloads = []
     for model in ModelRegistry.models.values():
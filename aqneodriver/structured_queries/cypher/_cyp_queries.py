@@ -1,5 +1,6 @@
 from dataclasses import dataclass, field
 from typing import List
+from typing import Tuple
 
 from ._struct_cyp_query import StructuredCypherQuery
 
@@ -18,6 +19,20 @@ class MergeModels(StructuredCypherQuery):
     """
 
 
+@dataclass
+class MergeEdges(StructuredCypherQuery):
+    edges: List[dict]
+    query = """
+    UNWIND $edges AS edge
+    MERGE (a: {src_label} { id: edge.src } )
+    ON CREATE SET a.stub = true
+    MERGE (b: {tgt_label} { id: edge.tgt } )
+    ON CREATE SET b.stub = true
+    MERGE (a) -[r:{etype}]-> (b)
+    RETURN count(r) AS x
+    """
+
+
 @dataclass
 class GetSamples(StructuredCypherQuery):
     limit: int
@@ -35,10 +50,11 @@ class AutoStub(StructuredCypherQuery):
 
     query = """
     MATCH (b:{m2} {m1_props})
+    WHERE b.{ref} IS NOT NULL
     MERGE (a:{m1} { id: b.{ref} })
     ON CREATE SET
         a.stub = true
-    RETURN a
+    RETURN count(a) AS x
     """
 
     @classmethod
@@ -59,15 +75,38 @@ class AutoStub(StructuredCypherQuery):
         m1_props = m1_props or dict()
         return cls(model1, model2, ref, etype, m1_props=m1_props)
 
+    @property
+    def labels(self) -> Tuple[str, str]:
+        """The labels of the nodes the query touches."""
+        return self.m1, self.m2
+
+    def describe(self) -> str:
+        return "{}.{} = {}.id ({})".format(self.m2, self.ref, self.m1, self.etype)
+
 
 @dataclass
 class AutoRelationship(AutoStub):
     query = """
     MATCH (b:{m2} {m1_props})
-    WHERE b.{m2}
+    WHERE b.{ref} IS NOT NULL
     MERGE (a:{m1} { id: b.{ref} })
     ON CREATE SET a.stub = true
     MERGE (a) -[r:{etype}]-> (b)
-    RETURN a, r, b
+    RETURN count(r) AS x
+    """
+
+
+@dataclass
+class AutoEdge(AutoStub):
+    """Same as :class:`AutoRelationship`, but only matches the referenced
+    nodes, which must have been created (e.g. by :class:`AutoStub`)
+    beforehand."""
+
+    query = """
+    MATCH (b:{m2} {m1_props})
+    WHERE b.{ref} IS NOT NULL
+    MATCH (a:{m1} { id: b.{ref} })
+    MERGE (a) -[r:{etype}]-> (b)
+    RETURN count(r) AS x
     """
 
@@ -0,0 +1,77 @@
+import re
+from typing import Optional
+from typing import Tuple
+
+_match_pattern = re.compile(r"^\s*MATCH\s*\(\s*(?P<var>\w+)\s*:\s*(?P<label>\w+)")
+_merge_node_pattern = re.compile(r"^\s*MERGE\s*\(\s*\w*\s*:\s*\w+")
+
+#: parameter names of the (inclusive) id range of a partitioned query
+PARTITION_PARAMS = ("partition_lo", "partition_hi")
+
+
+def partition_query(query: str, key: str = "id") -> Optional[Tuple[str, str]]:
+    """Restrict a query to an id range of the node matched by its first
+    `MATCH` clause (the driving node).
+
+    A `WHERE n.id >= $partition_lo AND n.id <= $partition_hi` predicate is
+    added right after the first `MATCH` line, or combined with the `WHERE`
+    clause that already follows it, so the server can seek the driving
+    label by its indexed key instead of scanning it.
+
+    .. code-block::
+
+        query, label = partition_query(
+            "MATCH (a:Sample)\\nMATCH (b:SampleType)\\nWHERE ..."
+        )
+        # MATCH (a:Sample)
+        # WHERE a.id >= $partition_lo AND a.id <= $partition_hi
+        # MATCH (b:SampleType)
+        # WHERE ...
+
+    :param query: query string with one clause per line
+    :param key: key property of the driving node
+    :return: tuple of (partitioned query, driving label), or None if the
+        query has no `MATCH (var:Label)` clause
+    """
+    lines = [line for line in query.splitlines() if not line.strip().startswith("//")]
+    for i, line in enumerate(lines):
+        m = _match_pattern.match(line)
+        if m:
+            break
+    else:
+        return None
+    var, label = m.group("var"), m.group("label")
+    predicate = "{var}.{key} >= ${lo} AND {var}.{key} <= ${hi}".format(
+        var=var, key=key, lo=PARTITION_PARAMS[0], hi=PARTITION_PARAMS[1]
+    )
+    following = lines[i + 1].strip() if i + 1 < len(lines) else ""
+    if following.upper().startswith("WHERE "):
+        lines[i + 1] = "WHERE {} AND ({})".format(predicate, following[6:])
+    else:
+        lines.insert(i + 1, "WHERE " + predicate)
+    return "\n".join(lines), label
+
+
+def merges_nodes(query: str) -> bool:
+    """Whether a query MERGEs labelled nodes, rather than only relationships
+    between the nodes it matched.
+
+    Partitions of such a query must not run concurrently: two transactions
+    merging the same pattern at once can both create the node unless a
+    uniqueness constraint covers it.
+
+    .. code-block::
+
+        merges_nodes("MATCH (a:Sample)\nMERGE (p:Property {name: a.name})")
+        # True
+        merges_nodes("MATCH (a:Sample)\nMATCH (b:Item)\nMERGE (a) -[r:hasItem]-> (b)")
+        # False
+
+    :param query: query string with one clause per line
+    :return: whether the query has a `MERGE (var:Label ...)` clause
+    """
+    return any(
+        _merge_node_pattern.match(line)
+        for line in query.splitlines()
+        if not line.strip().startswith("//")
+    )
@@ -44,7 +44,7 @@ MATCH (a:Item)
 MATCH (b:Sample)
 WHERE a.sample_id = b.id
 MERGE (a) -[r:memberOf]-> (b)
-RETURN a, r, r2, b
+RETURN a, r, b
 
 MATCH (a:FieldValue { parent_class: "Sample"}) -[:hasSample]-> (:Sample) -[:hasMetaType]-> (:SampleType) -[:hasFieldType]-> (b:FieldType)
 WHERE a.name = b.name
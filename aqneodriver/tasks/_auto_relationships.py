@@ -1,22 +1,105 @@
+import os
+import time
 from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
 
 from omegaconf import DictConfig
 from rich.progress import Progress
 
 from ._task import Task
-from aqneodriver.structured_queries.cypher._auto_relationships import get_auto_relationships
+from aqneodriver.driver import AquariumETLDriver
+from aqneodriver.loggers import logger
+from aqneodriver.structured_queries.cypher import AutoEdge
+from aqneodriver.structured_queries.cypher import AutoStub
+from aqneodriver.structured_queries.cypher import get_auto_relationship_queries
+from aqneodriver.structured_queries.cypher import independent_groups
+from aqneodriver.structured_queries.cypher import partition_query
+
+
+def _write_batch(
+    etl: AquariumETLDriver, key: str, query: str, lo: Any, hi: Any
+) -> Tuple[str, float]:
+    """Run an id range of an auto relationship query, returning its key and
+    how long it took."""
+    t1 = time.time()
+    etl.write(query, {"partition_lo": lo, "partition_hi": hi})
+    return key, time.time() - t1
 
 
 @dataclass
 class AutoRelationshipsTask(Task):
+    """Create the relationships implied by the foreign keys of the pydent
+    models (see :func:`get_auto_relationship_queries
+    <aqneodriver.structured_queries.cypher._auto_relationships.get_auto_relationship_queries>`).
+
+    The stub nodes of every referenced model are created first
+    (:class:`AutoStub`), then the edges (:class:`AutoEdge`). Within each
+    stage, the queries are grouped so that queries touching the same labels
+    never run at the same time (see :func:`independent_groups
+    <aqneodriver.structured_queries.cypher._auto_relationships.independent_groups>`),
+    and every query of a group is split into id ranges of `batch_size`
+    nodes that run in parallel. The time spent on each query is logged.
+
+    .. code-block:: bash
+
+        python app.py +task=auto_relations task.batch_size=10000 task.n_jobs=8
+    """
+
     name: str = "auto_relations"
+    batch_size: int = 10000  #: number of ids per batch
+    n_jobs: Optional[int] = None  #: number of parallel jobs to run
+    executor: str = "process"  #: "process" or "thread" (default: "process")
 
     def run(self, cfg: DictConfig):
+        self.check_executor(cfg.task.executor)
         etl, aq = self.sessions(cfg)
+        n_cpus = cfg.task.n_jobs or os.cpu_count()
+        stages = [
+            ("stubs", get_auto_relationship_queries(AutoStub)),
+            ("edges", get_auto_relationship_queries(AutoEdge)),
+        ]
+        ranges: Dict[str, List[Tuple[Any, Any]]] = {}
+        timings: Dict[str, float] = {}
+
         with Progress() as progress:
-            payloads = get_auto_relationships()
-            task0 = progress.add_task("writing nodes...", total=len(payloads))
-            for payload in payloads:
-                etl.write(payload)
-                print(payload[0])
-                progress.update(task0, advance=1)
\ No newline at end of file
+            with etl.pool(n_cpus, mode=cfg.task.executor) as pool:
+                for stage, queries in stages:
+                    t1 = time.time()
+                    task0 = progress.add_task(
+                        "writing {}...".format(stage), total=len(queries)
+                    )
+                    for group in independent_groups(queries):
+                        args = []
+                        for query in group:
+                            partitioned, label = partition_query(query.payload()[0])
+                            if label not in ranges:
+                                ranges[label] = [
+                                    (ids[0], ids[-1])
+                                    for ids in etl.iter_ids(
+                                        label, batch_size=cfg.task.batch_size
+                                    )
+                                ]
+                            key = "{}: {}".format(stage, query.describe())
+                            timings.setdefault(key, 0.0)
+                            for lo, hi in ranges[label]:
+                                args.append((key, partitioned, lo, hi))
+                        task1 = progress.add_task("  batches...", total=len(args))
+                        for key, elapsed in pool(
+                            _write_batch,
+                            args,
+                            callback=lambda _: progress.update(task1, advance=1),
+                        ):
+                            timings[key] += elapsed
+                        progress.remove_task(task1)
+                        progress.update(task0, advance=len(group))
+                    logger.info(
+                        "wrote {} {} queries in {:.1f}s".format(
+                            len(queries), stage, time.time() - t1
+                        )
+                    )
+        for key, elapsed in sorted(timings.items(), key=lambda x: -x[1]):
+            logger.info("{:.2f}s {}".format(elapsed, key))
@@ -1,23 +1,50 @@
+import time
 from dataclasses import dataclass
+from typing import List
 from typing import Optional
 
 from omegaconf.dictconfig import DictConfig
 from rich import print
 from rich.panel import Panel
+from rich.progress import Progress
 
 from ._task import Task
+from aqneodriver.driver import DEFAULT_CLEAR_BATCH_SIZE
 from aqneodriver.exceptions import HelpException
 from aqneodriver.loggers import logger
 
 
 @dataclass
 class ClearDatabase(Task):
-    """Clear the Neo4j database."""
+    """Clear the Neo4j database.
+
+    Relationships and then nodes are deleted in transactions of at most
+    `batch_size` elements until the graph is empty. With `recreate=true`,
+    the database is instead dropped and recreated if the server supports it
+    (falling back to batched deletes otherwise), and the constraints and
+    indexes are applied again.
+
+    .. code-block:: bash
+
+        python app.py +task=clear_db task.force=true task.batch_size=50000
+    """
 
     name: str = "clear_db"  #: the task name
     force: bool = False
     only_edges: bool = False
+    batch_size: int = DEFAULT_CLEAR_BATCH_SIZE  #: max elements deleted per transaction
+    labels: Optional[List[str]] = None  #: only delete nodes with these labels
+    recreate: bool = False  #: drop and recreate the database if supported
+    database: str = "neo4j"  #: database to recreate
 
+    @staticmethod
+    def _count(driver, only_edges: bool) -> int:
+        """Number of elements to delete (from the count store, so this does
+        not scan the graph)."""
+        n = driver.read("MATCH () -[r]-> () RETURN count(r)")[0][0]
+        if not only_edges:
+            n += driver.read("MATCH (a) RETURN count(a)")[0][0]
+        return n
 
     def run(self, cfg: Optional[DictConfig]):
         """Clear the graph db.
@@ -47,7 +74,35 @@ class ClearDatabase(Task):
                 " Please use task.force=true to force db clearing."
             )
         else:
-            if cfg.task.only_edges:
-                driver.clear_relationships()
-            else:
-                driver.clear()
+            if (
+                cfg.task.recreate
+                and not cfg.task.only_edges
+                and not cfg.task.labels
+                and driver.recreate_database(cfg.task.database)
+            ):
+                logger.info("recreated database {}".format(cfg.task.database))
+                driver.setup()
+                return
+
+            t1 = time.time()
+            with Progress() as progress:
+                if cfg.task.labels:
+                    total = None
+                else:
+                    total = self._count(driver, cfg.task.only_edges)
+                task0 = progress.add_task("deleting...", total=total)
+
+                def callback(n: int):
+                    progress.update(task0, advance=n)
+
+                if cfg.task.only_edges:
+                    n = driver.clear_relationships(cfg.task.batch_size, callback=callback)
+                else:
+                    labels = list(cfg.task.labels) if cfg.task.labels else None
+                    n = driver.clear(cfg.task.batch_size, labels=labels, callback=callback)
+            elapsed = time.time() - t1
+            logger.info(
+                "deleted {} elements in {:.1f}s ({:.0f}/s)".format(
+                    n, elapsed, n / elapsed if elapsed else 0
+                )
+            )
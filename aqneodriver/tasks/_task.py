@@ -123,6 +123,25 @@ class Task(metaclass=RegisteredTask):
     log_level: str = "ERROR"  #: Sets the log level for the task. Will return to prior log level on completion.
     timeout: int = 10
 
+    #: pool modes that can run the synchronous functions of a task
+    EXECUTORS = ("process", "thread")
+
+    @classmethod
+    def check_executor(cls, executor: str):
+        """Check that a task can run its functions with the `executor` pool
+        mode (see :meth:`AquariumETLDriver.pool
+        <aqneodriver.driver.AquariumETLDriver.pool>`).
+
+        :param executor: the pool mode
+        :raises ValueError: if the executor is not one of :attr:`EXECUTORS`
+        """
+        if executor not in cls.EXECUTORS:
+            raise ValueError(
+                "executor must be one of {}, not '{}'".format(
+                    ", ".join(repr(e) for e in cls.EXECUTORS), executor
+                )
+            )
+
     @staticmethod
     def get_driver(cfg: DictConfig) -> AquariumETLDriver:
         """Get the :class:`AquariumETLDriver.
@@ -12,7 +12,12 @@ from rich.progress import TransferSpeedColumn
 
 from ._task import Task
 from aqneodriver.loggers import logger
-from aqneodriver.structured_queries.aquarium import aq_inventory_to_cypher
+from aqneodriver.structured_queries.aquarium import ContentHashFilter
+from aqneodriver.structured_queries.aquarium import ModelCache
+from aqneodriver.structured_queries.aquarium import ReferenceData
+from aqneodriver.structured_queries.aquarium import StructuredInvQuery
+from aqneodriver.utils.pipeline import DEFAULT_QUEUE_SIZE
+from aqneodriver.utils.pipeline import Pipeline
 
 
 @dataclass
@@ -49,7 +54,23 @@ class UpdateInventory(Task):
 
     name: str = "update_inventory"  #: the task name
     n_jobs: Optional[int] = None  #: number of parallel jobs to run
+    executor: str = "process"  #: "process", "thread" or "async" (default: "process")
     chunksize: int = 100  #: chunksize for each parallel job (default: 100)
+    batch_size: int = 1  #: number of payloads committed per transaction (default: 1)
+    batch_bytes: Optional[int] = None  #: max serialized bytes committed per transaction
+    payload_rows: Optional[int] = 1000  #: max rows per payload (default: 1000)
+    payload_bytes: Optional[int] = 2 ** 20  #: max serialized bytes per payload
+    write_edges: bool = True  #: also write foreign key relationships (default: True)
+    read_batch_size: int = 1000  #: number of sample ids read from neo4j at a time
+    max_in_flight: int = 4  #: max number of Aquarium requests at once
+    shard_size: int = 500  #: max number of sample ids per Aquarium request
+    retries: int = 2  #: number of times a failed Aquarium request is sent again
+    fetch_jobs: int = 1  #: number of batches of samples queried at once
+    queue_size: int = DEFAULT_QUEUE_SIZE  #: max number of items waiting between pipeline stages
+    skip_unchanged: bool = True  #: skip the models whose content hash is unchanged
+    model_cache: Optional[str] = None  #: path of a persistent Aquarium model cache shared across runs
+    preload_types: bool = True  #: load every type model once, rather than with each batch of models
+    types_snapshot: Optional[str] = None  #: path of a snapshot of the type models shared across runs
     strict: bool = True  #: if False, will catch ConstraintErrors if they arise
     query: InventoryQuery = InventoryQuery()
     create_nodes: bool = True
@@ -76,18 +97,11 @@ class UpdateInventory(Task):
             # TASK 0
             logger.info("Requesting Aquarium inventory...")
 
-            match_query = "MATCH (n:Sample) RETURN n.id"
-            if cfg.task.query.n_items > -1:
-                match_query += " LIMIT {}".format(cfg.task.query.n_items)
-            results = driver.read(match_query)
-            sample_ids = [r[0] for r in results]
-
-            models = aq.Sample.find(sample_ids)
-            logger.info("Found {} samples in graph db".format(len(models)))
-
-            node_payload = aq_inventory_to_cypher(
-                aq,
-                models
+            n_items = cfg.task.query.n_items
+            id_batches = driver.iter_ids(
+                "Sample",
+                batch_size=cfg.task.read_batch_size,
+                limit=n_items if n_items > -1 else None,
             )
 
             if cfg.task.strict:
@@ -98,14 +112,78 @@ class UpdateInventory(Task):
             else:
                 error_callback = self.catch_constraint_error
 
-            task1 = progress.add_task("adding nodes...")
+            task1 = progress.add_task("adding nodes...", total=0)
+            row_filter = ContentHashFilter(driver.read) if cfg.task.skip_unchanged else None
+            model_cache = ModelCache(cfg.task.model_cache) if cfg.task.model_cache else None
+            reference_data = (
+                ReferenceData.load_or_fetch(aq, cfg.task.types_snapshot)
+                if cfg.task.preload_types
+                else None
+            )
+
+            aq_inventory_to_cypher = StructuredInvQuery(
+                max_in_flight=cfg.task.max_in_flight,
+                shard_size=cfg.task.shard_size,
+                retries=cfg.task.retries,
+            )
+
+            n_samples = [0]
+
+            def iter_samples():
+                # sample ids are read from the graph db in batches
+                for sample_ids in id_batches:
+                    models = aq.Sample.find(sample_ids)
+                    n_samples[0] += len(models)
+                    yield models
+
+            def to_payloads(models):
+                for payload in aq_inventory_to_cypher(
+                    aq,
+                    models,
+                    batch_size=cfg.task.payload_rows,
+                    batch_bytes=cfg.task.payload_bytes,
+                    edges=cfg.task.write_edges,
+                    row_filter=row_filter,
+                    model_cache=model_cache,
+                    reference_data=reference_data,
+                ):
+                    progress.update(task1, total=progress.tasks[task1].total + 1)
+                    yield payload
+
+            def write(pool=None):
+                # batches of samples are fetched, queried and written
+                # concurrently
+                with Pipeline(maxsize=cfg.task.queue_size) as pipeline:
+                    payloads = pipeline.flat_map(
+                        "collect items",
+                        to_payloads,
+                        pipeline.source("fetch samples", iter_samples()),
+                        n_workers=cfg.task.fetch_jobs,
+                    )
+                    if pool is not None:
+                        payloads = pool.iter_write(
+                            payloads,
+                            callback=lambda _: progress.update(task1, advance=1),
+                            chunksize=cfg.task.chunksize,
+                            batch_size=cfg.task.batch_size,
+                            batch_bytes=cfg.task.batch_bytes,
+                            error_callback=error_callback,
+                            ordered=False,
+                        )
+                    for _ in pipeline.sink("write nodes", payloads):
+                        pass
+                logger.info(pipeline.summary())
+
             # TODO: indicate when creation is skipped
             if cfg.task.create_nodes:
-                progress.tasks[task1].total = len(node_payload)
-                driver.pool(n_cpus).write(
-                    node_payload,
-                    callback=lambda _: progress.update(task1, advance=1),
-                    chunksize=cfg.task.chunksize,
-                    error_callback=error_callback,
-                )
+                with driver.pool(n_cpus, mode=cfg.task.executor) as pool:
+                    write(pool)
                 progress.update(task1, completed=progress.tasks[task1].total)
+            else:
+                write()
+            logger.info("Found {} samples in graph db".format(n_samples[0]))
+        if row_filter is not None:
+            logger.info(row_filter.summary())
+        if model_cache is not None:
+            logger.info(model_cache.summary())
+            model_cache.close()
@@ -2,12 +2,18 @@ import os
 from dataclasses import dataclass
 from typing import Optional
 
+from neo4j.exceptions import ConstraintError
 from omegaconf import DictConfig
 from omegaconf import MISSING
 from rich.progress import Progress
 
-from aqneodriver.structured_queries.aquarium import aq_jobs_to_cypher
+from aqneodriver.loggers import logger
+from aqneodriver.structured_queries.aquarium import ContentHashFilter
+from aqneodriver.structured_queries.aquarium import ModelCache
+from aqneodriver.structured_queries.aquarium import StructuredJobQuery
 from aqneodriver.tasks import Task
+from aqneodriver.utils.pipeline import DEFAULT_QUEUE_SIZE
+from aqneodriver.utils.pipeline import Pipeline
 
 
 @dataclass
@@ -29,18 +35,37 @@ class UpdateJobs(Task):
     name: str = "update_jobs"  #: the task name
     query: JobsQuery = JobsQuery()
     n_jobs: Optional[int] = None
+    executor: str = "process"  #: "process", "thread" or "async" (default: "process")
     chunksize: int = 100
+    batch_size: int = 1  #: number of payloads committed per transaction (default: 1)
+    batch_bytes: Optional[int] = None  #: max serialized bytes committed per transaction
+    payload_rows: Optional[int] = 1000  #: max rows per payload (default: 1000)
+    payload_bytes: Optional[int] = 2 ** 20  #: max serialized bytes per payload
+    write_edges: bool = True  #: also write foreign key relationships (default: True)
+    read_batch_size: int = 1000  #: number of sample ids read from neo4j at a time
+    max_in_flight: int = 4  #: max number of Aquarium requests at once
+    shard_size: int = 500  #: max number of sample ids per Aquarium request
+    retries: int = 2  #: number of times a failed Aquarium request is sent again
+    fetch_jobs: int = 1  #: number of batches of samples queried at once
+    #: max number of items waiting between pipeline stages
+    queue_size: int = DEFAULT_QUEUE_SIZE
+    skip_unchanged: bool = True  #: skip the models whose content hash is unchanged
+    #: path of a persistent Aquarium model cache shared across runs
+    model_cache: Optional[str] = None
     strict: bool = True
     create_nodes: bool = True  #: whether to create nodes on the graphdb
 
+    @staticmethod
+    def catch_constraint_error(e: Exception):
+        if not isinstance(e, ConstraintError):
+            raise e
+
     def run(self, cfg: DictConfig):
         driver, aq = self.sessions(cfg)
-        sample_ids = driver.read("MATCH (n:Sample) RETURN n.id")
-        samples = aq.Sample.where({"id": sample_ids})
+        id_batches = driver.iter_ids("Sample", batch_size=cfg.task.read_batch_size)
 
         with Progress() as progress:
             n_cpus = cfg.task.n_jobs or os.cpu_count()
-            payloads = aq_jobs_to_cypher(aq, samples)
 
             if cfg.task.strict:
 
@@ -50,16 +75,72 @@ class UpdateJobs(Task):
             else:
                 error_callback = self.catch_constraint_error
 
-            task0 = progress.add_task("writing nodes...")
-            progress.tasks[task0].total = sum([len(x) for x in payloads])
+            task0 = progress.add_task("writing nodes...", total=0)
+            row_filter = (
+                ContentHashFilter(driver.read) if cfg.task.skip_unchanged else None
+            )
+            model_cache = (
+                ModelCache(cfg.task.model_cache) if cfg.task.model_cache else None
+            )
+
+            aq_jobs_to_cypher = StructuredJobQuery(
+                max_in_flight=cfg.task.max_in_flight,
+                shard_size=cfg.task.shard_size,
+                retries=cfg.task.retries,
+            )
+
+            def iter_samples():
+                for sample_ids in id_batches:
+                    yield aq.Sample.where({"id": sample_ids})
+
+            def to_payloads(samples):
+                for payload in aq_jobs_to_cypher(
+                    aq,
+                    samples,
+                    batch_size=cfg.task.payload_rows,
+                    batch_bytes=cfg.task.payload_bytes,
+                    edges=cfg.task.write_edges,
+                    row_filter=row_filter,
+                    model_cache=model_cache,
+                ):
+                    progress.update(task0, total=progress.tasks[task0].total + 1)
+                    yield payload
+
+            def write(pool=None):
+                # batches of samples are fetched, queried and written
+                # concurrently
+                with Pipeline(maxsize=cfg.task.queue_size) as pipeline:
+                    payloads = pipeline.flat_map(
+                        "collect jobs",
+                        to_payloads,
+                        pipeline.source("fetch samples", iter_samples()),
+                        n_workers=cfg.task.fetch_jobs,
+                    )
+                    if pool is not None:
+                        payloads = pool.iter_write(
+                            payloads,
+                            callback=lambda x: progress.update(task0, advance=1),
+                            error_callback=error_callback,
+                            chunksize=cfg.task.chunksize,
+                            batch_size=cfg.task.batch_size,
+                            batch_bytes=cfg.task.batch_bytes,
+                            ordered=False,
+                        )
+                    for _ in pipeline.sink("write nodes", payloads):
+                        pass
+                logger.info(pipeline.summary())
+
             if cfg.task.create_nodes:
-                driver.pool(n_cpus).write(
-                    payloads,
-                    callback=lambda x: progress.update(task0, advance=len(x)),
-                    error_callback=error_callback,
-                    chunksize=cfg.task.chunksize,
-                )
+                with driver.pool(n_cpus, mode=cfg.task.executor) as pool:
+                    write(pool)
+            else:
+                write()
             progress.update(task0, completed=progress.tasks[task0].total)
+        if row_filter is not None:
+            logger.info(row_filter.summary())
+        if model_cache is not None:
+            logger.info(model_cache.summary())
+            model_cache.close()
 
 
 #
@@ -1,23 +1,198 @@
+import hashlib
+import os
 from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
 
 from omegaconf import DictConfig
 from rich.progress import Progress
 
 from ._task import Task
+from aqneodriver.driver import AquariumETLDriver
+from aqneodriver.loggers import logger
 from aqneodriver.structured_queries.cypher import get_relationships_queries
+from aqneodriver.structured_queries.cypher import merges_nodes
+from aqneodriver.structured_queries.cypher import partition_query
+from aqneodriver.utils.batching import iter_batches
+
+#: label of the nodes recording the partitions of a run
+CHECKPOINT_LABEL = "_AqneodriverCheckpoint"
+
+# max number of partitions recorded per transaction
+_PLAN_BATCH_SIZE = 1000
+
+
+def _write_partition(
+    etl: AquariumETLDriver,
+    query: str,
+    lo: Any,
+    hi: Any,
+    checkpoint: Dict[str, Any],
+) -> Tuple[Any, Any]:
+    """Run a partition of a relationship query and record its checkpoint in
+    the same transaction, so a partition is either committed and recorded
+    or neither."""
+    etl.write_many(
+        [
+            (query, {"partition_lo": lo, "partition_hi": hi}),
+            (
+                "MERGE (c:{label} {{run: $run, query: $query, lo: $lo, hi: $hi}}) "
+                "SET c.completed_at = timestamp()".format(label=CHECKPOINT_LABEL),
+                dict(checkpoint, lo=lo, hi=hi),
+            ),
+        ]
+    )
+    return lo, hi
 
 
 @dataclass
 class UpdateRelationships(Task):
+    """Create the relationships in `relationships.cypher`.
+
+    By default, each statement is run over the whole graph in a single
+    transaction. If `partition_size` is set, each statement is instead
+    split into id ranges of the node of its first `MATCH` clause (see
+    :func:`partition_query
+    <aqneodriver.structured_queries.cypher.partition_query>`). Partitions
+    are run in parallel and committed separately. The partitions of
+    statements that MERGE nodes (such as the `Property` nodes) are run one
+    at a time, as concurrent partitions could create duplicate nodes (see
+    :func:`merges_nodes
+    <aqneodriver.structured_queries.cypher.merges_nodes>`).
+
+    The id ranges of a statement are recorded in the graph before its
+    partitions run, and each partition is marked as completed in the
+    transaction that commits it. If the task fails, running it again with
+    the same `run_id` reuses the recorded ranges (rather than splitting the
+    ids again, as nodes may have been added since) and skips the completed
+    ones. The records are removed once every statement completes.
+
+    .. code-block:: bash
+
+        python app.py +task=update_relations task.partition_size=10000 task.n_jobs=8
+    """
 
     name: str = "update_relations"
+    partition_size: Optional[int] = None  #: number of ids per partition (default: None)
+    n_jobs: Optional[int] = None  #: number of parallel jobs to run
+    executor: str = "process"  #: "process" or "thread" (default: "process")
+    run_id: str = "default"  #: identifies the checkpoints of a run to resume
+    restart: bool = False  #: if True, ignore the checkpoints of a previous run
 
     def run(self, cfg: DictConfig):
         etl, aq = self.sessions(cfg)
+        if cfg.task.partition_size:
+            return self._run_partitioned(etl, cfg)
         with Progress() as progress:
             queries = get_relationships_queries()
             payloads = [(q, {}) for q in queries]
             task0 = progress.add_task("writing relationships...", total=len(payloads))
             for query in queries:
                 progress.update(task0, advance=1)
-                etl.write(query)
\ No newline at end of file
+                etl.write(query)
+
+    @staticmethod
+    def _partitions(
+        etl: AquariumETLDriver, run_id: str, query_hash: str
+    ) -> List[Tuple[Any, Any, bool]]:
+        """Return the recorded `(lo, hi, completed)` partitions of a
+        statement."""
+        results = etl.read(
+            "MATCH (c:{label} {{run: $run, query: $query}}) "
+            "RETURN c.lo, c.hi, c.completed_at IS NOT NULL "
+            "ORDER BY c.lo".format(label=CHECKPOINT_LABEL),
+            {"run": run_id, "query": query_hash},
+        )
+        return [(lo, hi, completed) for lo, hi, completed in results]
+
+    @staticmethod
+    def _plan_partitions(
+        etl: AquariumETLDriver,
+        run_id: str,
+        query_hash: str,
+        label: str,
+        partition_size: int,
+    ) -> List[Tuple[Any, Any, bool]]:
+        """Split the ids of the driving label into partitions and record
+        them."""
+        bounds = [
+            (ids[0], ids[-1]) for ids in etl.iter_ids(label, batch_size=partition_size)
+        ]
+        for batch in iter_batches(bounds, _PLAN_BATCH_SIZE):
+            etl.write(
+                "UNWIND $partitions AS p "
+                "MERGE (c:{label} {{run: $run, query: $query, lo: p[0], hi: p[1]}})".format(
+                    label=CHECKPOINT_LABEL
+                ),
+                {
+                    "run": run_id,
+                    "query": query_hash,
+                    "partitions": [list(b) for b in batch],
+                },
+            )
+        return [(lo, hi, False) for lo, hi in bounds]
+
+    @staticmethod
+    def _clear_checkpoints(etl: AquariumETLDriver, run_id: str):
+        etl.write(
+            "MATCH (c:{label} {{run: $run}}) DELETE c".format(label=CHECKPOINT_LABEL),
+            {"run": run_id},
+        )
+
+    def _run_partitioned(self, etl: AquariumETLDriver, cfg: DictConfig):
+        self.check_executor(cfg.task.executor)
+        run_id = cfg.task.run_id
+        n_cpus = cfg.task.n_jobs or os.cpu_count()
+        if cfg.task.restart:
+            self._clear_checkpoints(etl, run_id)
+
+        with Progress() as progress:
+            queries = get_relationships_queries()
+            task0 = progress.add_task("writing relationships...", total=len(queries))
+            with etl.pool(n_cpus, mode=cfg.task.executor) as pool:
+                for query in queries:
+                    partitioned = partition_query(query)
+                    if partitioned is None:
+                        logger.info("skipping statement without a MATCH clause")
+                        progress.update(task0, advance=1)
+                        continue
+                    partitioned_query, label = partitioned
+                    query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()
+                    partitions = self._partitions(etl, run_id, query_hash)
+                    if not partitions:
+                        partitions = self._plan_partitions(
+                            etl, run_id, query_hash, label, cfg.task.partition_size
+                        )
+                    checkpoint = {"run": run_id, "query": query_hash}
+
+                    args: List[Tuple] = []
+                    n_skipped = 0
+                    for lo, hi, completed in partitions:
+                        if completed:
+                            n_skipped += 1
+                        else:
+                            args.append((partitioned_query, lo, hi, checkpoint))
+                    logger.info(
+                        "{} ({}): {} partitions, {} already completed".format(
+                            label, query_hash[:8], len(args) + n_skipped, n_skipped
+                        )
+                    )
+                    task1 = progress.add_task(
+                        "  {} partitions...".format(label), total=len(args)
+                    )
+                    if merges_nodes(query):
+                        for arg in args:
+                            _write_partition(etl, *arg)
+                            progress.update(task1, advance=1)
+                    else:
+                        pool(
+                            _write_partition,
+                            args,
+                            callback=lambda _: progress.update(task1, advance=1),
+                        )
+                    progress.remove_task(task1)
+                    progress.update(task0, advance=1)
+        self._clear_checkpoints(etl, run_id)
@@ -12,14 +12,25 @@ from rich.progress import TimeRemainingColumn
 from rich.progress import TransferSpeedColumn
 
 from ._task import Task
+from ._watermarks import max_watermark
+from ._watermarks import read_watermark
+from ._watermarks import Watermark
+from ._watermarks import write_watermark
 from aqneodriver.loggers import logger
-from aqneodriver.structured_queries.aquarium import aq_samples_to_cypher
+from aqneodriver.structured_queries.aquarium import ContentHashFilter
+from aqneodriver.structured_queries.aquarium import ModelCache
+from aqneodriver.structured_queries.aquarium import ReferenceData
+from aqneodriver.structured_queries.aquarium import iter_aq_samples_to_cypher
+from aqneodriver.structured_queries.aquarium import iter_pages
+from aqneodriver.utils.pipeline import DEFAULT_QUEUE_SIZE
+from aqneodriver.utils.pipeline import Pipeline
 from aqneodriver.utils.progress import infinite_task_context
 
 @dataclass
 class Query:
     n_samples: int = MISSING
     user: Optional[str] = None
+    page_size: Optional[int] = None  #: if provided, stream samples from Aquarium in pages of this size
 
 @dataclass
 class UpdateSampleDatabase(Task):
@@ -35,15 +46,44 @@ class UpdateSampleDatabase(Task):
         (a:Sample) -[hasFieldValue]-> (b:FieldValue)
         (a:FieldValue) -[hasSample]-> (b:Sample)
         (a:FieldValue) -[hasFieldType]-> (b:FieldType)
+
+    With `task.incremental=true`, the most recently updated sample written
+    (its `updated_at` and `id`) is recorded in the graph db as a high-water
+    mark. The following incremental runs only request the samples updated
+    since then, and only traverse `task.incremental_depth` levels of
+    relationships from them (enough to rewrite their field values and the
+    edges to the samples they reference). If no high-water mark was
+    recorded yet, `task.query` is used to populate the graph db. If
+    `task.strict=false` and some writes failed, the high-water mark is not
+    advanced, so the next run requests the same samples again.
+
+    .. code-block:: bash
+
+        python app.py +task=update_samples task.incremental=true task.query.n_samples=1000
     """
 
     name: str = "update_samples"  #: the task name
     n_jobs: Optional[int] = None  #: number of parallel jobs to run
+    executor: str = "process"  #: "process", "thread" or "async" (default: "process")
     chunksize: int = 100  #: chunksize for each parallel job (default: 100)
+    batch_size: int = 1  #: number of payloads committed per transaction (default: 1)
+    batch_bytes: Optional[int] = None  #: max serialized bytes committed per transaction
+    payload_rows: Optional[int] = 1000  #: max rows per payload (default: 1000)
+    payload_bytes: Optional[int] = 2 ** 20  #: max serialized bytes per payload
+    write_edges: bool = True  #: also write the relationships found (default: True)
+    skip_unchanged: bool = True  #: skip the models whose content hash is unchanged
+    model_cache: Optional[str] = None  #: path of a persistent Aquarium model cache shared across runs
+    preload_types: bool = True  #: load every type model once, rather than with each batch of models
+    types_snapshot: Optional[str] = None  #: path of a snapshot of the type models shared across runs
     strict: bool = True  #: if False, will catch ConstraintErrors if they arise
     on_collision: str = "ignore"  # TODO: implement on_collision
     query: Query = Query()  #: query information for Aquarium/Pydent
     create_nodes: bool = True  #: whether to create nodes on the graphdb
+    incremental: bool = False  #: only sync the samples updated since the last run
+    incremental_depth: int = 2  #: levels of relationships traversed from updated samples
+    max_in_flight: int = 4  #: max number of Aquarium pages requested at once
+    fetch_jobs: int = 1  #: number of pages of samples traversed at once
+    queue_size: int = DEFAULT_QUEUE_SIZE  #: max number of items waiting between pipeline stages
 
     @staticmethod
     def catch_constraint_error(e: Exception):
@@ -66,7 +106,39 @@ class UpdateSampleDatabase(Task):
             user = aq.User.where({"login": cfg.task.query.user})[0]
             query["user_id"] = user.id
         n_samples = cfg.task.query.n_samples
-        models = aq.Sample.last(n_samples, query)
+        page_size = cfg.task.query.page_size
+
+        watermark = None
+        max_depth = None
+        if cfg.task.incremental:
+            watermark = read_watermark(driver, "Sample", cfg.task.name)
+        if watermark is not None:
+            logger.info("Requesting samples updated since {}".format(watermark))
+            criteria = watermark.criteria()
+            if query:
+                criteria = "({}) AND user_id = {}".format(criteria, int(query["user_id"]))
+            max_depth = cfg.task.incremental_depth
+            if page_size:
+                pages = iter_pages(
+                    aq.Sample, criteria, page_size, cfg.task.max_in_flight
+                )
+            else:
+                pages = [aq.Sample.where(criteria)]
+        elif page_size:
+            pages = iter_pages(
+                aq.Sample,
+                query,
+                page_size,
+                cfg.task.max_in_flight,
+                opts={"limit": n_samples, "reverse": True},
+            )
+        else:
+            pages = [aq.Sample.last(n_samples, query)]
+
+        # high-water mark of the samples requested, recorded once written
+        new_watermark = [watermark]
+        # number of failed writes caught when not strict
+        n_errors = [0]
 
         with Progress(
             "[progress.description]{task.description}",
@@ -87,30 +159,115 @@ class UpdateSampleDatabase(Task):
                 def error_callback(e: Exception):
                     raise e
             else:
-                error_callback = self.catch_constraint_error
+
+                def error_callback(e: Exception):
+                    self.catch_constraint_error(e)
+                    n_errors[0] += 1
 
             if cfg.task.create_nodes:
                 task1 = progress.add_task(
                     "[red]writing nodes to [bold]neo4j[/bold]...[/red] ([green]cpus: {cpus}[/green])".format(
                         cpus=n_cpus
-                    )
+                    ),
+                    total=0,
                 )
             else:
                 task1 = None
 
+            row_filter = ContentHashFilter(driver.read) if cfg.task.skip_unchanged else None
+            model_cache = ModelCache(cfg.task.model_cache) if cfg.task.model_cache else None
+            reference_data = (
+                ReferenceData.load_or_fetch(aq, cfg.task.types_snapshot)
+                if cfg.task.preload_types
+                else None
+            )
+
             with infinite_task_context(progress, task0) as callback:
-                node_payload = aq_samples_to_cypher(
-                    aq,
-                    models,
-                    new_node_callback=callback
-                )
 
-            if cfg.task.create_nodes:
-                progress.tasks[task1].total = len(node_payload)
-                driver.pool(n_cpus).write(
-                    node_payload,
-                    callback=lambda x: progress.update(task1, advance=len(x)),
-                    chunksize=cfg.task.chunksize,
-                    error_callback=error_callback,
+                def iter_sample_pages():
+                    for page in pages:
+                        new_watermark[0] = max_watermark(page, new_watermark[0])
+                        yield page
+
+                def to_payloads(page):
+                    # payloads are generated level by level, so the pool can
+                    # begin writing the first level while later levels are
+                    # fetched
+                    for payload in iter_aq_samples_to_cypher(
+                        aq,
+                        page,
+                        new_node_callback=callback,
+                        batch_size=cfg.task.payload_rows,
+                        batch_bytes=cfg.task.payload_bytes,
+                        edges=cfg.task.write_edges,
+                        row_filter=row_filter,
+                        model_cache=model_cache,
+                        reference_data=reference_data,
+                        max_depth=max_depth,
+                    ):
+                        if task1 is not None:
+                            progress.update(
+                                task1, total=progress.tasks[task1].total + 1
+                            )
+                        yield payload
+
+                def write(pool=None):
+                    # pages are fetched, traversed and written concurrently
+                    with Pipeline(maxsize=cfg.task.queue_size) as pipeline:
+                        payloads = pipeline.flat_map(
+                            "collect relationships",
+                            to_payloads,
+                            pipeline.source("fetch samples", iter_sample_pages()),
+                            n_workers=cfg.task.fetch_jobs,
+                        )
+                        if pool is not None:
+                            payloads = pool.iter_write(
+                                payloads,
+                                callback=lambda x: progress.update(task1, advance=1),
+                                chunksize=cfg.task.chunksize,
+                                batch_size=cfg.task.batch_size,
+                                batch_bytes=cfg.task.batch_bytes,
+                                error_callback=error_callback,
+                                ordered=False,
+                            )
+                        for _ in pipeline.sink("write nodes", payloads):
+                            pass
+                    logger.info(pipeline.summary())
+
+                if cfg.task.create_nodes:
+                    with driver.pool(n_cpus, mode=cfg.task.executor) as pool:
+                        write(pool)
+                    progress.update(task1, completed=progress.tasks[task1].total)
+                else:
+                    write()
+
+        if row_filter is not None:
+            logger.info(row_filter.summary())
+        if model_cache is not None:
+            logger.info(model_cache.summary())
+            model_cache.close()
+        if cfg.task.incremental and cfg.task.create_nodes:
+            self._update_watermark(
+                driver, cfg.task.name, watermark, new_watermark[0], n_errors[0]
+            )
+
+    @staticmethod
+    def _update_watermark(
+        driver,
+        name: str,
+        watermark: Optional[Watermark],
+        new_watermark: Optional[Watermark],
+        n_errors: int = 0,
+    ):
+        if n_errors:
+            logger.warning(
+                "{} writes failed, keeping the sample high-water mark {}".format(
+                    n_errors, watermark
                 )
-                progress.update(task1, completed=progress.tasks[task1].total)
\ No newline at end of file
+            )
+            return
+        if new_watermark is None or new_watermark == watermark:
+            logger.info("No samples updated since {}".format(watermark))
+            return
+        write_watermark(driver, "Sample", name, new_watermark)
+        logger.info("Recorded sample high-water mark {}".format(new_watermark))
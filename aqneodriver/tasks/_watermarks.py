@@ -0,0 +1,108 @@
+from typing import Iterable
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from pydent import ModelBase
+
+from aqneodriver.driver import AquariumETLDriver
+from aqneodriver.utils.timestamps import parse_timestamp
+from aqneodriver.utils.timestamps import sql_timestamp
+
+#: label of the nodes recording the high-water mark of each synced model type
+WATERMARK_LABEL = "_AqneodriverWatermark"
+
+
+class Watermark(NamedTuple):
+    """The most recently updated model synced to the graph db."""
+
+    updated_at: str  #: the `updated_at` timestamp, as returned by Aquarium
+    id: int  #: breaks ties between models updated at the same time
+
+    def sort_key(self) -> Tuple[float, str, int]:
+        # compare instants, as the utc offset of the timestamps may vary
+        try:
+            timestamp = parse_timestamp(self.updated_at).timestamp()
+        except ValueError:
+            timestamp = float("-inf")
+        return timestamp, self.updated_at, self.id
+
+    def criteria(self) -> str:
+        """Return the Aquarium `where` criteria selecting the models updated
+        after this watermark.
+
+        The Aquarium database stores timestamps in UTC, so the timestamp is
+        converted from the utc offset Aquarium returns it with.
+
+        :raises ValueError: if the timestamp cannot be parsed
+        """
+        updated_at = sql_timestamp(self.updated_at)
+        return (
+            "updated_at > '{updated_at}' OR "
+            "(updated_at = '{updated_at}' AND id > {id})".format(
+                updated_at=updated_at, id=int(self.id)
+            )
+        )
+
+
+def max_watermark(
+    models: Iterable[ModelBase], watermark: Optional[Watermark] = None
+) -> Optional[Watermark]:
+    """Return the watermark of the most recently updated model.
+
+    :param models: models (models without `updated_at` are ignored)
+    :param watermark: the current watermark, returned if no model is more
+        recent
+    :return: the new watermark
+    """
+    for model in models:
+        updated_at = getattr(model, "updated_at", None)
+        if updated_at is None:
+            continue
+        w = Watermark(updated_at, model.id)
+        if watermark is None or w.sort_key() > watermark.sort_key():
+            watermark = w
+    return watermark
+
+
+def read_watermark(
+    etl: AquariumETLDriver, model: str, name: str
+) -> Optional[Watermark]:
+    """Read the watermark of a model type from the graph db.
+
+    :param etl: the driver
+    :param model: the model type (e.g. "Sample")
+    :param name: the name of the task that synced the models
+    :return: the watermark, or None if the model type was never synced
+    """
+    results = etl.read(
+        "MATCH (w:{label} {{model: $model, name: $name}}) "
+        "RETURN w.updated_at, w.id".format(label=WATERMARK_LABEL),
+        {"model": model, "name": name},
+    )
+    if not results:
+        return None
+    return Watermark(*results[0])
+
+
+def write_watermark(
+    etl: AquariumETLDriver, model: str, name: str, watermark: Watermark
+):
+    """Record the watermark of a model type in the graph db.
+
+    :param etl: the driver
+    :param model: the model type (e.g. "Sample")
+    :param name: the name of the task that synced the models
+    :param watermark: the watermark
+    """
+    etl.write(
+        "MERGE (w:{label} {{model: $model, name: $name}}) "
+        "SET w.updated_at = $updated_at, w.id = $id, "
+        "w.synced_at = timestamp()".format(label=WATERMARK_LABEL),
+        {
+            "model": model,
+            "name": name,
+            "updated_at": watermark.updated_at,
+            "id": watermark.id,
+        },
+    )
@@ -1,5 +1,6 @@
+from .batching import iter_batches
 from .crypto import Cryptography
 from .format_queries import format_cypher_query
 from .format_queries import get_format_keys
 
-__all__ = ["Cryptography", "format_cypher_query", "get_format_keys"]
+__all__ = ["Cryptography", "format_cypher_query", "get_format_keys", "iter_batches"]
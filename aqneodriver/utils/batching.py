@@ -0,0 +1,51 @@
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+def iter_batches(
+    items: Iterable[T],
+    batch_size: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    sizeof: Callable[[T], int] = len,
+) -> Iterator[List[T]]:
+    """Lazily group items into batches.
+
+    A batch is emitted as soon as adding the next item would exceed
+    either `batch_size` items or `max_bytes` (as measured by `sizeof`).
+    An item that is larger than `max_bytes` on its own is emitted as a
+    batch of one.
+
+    .. code-block::
+
+        list(iter_batches(range(5), batch_size=2))
+        # [[0, 1], [2, 3], [4]]
+
+    :param items: iterable of items
+    :param batch_size: maximum number of items per batch (unbounded if None)
+    :param max_bytes: maximum size of a batch (unbounded if None)
+    :param sizeof: function that returns the size of an item
+    :return: iterator of lists of items
+    """
+    if batch_size is not None and batch_size < 1:
+        raise ValueError("batch_size must be at least 1, not {}".format(batch_size))
+    batch = []
+    nbytes = 0
+    for item in items:
+        size = sizeof(item) if max_bytes is not None else 0
+        if batch and (
+            (batch_size is not None and len(batch) >= batch_size)
+            or (max_bytes is not None and nbytes + size > max_bytes)
+        ):
+            yield batch
+            batch = []
+            nbytes = 0
+        batch.append(item)
+        nbytes += size
+    if batch:
+        yield batch
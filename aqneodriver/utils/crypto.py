@@ -2,6 +2,7 @@ import ast
 import base64
 import os
 from typing import Any
+from typing import Optional
 from typing import Type
 from typing import Union
 
@@ -15,6 +16,7 @@ class Cryptography:
 
     UTF8 = "utf-8"
     DEFAULT_ENCODING = UTF8
+    _process_key: Optional[bytes] = None
 
     @staticmethod
     def generate_key(password: Union[str, bytes], encoding=DEFAULT_ENCODING) -> bytes:
@@ -27,6 +29,19 @@ class Cryptography:
         key = base64.urlsafe_b64encode(kdf.derive(password))
         return key
 
+    @classmethod
+    def process_key(cls) -> bytes:
+        """Return a random key that is generated once per process.
+
+        Unlike :meth:`generate_key`, no key derivation is done, so this is
+        cheap to call. Processes forked after the key is generated inherit
+        it, so data encrypted with this key may be decrypted by forked
+        children without the key ever being serialized.
+        """
+        if cls._process_key is None:
+            cls._process_key = Fernet.generate_key()
+        return cls._process_key
+
     @staticmethod
     def encode(data, encoding: str = DEFAULT_ENCODING) -> bytes:
         return str(data).encode(encoding)
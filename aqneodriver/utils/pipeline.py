@@ -0,0 +1,273 @@
+"""Pipeline of stages running concurrently, connected by bounded queues.
+
+The update tasks fetch models from Aquarium, convert them to payloads and
+write the payloads to the graph db. Chained as generators, the fetch only
+resumes once the writer asks for the next payload, so the time spent
+waiting on Aquarium and on Neo4j adds up. In a :class:`Pipeline`, each
+stage runs in its own thread(s) and puts its outputs in a bounded queue:
+a stage runs ahead of the next one until the queue is full
+(backpressure), and the time spent by each stage working, waiting for
+inputs and waiting for room in its queue is recorded in its
+:class:`StageMetrics`.
+
+.. code-block::
+
+    with Pipeline(maxsize=8) as pipeline:
+        pages = pipeline.source("fetch", iter_pages(aq.Sample, query))
+        payloads = pipeline.flat_map("transform", to_payloads, pages, n_workers=4)
+        for _ in pipeline.sink("write", pool.iter_write(payloads)):
+            pass
+    logger.info(pipeline.summary())
+"""
+import threading
+import time
+from queue import Empty
+from queue import Full
+from queue import Queue
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import TypeVar
+
+T = TypeVar("T")
+S = TypeVar("S")
+
+#: default max number of items waiting between two stages
+DEFAULT_QUEUE_SIZE = 8
+
+# seconds between checks for a stopped pipeline while blocked on a queue
+_POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class StageMetrics:
+    """Throughput of a pipeline stage.
+
+    :param name: the stage name
+    :param n_workers: number of threads running the stage
+    """
+
+    def __init__(self, name: str, n_workers: int = 1):
+        self.name = name
+        self.n_workers = n_workers
+        self.items = 0  #: number of items output
+        self.busy = 0.0  #: seconds spent producing items, summed over workers
+        self.waiting = 0.0  #: seconds spent waiting for inputs
+        self.blocked = 0.0  #: seconds spent waiting for room in the output queue
+        self.started = None  #: time the stage started
+        self.finished = None  #: time the stage finished
+        self._lock = threading.Lock()
+
+    def _add(
+        self, items: int = 0, busy: float = 0, waiting: float = 0, blocked: float = 0
+    ):
+        with self._lock:
+            self.items += items
+            self.busy += busy
+            self.waiting += waiting
+            self.blocked += blocked
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the stage started (until it finished)."""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Items output per second."""
+        elapsed = self.elapsed
+        return self.items / elapsed if elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            "{name} (x{n}): {items} items in {elapsed:.1f}s ({throughput:.1f}/s), "
+            "busy {busy:.1f}s, waiting {waiting:.1f}s, blocked {blocked:.1f}s".format(
+                name=self.name,
+                n=self.n_workers,
+                items=self.items,
+                elapsed=self.elapsed,
+                throughput=self.throughput,
+                busy=self.busy,
+                waiting=self.waiting,
+                blocked=self.blocked,
+            )
+        )
+
+
+class Pipeline:
+    """Run stages concurrently, connected by bounded queues.
+
+    Stages are started as soon as they are added. Exceptions raised by a
+    stage stop the pipeline and are re-raised by the iterator of the next
+    stage (and eventually by the :meth:`sink`). Leaving the context stops
+    and joins every stage.
+
+    :param maxsize: max number of items waiting in each queue
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.stages: List[StageMetrics] = []
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def source(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """Pull items from an iterable in a thread.
+
+        :param name: the stage name
+        :param items: the items (e.g. a generator fetching pages)
+        :return: iterator of the items
+        """
+        return self._start(name, iter(items), None, 1)
+
+    def flat_map(
+        self,
+        name: str,
+        func: Callable[[T], Iterable[S]],
+        items: Iterator[T],
+        n_workers: int = 1,
+    ) -> Iterator[S]:
+        """Apply a function returning an iterable to each item, in
+        `n_workers` threads. Outputs are not ordered when `n_workers` > 1.
+
+        :param name: the stage name
+        :param func: function called with each item
+        :param items: the input items (e.g. the iterator of a previous stage)
+        :param n_workers: number of threads
+        :return: iterator of the outputs of `func`
+        """
+        return self._start(name, iter(items), func, max(n_workers, 1))
+
+    def sink(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """Record the metrics of the final stage, consumed by the caller.
+
+        :param name: the stage name
+        :param items: the items (e.g. the results of the writes)
+        :return: iterator of the items
+        """
+        stage = StageMetrics(name)
+        self.stages.append(stage)
+        stage.started = time.time()
+        items = iter(items)
+        while True:
+            t0 = time.time()
+            try:
+                item = next(items)
+            except StopIteration:
+                break
+            finally:
+                stage._add(waiting=time.time() - t0)
+            stage._add(items=1)
+            yield item
+        stage.finished = time.time()
+
+    def _start(
+        self,
+        name: str,
+        items: Iterator[T],
+        func: Optional[Callable[[T], Iterable[S]]],
+        n_workers: int,
+    ) -> Iterator:
+        stage = StageMetrics(name, n_workers)
+        self.stages.append(stage)
+        out = Queue(self.maxsize)
+        lock = threading.Lock()
+        remaining = [n_workers]
+
+        def work():
+            try:
+                while not self._stop.is_set():
+                    t0 = time.time()
+                    with lock:
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            break
+                    if func is None:
+                        # pulling from the source is the work of the stage
+                        stage._add(busy=time.time() - t0)
+                        self._put(stage, out, item)
+                        continue
+                    stage._add(waiting=time.time() - t0)
+                    outputs = iter(func(item))
+                    while True:
+                        t0 = time.time()
+                        try:
+                            output = next(outputs)
+                        except StopIteration:
+                            stage._add(busy=time.time() - t0)
+                            break
+                        stage._add(busy=time.time() - t0)
+                        self._put(stage, out, output)
+                        if self._stop.is_set():
+                            # stop the generator (e.g. pending page requests)
+                            if hasattr(outputs, "close"):
+                                outputs.close()
+                            break
+            except BaseException as e:
+                if self._error is None:
+                    self._error = e
+                self._stop.set()
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    stage.finished = time.time()
+                    self._put(stage, out, _DONE, count=False)
+
+        stage.started = time.time()
+        for i in range(n_workers):
+            thread = threading.Thread(
+                target=work, name="{}-{}".format(name, i), daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+        return self._iter_queue(out)
+
+    def _put(self, stage: StageMetrics, out: Queue, item, count: bool = True):
+        t0 = time.time()
+        while True:
+            try:
+                out.put(item, timeout=_POLL_INTERVAL)
+                break
+            except Full:
+                if self._stop.is_set():
+                    break
+        stage._add(items=int(count), blocked=time.time() - t0)
+
+    def _iter_queue(self, queue: Queue) -> Iterator:
+        while True:
+            try:
+                item = queue.get(timeout=_POLL_INTERVAL)
+            except Empty:
+                if self._stop.is_set():
+                    break
+                continue
+            if item is _DONE:
+                break
+            yield item
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """Stop every stage and wait for the threads to finish."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def summary(self) -> str:
+        """Return a line of metrics per stage."""
+        return "\n".join(str(stage) for stage in self.stages)
@@ -0,0 +1,38 @@
+from datetime import datetime
+from datetime import timezone
+
+
+def parse_timestamp(timestamp: str) -> datetime:
+    """Parse an Aquarium (Rails) timestamp, such as
+    `2020-01-02T12:00:00.000-08:00`, into a UTC datetime.
+
+    Timestamps without a utc offset are assumed to be in UTC.
+
+    :param timestamp: the ISO 8601 timestamp
+    :return: the timezone aware datetime, in UTC
+    :raises ValueError: if the timestamp cannot be parsed
+    """
+    t = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if t.tzinfo is None:
+        return t.replace(tzinfo=timezone.utc)
+    return t.astimezone(timezone.utc)
+
+
+def sql_timestamp(timestamp: str) -> str:
+    """Format an Aquarium timestamp as the UTC `YYYY-MM-DD HH:MM:SS[.ffffff]`
+    literal that the Aquarium database compares its `created_at` and
+    `updated_at` columns to (Rails stores them in UTC).
+
+    .. code-block::
+
+        sql_timestamp("2020-01-02T12:00:00.000-08:00")
+        # '2020-01-02 20:00:00'
+
+    :param timestamp: the ISO 8601 timestamp
+    :return: the UTC timestamp, for a `where` criteria
+    :raises ValueError: if the timestamp cannot be parsed
+    """
+    t = parse_timestamp(timestamp)
+    if t.microsecond:
+        return t.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return t.strftime("%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,73 @@
+"""Measure the cost of constructing an :class:`AquariumETLDriver`.
+
+Compares deriving a PBKDF2 key for every driver (as drivers formerly did
+to encrypt their credentials) against the per-process key used now, and
+reports the cost of the credential handoff done by each pool worker. No
+database connection is made: the Neo4j driver connects lazily and `setup`
+is disabled.
+
+.. code-block:: bash
+
+    python benchmarks/driver_construction.py --n-drivers 50
+"""
+import argparse
+import time
+
+from aqneodriver.driver import AquariumETLDriver
+from aqneodriver.utils import Cryptography
+
+CREDS = ("bolt://localhost:7687", "neo4j", "password")
+
+
+def timeit(f, n):
+    t1 = time.perf_counter()
+    for _ in range(n):
+        f()
+    t2 = time.perf_counter()
+    return (t2 - t1) / n
+
+
+def legacy_key():
+    key = Cryptography.generate_key("debug")
+    Cryptography.encrypt(key, CREDS)
+
+
+def process_key():
+    key = Cryptography.process_key()
+    Cryptography.encrypt(key, CREDS)
+
+
+def construct_driver():
+    AquariumETLDriver(*CREDS, setup=False).close()
+
+
+def worker_handoff(token, key):
+    def handoff():
+        creds = Cryptography.decrypt(key, token, literal_eval=True)
+        AquariumETLDriver(*creds, setup=False).close()
+
+    return handoff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-drivers", type=int, default=50)
+    args = parser.parse_args()
+
+    etl = AquariumETLDriver(*CREDS, setup=False)
+    token, key = etl._credentials_token()
+    etl.close()
+
+    rows = [
+        ("PBKDF2 key per driver", timeit(legacy_key, args.n_drivers)),
+        ("process key per driver", timeit(process_key, args.n_drivers)),
+        ("driver construction", timeit(construct_driver, args.n_drivers)),
+        ("worker handoff", timeit(worker_handoff(token, key), args.n_drivers)),
+    ]
+    print("{} drivers".format(args.n_drivers))
+    for name, seconds in rows:
+        print("{:<28} {:>10.1f} us/driver".format(name, 1e6 * seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Measure the scaling of :func:`relationship_network` on synthetic graphs.
+
+Two graph shapes are generated for each size: a single long lineage (one
+level per node, which exceeded the recursion limit with the former
+recursive implementation) and a random graph with an average out degree
+of two. Time per node should stay roughly constant as the size grows.
+
+.. code-block:: bash
+
+    python benchmarks/relationship_network.py --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+from contextlib import contextmanager
+
+from aqneodriver.structured_queries.aquarium._relationship_network import (
+    relationship_network,
+)
+
+
+class Node:
+    __slots__ = ["i"]
+
+    def __init__(self, i):
+        self.i = i
+
+
+class SyntheticBrowser:
+    def __init__(self, adjacency):
+        self.adjacency = adjacency
+        self.nodes = [Node(i) for i in range(len(adjacency))]
+
+    @contextmanager
+    def session(self, **kwargs):
+        yield self
+
+
+def get_models(browser, model):
+    for j in browser.adjacency[model.i]:
+        yield browser.nodes[j], {}
+
+
+def key_func(model):
+    return model.i, {}
+
+
+def lineage(n):
+    return [[i + 1] for i in range(n - 1)] + [[]]
+
+
+def random_graph(n, degree=2, seed=0):
+    rand = random.Random(seed)
+    return [[rand.randrange(n) for _ in range(degree)] for _ in range(n)]
+
+
+def bench(adjacency):
+    browser = SyntheticBrowser(adjacency)
+    t1 = time.perf_counter()
+    g = relationship_network(
+        browser, [browser.nodes[0]], get_models=get_models, key_func=key_func
+    )
+    t2 = time.perf_counter()
+    return g.number_of_nodes(), t2 - t1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10000, 100000, 1000000]
+    )
+    args = parser.parse_args()
+
+    print("{:<8} {:>10} {:>10} {:>12}".format("shape", "nodes", "seconds", "us/node"))
+    for n in args.sizes:
+        for shape, make in [("lineage", lineage), ("random", random_graph)]:
+            n_nodes, seconds = bench(make(n))
+            print(
+                "{:<8} {:>10} {:>10.2f} {:>12.2f}".format(
+                    shape, n_nodes, seconds, 1e6 * seconds / n_nodes
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
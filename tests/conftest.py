@@ -1,13 +1,18 @@
+import re
 from os.path import abspath
 from os.path import dirname
 from os.path import join
 
 import pytest
+from neo4j import GraphDatabase
+from neo4j.exceptions import ClientError
 from pydent import AqSession
+from pydent import ModelRegistry
 
 from aqneodriver.config import get_config
 from aqneodriver.driver import AquariumETLDriver
 from aqneodriver.driver import logger
+from aqneodriver.utils.timestamps import sql_timestamp
 
 here = dirname(abspath(__file__))
 
@@ -49,3 +54,193 @@ def etl(config, aq):
         etl.aq_create(m)
     yield etl
     # etl.clear()
+
+
+class FakeResult:
+    def __init__(self, records=()):
+        self.records = list(records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def single(self):
+        return self.records[0] if self.records else None
+
+    def values(self):
+        return [list(record) for record in self.records]
+
+    def consume(self):
+        pass
+
+
+class EquivalentSchemaRuleAlreadyExists(ClientError):
+    code = "Neo.ClientError.Schema.EquivalentSchemaRuleAlreadyExists"
+
+
+class FakeGraph:
+    """Stands in for the Neo4j driver. Records the queries and transactions,
+    keeps counts of the nodes and relationships deleted in batches and
+    keeps track of the constraints, indexes and schema node. The queries in
+    `fail` raise a :class:`ClientError` and the queries in `exists` raise
+    the error of an equivalent constraint or index already existing."""
+
+    def __init__(
+        self, n_relationships=0, n_nodes=0, enterprise=False, fail=(), exists=()
+    ):
+        self.n_relationships = n_relationships
+        self.n_nodes = n_nodes
+        self.enterprise = enterprise
+        self.fail = set(fail)
+        self.exists = set(exists)
+        self.batches = []
+        self.constraints = set()
+        self.indexes = set()
+        self.version = None
+        self.queries = []
+        self.transactions = 0
+
+    def run(self, query, batch_size=None, **params):
+        self.queries.append(query)
+        if query in self.fail:
+            raise ClientError("Invalid query")
+        if query in self.exists:
+            raise EquivalentSchemaRuleAlreadyExists("Equivalent rule exists")
+        if query.startswith("CREATE OR REPLACE DATABASE"):
+            if not self.enterprise:
+                raise ClientError("Unsupported administration command")
+            self.n_relationships = self.n_nodes = 0
+        elif query.startswith("CREATE CONSTRAINT"):
+            self.constraints.add(query.split()[2])
+        elif query.startswith("CREATE INDEX"):
+            self.indexes.add(query.split()[2])
+        elif query.startswith("SHOW CONSTRAINTS"):
+            return FakeResult([(name,) for name in self.constraints])
+        elif query.startswith("SHOW INDEXES"):
+            return FakeResult([(name,) for name in self.indexes])
+        elif query.startswith("MATCH (s:_AqneodriverSchema"):
+            return FakeResult([(self.version,)] if self.version else [])
+        elif query.startswith("MERGE (s:_AqneodriverSchema"):
+            self.version = params["version"]
+        elif "DELETE" in query:
+            if "-[r]" in query:
+                n = min(batch_size, self.n_relationships)
+                self.n_relationships -= n
+            else:
+                n = min(batch_size, self.n_nodes)
+                self.n_nodes -= n
+            self.batches.append(n)
+            return FakeResult([(n,)])
+        return FakeResult()
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, graph: FakeGraph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def run(self, query, **params):
+        return self.graph.run(query, **params)
+
+    def execute_write(self, f, **kwargs):
+        self.graph.transactions += 1
+        return f(self.graph, **kwargs)
+
+
+@pytest.fixture
+def fake_etl(monkeypatch):
+    """Factory of drivers connected to a :class:`FakeGraph` instead of a
+    server.
+
+    .. code-block::
+
+        etl = fake_etl(n_nodes=10)
+        etl.driver  # the FakeGraph
+    """
+
+    def make(uri="bolt://fake:7687", graph=None, **kwargs):
+        if graph is None:
+            graph = FakeGraph(**kwargs)
+        monkeypatch.setattr(GraphDatabase, "driver", lambda uri, auth: graph)
+        return AquariumETLDriver(uri, "neo4j", "password", setup=False)
+
+    return make
+
+
+class Owner:
+    session = None
+
+
+class FakeInterface:
+    """Serves the models of `server` matching the `(id = ? AND updated_at
+    > ?) OR ...` criteria of a model cache revalidation."""
+
+    def __init__(self, server):
+        self.server = server
+        self.criteria = []
+
+    def where(self, criteria):
+        self.criteria.append(criteria)
+        return [
+            self.server[int(i)]
+            for i, t in re.findall(r"id = (\d+) AND updated_at > '([^']+)'", criteria)
+            if sql_timestamp(self.server[int(i)].updated_at) > t
+        ]
+
+
+class FakeBrowser:
+    """Stands in for a pydent Browser. Serves the models of `server` (a dict
+    of id to model) by id, recording the ids requested."""
+
+    def __init__(self, server=None):
+        self.server = server or {}
+        self.requested = []
+        self.model_cache = {}
+        self.session = Owner()
+
+    @property
+    def models(self):
+        return [m for models in self.model_cache.values() for m in models.values()]
+
+    def interface(self, model_class):
+        return FakeInterface(self.server)
+
+    def update_cache(self, models, recursive=True):
+        for m in models:
+            self.model_cache.setdefault(m.__class__.__name__, {})[m.id] = m
+
+    def cached_where(self, query, model, primary_key="id", **kwargs):
+        cached = self.model_cache.get(model, {})
+        missing = [i for i in query["id"] if i not in cached]
+        self.requested += missing
+        self.update_cache([self.server[i] for i in missing])
+        return [self.model_cache[model][i] for i in query["id"]]
+
+    def cached_find(self, model_class, id):
+        return self.cached_where({"id": [id]}, model_class)[0]
+
+
+@pytest.fixture
+def fake_browser():
+    """Factory of :class:`FakeBrowser`."""
+    return FakeBrowser
+
+
+@pytest.fixture
+def load_model():
+    """Load a pydent model from its data, without a session."""
+
+    def load(model_class, data=None, **kwargs):
+        return ModelRegistry.get_model(model_class).load_from(data or kwargs, Owner())
+
+    return load
@@ -0,0 +1,97 @@
+from multiprocessing import Pool
+
+import pytest
+
+from aqneodriver.driver import apply_async_map
+from aqneodriver.driver import encode_function
+from aqneodriver.driver import iter_apply_async_map
+from aqneodriver.driver import register_worker_functions
+from aqneodriver.driver import RegisteredFunction
+
+
+def square(x):
+    return x * x
+
+
+def fail_on_three(x):
+    if x == 3:
+        raise ValueError(x)
+    return x
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with Pool(2) as pool:
+        yield pool
+
+
+def test_apply_async_map(pool):
+    args = [(i,) for i in range(20)]
+    assert apply_async_map(pool, square, args, chunksize=3) == [i * i for i in range(20)]
+
+
+def test_iter_apply_async_map_ordered(pool):
+    args = ((i,) for i in range(20))
+    results = list(iter_apply_async_map(pool, square, args, max_in_flight=2))
+    assert results == [(i, i * i) for i in range(20)]
+
+
+def test_iter_apply_async_map_unordered(pool):
+    args = ((i,) for i in range(20))
+    results = list(iter_apply_async_map(pool, square, args, ordered=False))
+    assert sorted(results) == [(i, i * i) for i in range(20)]
+
+
+def test_iter_apply_async_map_is_lazy(pool):
+    pulled = []
+
+    def args():
+        for i in range(1000):
+            pulled.append(i)
+            yield (i,)
+
+    results = iter_apply_async_map(pool, square, args(), chunksize=5, max_in_flight=2)
+    assert next(results) == (0, 0)
+    # at most max_in_flight chunks (plus the item that ends a chunk) are pulled
+    assert len(pulled) <= 2 * 5 + 1
+
+
+def test_iter_apply_async_map_raises(pool):
+    args = [(i,) for i in range(6)]
+    with pytest.raises(ValueError):
+        list(iter_apply_async_map(pool, fail_on_three, args))
+
+
+def test_iter_apply_async_map_error_callback(pool):
+    errors = []
+    args = [(i,) for i in range(6)]
+    results = list(
+        iter_apply_async_map(
+            pool, fail_on_three, args, chunksize=2, error_callback=errors.append
+        )
+    )
+    assert results == [(i, i) for i in [0, 1, 2, 4, 5]]
+    assert len(errors) == 1
+    assert isinstance(errors[0], ValueError)
+
+
+def test_registered_function():
+    key, encoded = encode_function(square)
+    args = [(i,) for i in range(10)]
+    with Pool(
+        2, initializer=register_worker_functions, initargs=({key: encoded},)
+    ) as pool:
+        results = list(iter_apply_async_map(pool, RegisteredFunction(key), args))
+    assert results == [(i, i * i) for i in range(10)]
+
+
+def test_registered_function_shipped_after_start(pool):
+    key, encoded = encode_function(fail_on_three)
+    args = [(i,) for i in range(10) if i != 3]
+    results = list(iter_apply_async_map(pool, RegisteredFunction(key, encoded), args))
+    assert [r for _, r in results] == [i for i in range(10) if i != 3]
+
+
+def test_unregistered_function_raises(pool):
+    with pytest.raises(KeyError):
+        list(iter_apply_async_map(pool, RegisteredFunction("missing"), [(1,)]))
@@ -2,6 +2,8 @@ from pydent import AqSession
 
 from aqneodriver.structured_queries.aquarium import aq_jobs_to_cypher
 from aqneodriver.structured_queries.aquarium import aq_samples_to_cypher
+from aqneodriver.structured_queries.aquarium import iter_aq_samples_to_cypher
+from aqneodriver.structured_queries.aquarium import StructuredSamplesQuery
 
 
 def test_aq_samples_to_cypher(aq: AqSession):
@@ -23,3 +25,44 @@ def test_aq_jobs(aq: AqSession):
         print(p)
         print(len(pdata["datalist"]))
         print(pdata)
+
+
+def test_aq_samples_to_cypher_batches(aq: AqSession):
+    models = aq.Sample.last(10)
+    payloads = aq_samples_to_cypher(aq=aq, models=models, batch_size=None)
+    batched = aq_samples_to_cypher(aq=aq, models=models, batch_size=3)
+    assert len(batched) >= len(payloads)
+    for _, pdata in batched:
+        assert 0 < len(pdata["datalist"]) <= 3
+    n_rows = sum(len(pdata["datalist"]) for _, pdata in payloads)
+    assert sum(len(pdata["datalist"]) for _, pdata in batched) == n_rows
+
+
+def test_iter_aq_samples_to_cypher(aq: AqSession):
+    models = aq.Sample.last(10)
+    payloads = aq_samples_to_cypher(aq=aq, models=models)
+    streamed = list(iter_aq_samples_to_cypher(aq=aq, models=models))
+
+    def ids(payloads):
+        return sorted(row["id"] for _, pdata in payloads for row in pdata["datalist"])
+
+    assert ids(streamed) == ids(payloads)
+
+
+def test_edges_to_payloads():
+    edges = [
+        (("Sample", 1), ("FieldValue", 10), {"type": "hasFieldValue"}),
+        (("Sample", 1), ("FieldValue", 11), {"type": "hasFieldValue"}),
+        (("Sample", 2), ("FieldValue", 12), {"type": "hasFieldValue"}),
+        (("Sample", 1), ("SampleType", 3), {"type": "hasSampleType"}),
+        (("Sample", 1), ("SampleType", 4), {}),
+    ]
+    payloads = StructuredSamplesQuery.edges_to_payloads(edges, batch_size=2)
+    assert len(payloads) == 3
+    query, data = payloads[0]
+    assert "MERGE (a) -[r:hasFieldValue]-> (b)" in query
+    assert "MERGE (a: Sample { id: edge.src } )" in query
+    assert "MERGE (b: FieldValue { id: edge.tgt } )" in query
+    assert data == {"edges": [{"src": 1, "tgt": 10}, {"src": 1, "tgt": 11}]}
+    assert payloads[1][1] == {"edges": [{"src": 2, "tgt": 12}]}
+    assert "hasSampleType" in payloads[2][0]
@@ -0,0 +1,204 @@
+import asyncio
+import subprocess
+import sys
+import threading
+
+import pytest
+from neo4j import AsyncGraphDatabase
+from neo4j import GraphDatabase
+
+from aqneodriver.async_driver import aiter_apply
+from aqneodriver.async_driver import AsyncAquariumETLDriver
+from aqneodriver.driver import AquariumETLDriver
+from aqneodriver.payload import Payload
+
+
+async def square(x):
+    await asyncio.sleep(0.001 * (x % 3))
+    return x * x
+
+
+async def fail_on_three(x):
+    if x == 3:
+        raise ValueError(x)
+    return x
+
+
+def collect(agen):
+    async def _collect():
+        return [x async for x in agen]
+
+    return asyncio.get_event_loop().run_until_complete(_collect())
+
+
+def test_aiter_apply_ordered():
+    results = collect(aiter_apply(square, [(i,) for i in range(20)], 4))
+    assert results == [(i, i * i) for i in range(20)]
+
+
+def test_aiter_apply_unordered():
+    results = collect(aiter_apply(square, [(i,) for i in range(20)], 4, ordered=False))
+    assert sorted(results) == [(i, i * i) for i in range(20)]
+
+
+def test_aiter_apply_bounded_concurrency():
+    running = []
+    peak = []
+
+    async def track(x):
+        running.append(x)
+        peak.append(len(running))
+        await asyncio.sleep(0.001)
+        running.remove(x)
+        return x
+
+    collect(aiter_apply(track, [(i,) for i in range(50)], 5))
+    assert max(peak) <= 5
+
+
+def test_aiter_apply_raises():
+    with pytest.raises(ValueError):
+        collect(aiter_apply(fail_on_three, [(i,) for i in range(6)], 2))
+
+
+def test_aiter_apply_error_callback():
+    errors = []
+    results = collect(
+        aiter_apply(
+            fail_on_three, [(i,) for i in range(6)], 2, error_callback=errors.append
+        )
+    )
+    assert results == [(i, i) for i in [0, 1, 2, 4, 5]]
+    assert len(errors) == 1
+
+
+def test_aiter_apply_pulls_args_off_the_loop():
+    threads = []
+
+    def args():
+        for i in range(3):
+            threads.append(threading.current_thread())
+            yield (i,)
+
+    assert collect(aiter_apply(square, args(), 2)) == [(0, 0), (1, 1), (2, 4)]
+    assert threading.current_thread() not in threads
+
+
+class FakeAsyncResult:
+    def __init__(self, values):
+        self._values = values
+
+    async def values(self):
+        return self._values
+
+
+class FakeAsyncTx:
+    def __init__(self, queries):
+        self.queries = queries
+
+    async def run(self, query, **data):
+        await asyncio.sleep(0)
+        if query == "FAIL":
+            raise ValueError(query)
+        self.queries.append(query)
+        return FakeAsyncResult([[query, data]])
+
+
+class FakeAsyncSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def execute_write(self, transaction, **data):
+        self.driver.transactions.append("write")
+        return await transaction(FakeAsyncTx(self.driver.queries), **data)
+
+    async def execute_read(self, transaction, **data):
+        self.driver.transactions.append("read")
+        return await transaction(FakeAsyncTx(self.driver.queries), **data)
+
+
+class FakeAsyncDriver:
+    def __init__(self):
+        self.queries = []
+        self.transactions = []
+        self.closed = False
+
+    def session(self):
+        return FakeAsyncSession(self)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_async_driver(monkeypatch):
+    driver = FakeAsyncDriver()
+    monkeypatch.setattr(AsyncGraphDatabase, "driver", lambda uri, auth: driver)
+    return driver
+
+
+def test_async_driver(fake_async_driver):
+    etl = AsyncAquariumETLDriver("bolt://fake-async:7687", "neo4j", "password")
+
+    async def run():
+        written = await etl.write("CREATE (n {x: $x})", {"x": 1})
+        read = await etl.read(Payload("MATCH (n) RETURN n", {}))
+        many = await etl.write_many([("CREATE (a)", {}), ("CREATE (b)", {})])
+        await etl.close()
+        return written, read, many
+
+    written, read, many = asyncio.get_event_loop().run_until_complete(run())
+    assert written == [["CREATE (n {x: $x})", {"x": 1}]]
+    assert read == [["MATCH (n) RETURN n", {}]]
+    assert many == [[["CREATE (a)", {}]], [["CREATE (b)", {}]]]
+    assert fake_async_driver.transactions == ["write", "read", "write"]
+    assert fake_async_driver.closed
+
+
+def test_async_pool(fake_async_driver, monkeypatch):
+    monkeypatch.setattr(GraphDatabase, "driver", lambda uri, auth: None)
+    binder = AquariumETLDriver(
+        "bolt://fake-async:7687", "neo4j", "password", setup=False
+    )
+    payloads = [Payload("CREATE (n {i: $i})", {"i": i}) for i in range(10)]
+    with binder.pool(4, mode="async") as pool:
+        assert pool.etl.concurrency == 4
+        results = list(pool.iter_write(payloads))
+        batched = pool.write(payloads, batch_size=3)
+    assert [r[0][1]["i"] for r in results] == list(range(10))
+    assert [r[0][1]["i"] for r in batched] == list(range(10))
+    assert len(fake_async_driver.transactions) == 10 + 4
+    assert fake_async_driver.closed
+
+
+def test_async_pool_dispatches_failed_payloads(fake_async_driver, monkeypatch):
+    monkeypatch.setattr(GraphDatabase, "driver", lambda uri, auth: None)
+    binder = AquariumETLDriver(
+        "bolt://fake-async:7687", "neo4j", "password", setup=False
+    )
+    payloads = [
+        Payload("CREATE (n)", {}),
+        Payload("FAIL", {}),
+        Payload("CREATE (m)", {}),
+    ]
+    errors = []
+    with binder.pool(4, mode="async") as pool:
+        results = pool.write(payloads, batch_size=3, error_callback=errors.append)
+    assert [r[0][0] for r in results] == ["CREATE (n)", "CREATE (m)"]
+    assert [str(e) for e in errors] == ["FAIL"]
+
+
+def test_async_driver_is_imported_lazily():
+    code = (
+        "import sys, aqneodriver\n"
+        "assert 'aqneodriver.async_driver' not in sys.modules\n"
+        "assert aqneodriver.AsyncAquariumETLDriver is not None\n"
+        "assert 'aqneodriver.async_driver' in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
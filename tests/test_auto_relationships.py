@@ -0,0 +1,64 @@
+import pytest
+from omegaconf import OmegaConf
+
+from aqneodriver.structured_queries.cypher import partition_query
+from aqneodriver.structured_queries.cypher._auto_relationships import (
+    get_auto_relationship_queries,
+)
+from aqneodriver.structured_queries.cypher._auto_relationships import independent_groups
+from aqneodriver.structured_queries.cypher._cyp_queries import AutoEdge
+from aqneodriver.structured_queries.cypher._cyp_queries import AutoRelationship
+from aqneodriver.structured_queries.cypher._cyp_queries import AutoStub
+from aqneodriver.tasks._auto_relationships import AutoRelationshipsTask
+
+
+def test_auto_relationship_queries_are_unique():
+    queries = get_auto_relationship_queries()
+    keys = [q.describe() for q in queries]
+    assert len(keys) == len(set(keys))
+    assert all(isinstance(q, AutoRelationship) for q in queries)
+    assert "Sample.sample_type_id = SampleType.id (hasOne)" in keys
+
+
+def test_stub_and_edge_stages_match():
+    def key(q):
+        return q.m1, q.m2, q.ref, tuple(sorted(q.m1_props.items()))
+
+    stubs = get_auto_relationship_queries(AutoStub)
+    edges = get_auto_relationship_queries(AutoEdge)
+    assert len(stubs) == len({key(q) for q in stubs})
+    assert {key(q) for q in stubs} == {key(q) for q in edges}
+    field_type_stubs = [
+        q
+        for q in stubs
+        if (q.m1, q.m2, q.ref) == ("FieldType", "AllowableFieldType", "field_type_id")
+    ]
+    assert len(field_type_stubs) == 1
+
+
+def test_auto_relationship_queries_skip_null_refs():
+    q = AutoEdge.from_string("Sample.sample_type_id = SampleType.id", "hasOne")
+    query = q.payload()[0]
+    assert "WHERE b.sample_type_id IS NOT NULL" in query
+    assert "MERGE (a:SampleType" not in query
+
+    partitioned, label = partition_query(query)
+    assert label == "Sample"
+    assert "b.id >= $partition_lo" in partitioned
+
+
+def test_independent_groups():
+    queries = get_auto_relationship_queries(AutoEdge)
+    groups = independent_groups(queries)
+    assert sorted(q.describe() for g in groups for q in g) == sorted(
+        q.describe() for q in queries
+    )
+    for group in groups:
+        labels = [label for q in group for label in set(q.labels)]
+        assert len(labels) == len(set(labels))
+
+
+def test_auto_relationships_task_unsupported_executor():
+    cfg = OmegaConf.create({"help": False, "task": {"executor": "async"}})
+    with pytest.raises(ValueError):
+        AutoRelationshipsTask().run(cfg)
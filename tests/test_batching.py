@@ -0,0 +1,112 @@
+import pytest
+from neo4j.exceptions import ClientError
+
+from aqneodriver.driver import _write_batch
+from aqneodriver.payload import Payload
+from aqneodriver.payload import payload_nbytes
+from aqneodriver.utils import iter_batches
+
+
+def test_iter_batches_by_size():
+    assert list(iter_batches(range(5), batch_size=2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_iter_batches_unbounded():
+    assert list(iter_batches(range(5))) == [[0, 1, 2, 3, 4]]
+
+
+def test_iter_batches_empty():
+    assert list(iter_batches([], batch_size=2)) == []
+
+
+def test_iter_batches_by_bytes():
+    items = ["aa", "bb", "c", "dddd", "e"]
+    batches = list(iter_batches(items, max_bytes=4))
+    assert batches == [["aa", "bb"], ["c"], ["dddd"], ["e"]]
+
+
+def test_iter_batches_oversized_item_is_own_batch():
+    items = ["a", "bbbbbbbb", "c"]
+    assert list(iter_batches(items, max_bytes=2)) == [["a"], ["bbbbbbbb"], ["c"]]
+
+
+def test_iter_batches_by_size_and_bytes():
+    items = ["a"] * 5
+    assert list(iter_batches(items, batch_size=2, max_bytes=100)) == [
+        ["a", "a"],
+        ["a", "a"],
+        ["a"],
+    ]
+
+
+def test_iter_batches_invalid_size():
+    with pytest.raises(ValueError):
+        list(iter_batches(range(3), batch_size=0))
+
+
+def test_payload_nbytes():
+    payload = Payload("MATCH (n)", {"id": 1})
+    assert payload.nbytes() == payload_nbytes(("MATCH (n)", {"id": 1}))
+    assert payload.nbytes() == len("MATCH (n)") + len('{"id": 1}')
+
+
+class FakeDriver:
+    def __init__(self, bad=None):
+        self.bad = bad
+        self.committed = []
+
+    def write_many(self, queries):
+        if any(q[0] == self.bad for q in queries):
+            raise ValueError(self.bad)
+        self.committed += [q[0] for q in queries]
+        return [q[0] for q in queries]
+
+    def write(self, query):
+        return self.write_many([query])[0]
+
+
+def test_write_batch_single_transaction():
+    etl = FakeDriver()
+    payloads = [("a", {}), ("b", {})]
+    assert _write_batch(etl, payloads) == ["a", "b"]
+    assert etl.committed == ["a", "b"]
+
+
+def test_write_batch_split_on_error():
+    etl = FakeDriver(bad="b")
+    payloads = [("a", {}), ("b", {}), ("c", {})]
+    results = _write_batch(etl, payloads)
+    assert results[0] == "a"
+    assert isinstance(results[1], ValueError)
+    assert results[2] == "c"
+    assert etl.committed == ["a", "c"]
+
+
+def test_write_batch_no_split_on_error():
+    etl = FakeDriver(bad="b")
+    payloads = [("a", {}), ("b", {}), ("c", {})]
+    with pytest.raises(ValueError):
+        _write_batch(etl, payloads, split_on_error=False)
+    assert etl.committed == []
+
+
+def test_iter_write_dispatches_failed_payloads(fake_etl):
+    etl = fake_etl(fail={"RETURN 2"})
+    payloads = [("RETURN {}".format(i), {}) for i in range(5)]
+    errors = []
+    results = []
+    with etl.pool(2, mode="thread") as pool:
+        written = list(
+            pool.iter_write(
+                payloads,
+                batch_size=3,
+                callback=results.append,
+                error_callback=errors.append,
+            )
+        )
+    assert len(written) == len(results) == 4
+    assert len(errors) == 1
+    assert isinstance(errors[0], ClientError)
+
+    with pytest.raises(ClientError):
+        list(etl.pool(2, mode="thread").iter_write(payloads, batch_size=3))
@@ -0,0 +1,25 @@
+def test_clear_in_batches(fake_etl):
+    etl = fake_etl(n_relationships=25, n_nodes=12)
+    graph = etl.driver
+    deleted = []
+    assert etl.clear(batch_size=10, callback=deleted.append) == 37
+    assert graph.n_relationships == graph.n_nodes == 0
+    assert max(graph.batches) == 10
+    assert deleted == [10, 10, 5, 10, 2]
+
+
+def test_clear_relationships_in_batches(fake_etl):
+    etl = fake_etl(n_relationships=25, n_nodes=12)
+    graph = etl.driver
+    assert etl.clear_relationships(batch_size=10) == 25
+    assert graph.n_relationships == 0
+    assert graph.n_nodes == 12
+
+
+def test_recreate_database(fake_etl):
+    assert not fake_etl(n_relationships=25, n_nodes=12).recreate_database()
+
+    etl = fake_etl(n_relationships=25, n_nodes=12, enterprise=True)
+    graph = etl.driver
+    assert etl.recreate_database()
+    assert graph.n_relationships == graph.n_nodes == 0
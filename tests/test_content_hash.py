@@ -0,0 +1,76 @@
+from aqneodriver.structured_queries.aquarium import content_hash
+from aqneodriver.structured_queries.aquarium import ContentHashFilter
+from aqneodriver.structured_queries.aquarium._content_hash import HASH_KEY
+from aqneodriver.structured_queries.aquarium._struct_aq_query import (
+    StructuredAquariumQuery,
+)
+
+
+class Model:
+    """Minimal stand-in for a pydent model."""
+
+    fields = {"sample": None}
+
+    def __init__(self, name, **data):
+        self.name = name
+        self.data = data
+
+    def _get_data(self):
+        return dict(self.data, sample=None)
+
+    def get_server_model_name(self):
+        return self.name
+
+
+def test_content_hash():
+    row = {"id": 1, "name": "foo", "created_at": "2020-01-01"}
+    h = content_hash(row)
+    assert len(h) == 16
+    assert h == content_hash(dict(reversed(list(row.items()))))
+    assert h == content_hash(dict(row, **{HASH_KEY: "anything"}))
+    assert h == content_hash(dict(row, rid=12))
+    assert h != content_hash(dict(row, name="bar"))
+
+
+class FakeGraph:
+    def __init__(self):
+        self.hashes = {}
+        self.reads = []
+
+    def read(self, query, data):
+        self.reads.append(data["ids"])
+        return [[i, self.hashes[i]] for i in data["ids"] if i in self.hashes]
+
+
+def test_content_hash_filter():
+    graph = FakeGraph()
+    rows = [{"id": i, "x": i} for i in range(5)]
+    for row in rows:
+        row[HASH_KEY] = content_hash(row)
+    graph.hashes = {0: rows[0][HASH_KEY], 1: rows[1][HASH_KEY], 2: "stale"}
+
+    row_filter = ContentHashFilter(graph.read, lookup_size=2)
+    changed = row_filter("Item", rows)
+    assert [row["id"] for row in changed] == [2, 3, 4]
+    assert graph.reads == [[0, 1], [2, 3], [4]]
+    assert row_filter.skipped["Item"] == 2
+    assert row_filter.written["Item"] == 3
+    assert row_filter.summary() == "Item: 2 unchanged, 3 written"
+
+
+def test_models_to_payloads_skips_unchanged():
+    models = [Model("Item", id=i, x=i) for i in range(3)] + [Model("Sample", id=1)]
+    payloads = StructuredAquariumQuery.models_to_payloads(models)
+    rows = [row for _, data in payloads for row in data["datalist"]]
+    assert all(row[HASH_KEY] == content_hash(row) for row in rows)
+
+    graph = FakeGraph()
+    graph.hashes = {row["id"]: row[HASH_KEY] for row in rows[:2]}
+    row_filter = ContentHashFilter(graph.read)
+    payloads = StructuredAquariumQuery.models_to_payloads(
+        models, row_filter=row_filter
+    )
+    rows = [row for _, data in payloads for row in data["datalist"]]
+    assert [row["id"] for row in rows] == [2, 1]
+    assert row_filter.skipped == {"Item": 2, "Sample": 0}
+    assert row_filter.written == {"Item": 1, "Sample": 1}
@@ -1,6 +1,111 @@
+from aqneodriver.constraints import index_report
 from aqneodriver.constraints import iter_constraints
+from aqneodriver.constraints import iter_foreign_key_indexes
+from aqneodriver.constraints import iter_named_constraints
+from aqneodriver.constraints import iter_schema
+from aqneodriver.constraints import PropertyIndex
+from aqneodriver.constraints import schema_version
 
 
 def test_iter_constraints():
     for c in iter_constraints():
         print(c)
+
+
+def test_named_constraints_are_unique():
+    names = [name for name, _ in iter_named_constraints()]
+    assert len(names) == len(set(names))
+    for name, constraint in iter_named_constraints():
+        assert name in constraint
+
+
+def test_foreign_key_indexes():
+    indexes = list(iter_foreign_key_indexes())
+    assert len(indexes) == len(set(indexes))
+    assert PropertyIndex("Sample", ("sample_type_id",)) in indexes
+    assert PropertyIndex("Item", ("sample_id",)) in indexes
+    assert PropertyIndex("FieldValue", ("parent_id",)) in indexes
+    assert PropertyIndex("FieldValue", ("parent_class", "parent_id")) in indexes
+    for index in indexes:
+        assert "id" not in index.properties
+        assert index.name in index.statement()
+
+
+def test_index_report():
+    report = index_report()
+    assert set(report) == {index.name for index in iter_foreign_key_indexes()}
+    assert "MATCH (a:Sample)" in report["sample_sample_type_id_index"]
+
+    query = "MATCH (a:Item {sample_id: 1}) RETURN a"
+    report = index_report([query])
+    assert report["item_sample_id_index"] == ["MATCH (a:Item {sample_id: 1}) RETURN a"]
+    assert report["sample_sample_type_id_index"] == []
+
+
+def test_schema_version():
+    statements = [statement for _, statement in iter_schema()]
+    assert schema_version() == schema_version(statements)
+    assert schema_version() == schema_version(reversed(statements))
+    assert schema_version() != schema_version(statements[1:])
+    assert schema_version() != schema_version(iter_constraints())
+
+
+def test_setup_is_versioned(fake_etl):
+    etl = fake_etl("bolt://fake-versioned:7687")
+    graph = etl.driver
+    existing_name = next(iter_named_constraints())[0]
+    graph.constraints.add(existing_name)
+    existing_index = next(iter_foreign_key_indexes()).name
+    graph.indexes.add(existing_index)
+
+    assert etl.setup()
+    assert graph.version == schema_version()
+    assert graph.transactions == 1
+    created = [q for q in graph.queries if q.startswith("CREATE CONSTRAINT")]
+    assert len(created) == len(list(iter_constraints())) - 1
+    created = [q for q in graph.queries if q.startswith("CREATE INDEX")]
+    assert len(created) == len(list(iter_foreign_key_indexes())) - 1
+    assert not any(existing_index in q for q in created)
+    assert any(q.startswith("CALL db.awaitIndexes") for q in graph.queries)
+
+    # same process: no round trips
+    graph.queries.clear()
+    assert not etl.setup()
+    assert graph.queries == []
+
+    # new process (or driver) against an up to date database
+    etl2 = fake_etl("bolt://fake-versioned-2:7687", graph=graph)
+    assert not etl2.setup()
+    assert not any(q.startswith("CREATE") for q in graph.queries)
+
+    # forcing re-checks, but there is nothing to create
+    graph.queries.clear()
+    assert etl2.setup(force=True)
+    assert not any(q.startswith("CREATE") for q in graph.queries)
+
+
+def test_setup_retries_failed_statements(fake_etl):
+    statements = [statement for _, statement in iter_schema()]
+    etl = fake_etl("bolt://fake-failed:7687", fail={statements[0]})
+    graph = etl.driver
+
+    assert not etl.setup()
+    assert graph.version is None
+    assert graph.queries.count(statements[0]) == 2
+    assert all(statement in graph.queries for statement in statements[1:])
+
+    # the failed statement is retried
+    graph.fail.clear()
+    graph.queries.clear()
+    assert etl.setup()
+    assert graph.version == schema_version()
+    assert [q for q in graph.queries if q.startswith("CREATE")] == [statements[0]]
+
+
+def test_setup_records_equivalent_existing_statements(fake_etl):
+    statements = [statement for _, statement in iter_schema()]
+    etl = fake_etl("bolt://fake-equivalent:7687", exists={statements[0]})
+    graph = etl.driver
+
+    assert etl.setup()
+    assert graph.version == schema_version()
@@ -45,3 +45,14 @@ def test_encrypt_dict_decrypt_as_data():
     decrypted_data = Cryptography.decrypt(key, encrypted, literal_eval=True)
     assert isinstance(decrypted_data, dict)
     assert decrypted_data == data
+
+
+def test_process_key_is_cached():
+    key = Cryptography.process_key()
+    assert key == Cryptography.process_key()
+
+    encrypted = Cryptography.encrypt(key, ("uri", "user", "password"))
+    decrypted = Cryptography.decrypt(
+        Cryptography.process_key(), encrypted, literal_eval=True
+    )
+    assert decrypted == ("uri", "user", "password")
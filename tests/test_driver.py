@@ -141,3 +141,28 @@ def test_multiple_create(aq, etl):
 
     print(t2 - t1)
     # print(etl.read("MATCH (n:Item) RETURN n"))
+
+
+def test_stream(etl):
+    n = len(etl.read("MATCH (n:Sample) RETURN n.id"))
+    results = list(etl.stream("MATCH (n:Sample) RETURN n.id", fetch_size=7))
+    assert len(results) == n
+
+
+def test_iter_ids_keyset_pagination(config):
+    etl = AquariumETLDriver(
+        config.neo.uri, config.neo.user, config.neo.password, setup=False
+    )
+    ids = [5, 1, 9, 3, 7, 2, 8]
+    reads = []
+
+    def read(query, data):
+        reads.append(data)
+        after = data.get("after")
+        keys = sorted(i for i in ids if after is None or i > after)
+        return [[i] for i in keys[: data["limit"]]]
+
+    etl.read = read
+    assert list(etl.iter_ids("Sample", batch_size=3)) == [[1, 2, 3], [5, 7, 8], [9]]
+    assert [r.get("after") for r in reads] == [None, 3, 8]
+    assert list(etl.iter_ids("Sample", batch_size=3, limit=4)) == [[1, 2, 3], [5]]
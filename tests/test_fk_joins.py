@@ -0,0 +1,49 @@
+from aqneodriver.structured_queries.aquarium import edges_to_payloads
+from aqneodriver.structured_queries.aquarium import ForeignKeyJoin
+from aqneodriver.structured_queries.aquarium import iter_foreign_key_edges
+
+
+class Model:
+    """Minimal stand in for a pydent model."""
+
+    def __init__(self, name, **data):
+        self.name = name
+        self.data = data
+
+    def get_server_model_name(self):
+        return self.name
+
+    def _get_data(self):
+        return self.data
+
+
+def test_foreign_key_edges():
+    models = [
+        Model("SampleType", id=1),
+        Model("Sample", id=10, sample_type_id=1),
+        Model("Sample", id=11, sample_type_id=1),
+        Model("Sample", id=12, sample_type_id=2),
+        Model("FieldValue", id=100, parent_id=10, parent_class="Sample"),
+        Model("FieldValue", id=101, parent_id=10, parent_class="Operation"),
+    ]
+    edges = set(
+        (k1, k2, edata["type"]) for k1, k2, edata in iter_foreign_key_edges(models)
+    )
+    assert edges == {
+        (("Sample", 10), ("SampleType", 1), "hasMetaType"),
+        (("Sample", 11), ("SampleType", 1), "hasMetaType"),
+        (("Sample", 10), ("FieldValue", 100), "hasFieldValue"),
+    }
+
+
+def test_foreign_key_edges_custom_joins():
+    joins = [ForeignKeyJoin("Item", "sample_id", "memberOf", "Sample", "id")]
+    models = [Model("Sample", id=1, sample_type_id=1), Model("Item", id=5, sample_id=1)]
+    edges = list(iter_foreign_key_edges(models, joins=joins))
+    assert edges == [(("Item", 5), ("Sample", 1), {"type": "memberOf"})]
+
+    payloads = edges_to_payloads(edges)
+    assert len(payloads) == 1
+    query, data = payloads[0]
+    assert "MERGE (a) -[r:memberOf]-> (b)" in query
+    assert data == {"edges": [{"src": 5, "tgt": 1}]}
@@ -0,0 +1,116 @@
+import pytest
+
+from aqneodriver.structured_queries.aquarium import ModelCache
+
+T1 = "2020-01-02T12:00:00.000-08:00"
+T2 = "2020-01-03T12:00:00.000-08:00"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ModelCache(str(tmp_path / "models.db"))
+    yield cache
+    cache.close()
+
+
+def test_model_cache_get_put(cache, load_model):
+    cache.put([load_model("Sample", id=1, name="a", updated_at="1")])
+    cache.put([load_model("Item", id=1)])  # not a cached model class
+    assert len(cache) == 1
+
+    found = cache.get("Sample", [1, 2])
+    assert list(found) == [1]
+    assert found[1]["name"] == "a"
+    assert cache.hits["Sample"] == 1
+    assert cache.misses["Sample"] == 1
+    assert cache.get("Item", [1]) == {}
+
+
+def test_model_cache_persists(tmp_path, load_model):
+    path = str(tmp_path / "models.db")
+    cache = ModelCache(path)
+    cache.put([load_model("SampleType", id=1, name="Primer", updated_at="1")])
+    cache.close()
+
+    cache = ModelCache(path)
+    assert cache.get("SampleType", [1])[1]["name"] == "Primer"
+    cache.close()
+
+
+def test_model_cache_validates_updated_at(cache, load_model):
+    cache.put([load_model("Sample", id=1, name="a", updated_at="1")])
+    cache.put([load_model("Sample", id=1, name="a", updated_at="1")])
+    assert cache.invalidated["Sample"] == 0
+    cache.put([load_model("Sample", id=1, name="b", updated_at="2")])
+    assert cache.invalidated["Sample"] == 1
+    assert cache.get("Sample", [1])[1]["name"] == "b"
+
+
+def test_model_cache_max_age(tmp_path, load_model):
+    cache = ModelCache(str(tmp_path / "models.db"), max_age=-1)
+    cache.put([load_model("Sample", id=1, updated_at="1")])
+    assert cache.get("Sample", [1]) == {}
+    cache.close()
+
+
+def test_model_cache_evicts_least_recently_accessed(tmp_path, load_model):
+    cache = ModelCache(str(tmp_path / "models.db"), max_entries=2)
+    cache.put([load_model("Sample", id=1)])
+    cache.put([load_model("Sample", id=2)])
+    cache.get("Sample", [1])
+    cache.put([load_model("Sample", id=3)])
+    assert len(cache) == 2
+    assert set(cache.get("Sample", [1, 2, 3])) == {1, 3}
+    cache.close()
+
+
+def test_model_cache_get_revalidates(cache, load_model, fake_browser):
+    cache.put([load_model("Sample", id=i, name="a", updated_at=T1) for i in range(3)])
+    cache.put([load_model("Sample", id=3, name="a")])
+    server = {i: load_model("Sample", id=i, name="a", updated_at=T1) for i in range(4)}
+    server[1] = load_model("Sample", id=1, name="b", updated_at=T2)
+    interface = fake_browser(server).interface("Sample")
+
+    found = cache.get("Sample", [0, 1, 2, 3, 4], interface)
+    assert len(interface.criteria) == 1
+    assert {i: data["name"] for i, data in found.items()} == {0: "a", 1: "b", 2: "a"}
+    assert cache.hits["Sample"] == 2
+    assert cache.misses["Sample"] == 3
+    assert cache.invalidated["Sample"] == 1
+    assert cache.get("Sample", [1])[1]["name"] == "b"
+
+
+def test_model_cache_attach(cache, load_model, fake_browser):
+    server = {i: load_model("Sample", id=i, updated_at=T1) for i in range(5)}
+
+    browser = fake_browser(server)
+    with cache.attach(browser):
+        assert [m.id for m in browser.cached_where({"id": [0, 1]}, "Sample")] == [0, 1]
+    assert browser.requested == [0, 1]
+    assert len(cache) == 2
+    assert "cached_where" not in vars(browser)
+
+    browser = fake_browser(server)
+    with cache.attach(browser):
+        models = browser.cached_where({"id": [0, 1, 2]}, "Sample")
+        assert [m.id for m in models] == [0, 1, 2]
+        assert browser.cached_find("Sample", 3).id == 3
+    assert browser.requested == [2, 3]
+    assert cache.hits["Sample"] == 2
+    assert len(cache) == 4
+
+
+def test_model_cache_attach_serves_newer_server_models(cache, load_model, fake_browser):
+    server = {i: load_model("Sample", id=i, name="a", updated_at=T1) for i in range(2)}
+    browser = fake_browser(server)
+    with cache.attach(browser):
+        browser.cached_where({"id": [0, 1]}, "Sample")
+    assert len(cache) == 2
+
+    server[1] = load_model("Sample", id=1, name="b", updated_at=T2)
+    browser = fake_browser(server)
+    with cache.attach(browser):
+        models = browser.cached_where({"id": [0, 1]}, "Sample")
+        assert [m.name for m in models] == ["a", "b"]
+    assert browser.requested == []
+    assert cache.get("Sample", [1])[1]["name"] == "b"
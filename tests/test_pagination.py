@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+from pydent.exceptions import TridentTimeoutError
+
+from aqneodriver.structured_queries.aquarium import fetch_sharded
+from aqneodriver.structured_queries.aquarium import iter_pages
+
+
+class Model:
+    def __init__(self, id):
+        self.id = id
+
+
+class FakeInterface:
+    """Serves `n` models, recording the number of concurrent requests."""
+
+    def __init__(self, n, delay=0.01):
+        self.models = [Model(i) for i in range(n)]
+        self.delay = delay
+        self.offsets = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def where(self, query, methods=None, include=None, opts=None):
+        with self.lock:
+            self.offsets.append(opts["offset"])
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        return self.models[opts["offset"] : opts["offset"] + opts["limit"]]
+
+
+def test_iter_pages():
+    interface = FakeInterface(25)
+    calls = []
+    pages = list(
+        iter_pages(
+            interface,
+            {},
+            page_size=10,
+            max_in_flight=3,
+            page_callback=lambda i, page: calls.append((i, len(page))),
+        )
+    )
+    assert [[m.id for m in page] for page in pages] == [
+        list(range(10)),
+        list(range(10, 20)),
+        list(range(20, 25)),
+    ]
+    assert calls == [(0, 10), (1, 10), (2, 5)]
+    assert interface.max_in_flight == 3
+    # at most max_in_flight - 1 pages are requested past the last page
+    assert sorted(interface.offsets)[:3] == [0, 10, 20]
+    assert len(interface.offsets) <= 5
+
+
+def test_iter_pages_limit():
+    interface = FakeInterface(100)
+    pages = list(iter_pages(interface, {}, page_size=10, opts={"limit": 25}))
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sorted(interface.offsets) == [0, 10, 20]
+
+
+def test_iter_pages_stops_at_empty_page():
+    interface = FakeInterface(20)
+    pages = list(iter_pages(interface, {}, page_size=10, max_in_flight=4))
+    assert [len(page) for page in pages] == [10, 10]
+
+
+class FakeBrowser:
+    def __init__(self, interface):
+        self._interface = interface
+        self.model_cache = {}
+
+    def interface(self, model_class):
+        return self._interface
+
+    def update_cache(self, models, recursive=True):
+        cached = self.model_cache.setdefault("Model", {})
+        for m in models:
+            cached.setdefault(m.id, m)
+        return {"Model": [cached[m.id] for m in models]}
+
+
+class FakeItemInterface:
+    """Serves items of samples, failing the first request of some shards."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def where(self, query, methods=None, include=None, opts=None):
+        with self.lock:
+            self.queries.append(list(query["sample_id"]))
+            if query["sample_id"][0] in self.fail:
+                self.fail.remove(query["sample_id"][0])
+                raise TridentTimeoutError("timeout")
+        items = [Model(i) for i in query["sample_id"]]
+        # the item 0 belongs to every sample
+        return items + [Model(0)]
+
+
+def test_fetch_sharded():
+    interface = FakeItemInterface(fail=[3])
+    browser = FakeBrowser(interface)
+    shards = []
+    models = fetch_sharded(
+        browser,
+        "Model",
+        {},
+        "sample_id",
+        [1, 2, 3, 4, 5, 5],
+        shard_size=2,
+        page_size=None,
+        backoff=0,
+        page_callback=lambda i, page: shards.append(i),
+    )
+    assert sorted(m.id for m in models) == [0, 1, 2, 3, 4, 5]
+    assert sorted(interface.queries) == [[1, 2], [3, 4], [3, 4], [5]]
+    assert shards == [0, 1, 2]
+
+
+def test_fetch_sharded_raises_after_retries():
+    interface = FakeItemInterface(fail=[1])
+    with pytest.raises(TridentTimeoutError):
+        fetch_sharded(
+            FakeBrowser(interface),
+            "Model",
+            {},
+            "sample_id",
+            [1],
+            retries=0,
+            page_size=None,
+        )
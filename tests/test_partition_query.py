@@ -0,0 +1,231 @@
+import pytest
+from omegaconf import OmegaConf
+
+from aqneodriver.structured_queries.cypher import get_relationships_queries
+from aqneodriver.structured_queries.cypher import merges_nodes
+from aqneodriver.structured_queries.cypher import partition_query
+from aqneodriver.tasks._update_relationships import _write_partition
+from aqneodriver.tasks._update_relationships import UpdateRelationships
+
+
+def test_partition_query_inserts_where():
+    query, label = partition_query(
+        "MATCH (a:Sample)\nMATCH (b:SampleType)\nWHERE a.sample_type_id = b.id"
+    )
+    assert label == "Sample"
+    assert query.splitlines() == [
+        "MATCH (a:Sample)",
+        "WHERE a.id >= $partition_lo AND a.id <= $partition_hi",
+        "MATCH (b:SampleType)",
+        "WHERE a.sample_type_id = b.id",
+    ]
+
+
+def test_partition_query_combines_where():
+    query, label = partition_query(
+        'MATCH (fv:FieldValue {parent_class: "Sample"}) -[]-> (ft:FieldType)\n'
+        "WHERE ft.ftype <> 'sample'\n"
+        "RETURN fv"
+    )
+    assert label == "FieldValue"
+    assert query.splitlines()[1] == (
+        "WHERE fv.id >= $partition_lo AND fv.id <= $partition_hi"
+        " AND (ft.ftype <> 'sample')"
+    )
+
+
+def test_partition_query_without_match():
+    assert partition_query("//MATCH (a:Sample)\n//RETURN a") is None
+
+
+def test_partition_relationships_queries():
+    for query in get_relationships_queries():
+        partitioned = partition_query(query)
+        if partitioned is not None:
+            assert partitioned[0].count("$partition_lo") == 1
+
+
+def test_write_partition_records_checkpoint_in_same_transaction():
+    class FakeDriver:
+        def __init__(self):
+            self.transactions = []
+
+        def write_many(self, queries):
+            self.transactions.append(queries)
+
+    etl = FakeDriver()
+    checkpoint = {"run": "default", "query": "abc"}
+    assert _write_partition(etl, "MATCH (a:Sample)", 1, 10, checkpoint) == (1, 10)
+    assert len(etl.transactions) == 1
+    (query, data), (checkpoint_query, checkpoint_data) = etl.transactions[0]
+    assert data == {"partition_lo": 1, "partition_hi": 10}
+    assert "_AqneodriverCheckpoint" in checkpoint_query
+    assert checkpoint_data == {"run": "default", "query": "abc", "lo": 1, "hi": 10}
+
+
+def test_merges_nodes():
+    assert merges_nodes("MATCH (a:Sample)\nMERGE (p:Property {name: a.name})")
+    assert merges_nodes("MATCH (op:Operation)\nMERGE (p:Job { id: op.job_id })")
+    assert not merges_nodes(
+        "MATCH (a:Item)\nMATCH (b:Sample)\nMERGE (a) -[r:memberOf]-> (b)"
+    )
+    assert not merges_nodes(
+        "MATCH (a:Sample)\n//MERGE (p:Property)\nMERGE (a) -[r:x]-> (a)"
+    )
+
+
+class FakePool:
+    def __init__(self):
+        self.queries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def __call__(self, func, args, callback=None):
+        for arg in args:
+            self.queries.append(arg[0])
+            callback(arg[1:3])
+
+
+class FakeETL:
+    def __init__(self):
+        self.pool_ = FakePool()
+        self.transactions = []
+
+    def pool(self, n, mode="process"):
+        return self.pool_
+
+    def iter_ids(self, label, batch_size):
+        yield [1, 2]
+        yield [3]
+
+    def read(self, query, data):
+        return []
+
+    def write(self, query, data):
+        pass
+
+    def write_many(self, queries):
+        self.transactions.append(queries)
+
+
+def test_partitions_merging_nodes_are_not_dispatched_to_the_pool():
+    etl = FakeETL()
+    cfg = OmegaConf.create(
+        {
+            "task": {
+                "run_id": "default",
+                "n_jobs": 2,
+                "restart": False,
+                "partition_size": 2,
+                "executor": "thread",
+            }
+        }
+    )
+    UpdateRelationships()._run_partitioned(etl, cfg)
+
+    property_queries = [
+        q for q in get_relationships_queries() if "MERGE (prop:Property" in q
+    ]
+    assert len(property_queries) == 1
+    property_query = partition_query(property_queries[0])[0]
+    assert etl.pool_.queries
+    assert not any(merges_nodes(q) for q in etl.pool_.queries)
+    serial = [t[0][0] for t in etl.transactions]
+    assert serial.count(property_query) == 2
+    assert all(merges_nodes(q) for q in serial)
+
+
+class CheckpointETL(FakeETL):
+    """Fake driver that stores the checkpoints and runs the pooled
+    partitions, failing the `fail_at`-th partition."""
+
+    def __init__(self, ids, fail_at=None):
+        super().__init__()
+        self.ids = ids
+        self.fail_at = fail_at
+        self.checkpoints = {}
+        self.pool_ = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def __call__(self, func, args, callback=None):
+        for arg in args:
+            callback(func(self, *arg))
+
+    def iter_ids(self, label, batch_size):
+        yield from self.ids
+
+    def read(self, query, data):
+        return sorted(
+            (lo, hi, completed)
+            for (q, lo, hi), completed in self.checkpoints.items()
+            if q == data["query"]
+        )
+
+    def write(self, query, data):
+        if "DELETE" in query:
+            self.checkpoints.clear()
+        for lo, hi in data.get("partitions", []):
+            self.checkpoints.setdefault((data["query"], lo, hi), False)
+
+    def write_many(self, queries):
+        if len(self.transactions) + 1 == self.fail_at:
+            raise RuntimeError("connection lost")
+        self.transactions.append(queries)
+        checkpoint = queries[1][1]
+        self.checkpoints[
+            (checkpoint["query"], checkpoint["lo"], checkpoint["hi"])
+        ] = True
+
+
+def test_resumed_run_reuses_the_stored_partitions():
+    cfg = OmegaConf.create(
+        {
+            "task": {
+                "run_id": "default",
+                "n_jobs": 2,
+                "restart": False,
+                "partition_size": 2,
+                "executor": "thread",
+            }
+        }
+    )
+    etl = CheckpointETL([[1, 2], [3]], fail_at=2)
+    with pytest.raises(RuntimeError):
+        UpdateRelationships()._run_partitioned(etl, cfg)
+    first = etl.transactions[0][0][0]
+
+    # nodes were added between the runs
+    etl.ids = [[1, 2, 3, 4]]
+    etl.fail_at = None
+    etl.transactions = []
+    UpdateRelationships()._run_partitioned(etl, cfg)
+
+    ranges = [t[0][1] for t in etl.transactions if t[0][0] == first]
+    assert ranges == [{"partition_lo": 3, "partition_hi": 3}]
+    assert etl.transactions[-1][0][1] == {"partition_lo": 1, "partition_hi": 4}
+    assert not etl.checkpoints
+
+
+def test_unsupported_executor():
+    cfg = OmegaConf.create(
+        {
+            "task": {
+                "run_id": "default",
+                "n_jobs": 2,
+                "restart": False,
+                "partition_size": 2,
+                "executor": "async",
+            }
+        }
+    )
+    with pytest.raises(ValueError):
+        UpdateRelationships()._run_partitioned(FakeETL(), cfg)
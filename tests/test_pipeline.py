@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from aqneodriver.utils.pipeline import Pipeline
+
+
+def test_pipeline():
+    with Pipeline(maxsize=2) as pipeline:
+        items = pipeline.source("fetch", range(10))
+        outputs = pipeline.flat_map("transform", lambda x: [x, -x], items, n_workers=3)
+        results = list(pipeline.sink("write", outputs))
+    assert sorted(results) == sorted(list(range(10)) + [-x for x in range(10)])
+    fetch, transform, write = pipeline.stages
+    assert (fetch.items, transform.items, write.items) == (10, 20, 20)
+    assert transform.n_workers == 3
+    assert "transform (x3): 20 items" in pipeline.summary()
+
+
+def test_pipeline_single_worker_preserves_order():
+    with Pipeline(maxsize=1) as pipeline:
+        items = pipeline.source("fetch", range(20))
+        outputs = pipeline.flat_map("transform", lambda x: [x], items)
+        assert list(pipeline.sink("write", outputs)) == list(range(20))
+
+
+def test_pipeline_backpressure():
+    pulled = []
+
+    def produce():
+        for i in range(100):
+            pulled.append(i)
+            yield i
+
+    with Pipeline(maxsize=2) as pipeline:
+        items = pipeline.sink("write", pipeline.source("fetch", produce()))
+        assert next(items) == 0
+        time.sleep(0.1)
+        # the consumed item, the queue and the item waiting to be put
+        assert len(pulled) <= 4
+    assert pipeline.stages[0].blocked > 0
+
+
+def test_pipeline_overlaps_stages():
+    def fetch():
+        for i in range(4):
+            time.sleep(0.05)
+            yield i
+
+    def write(items):
+        for i in items:
+            time.sleep(0.05)
+            yield i
+
+    t0 = time.time()
+    with Pipeline() as pipeline:
+        list(pipeline.sink("write", write(pipeline.source("fetch", fetch()))))
+    # sequentially, this would take 0.4s
+    assert time.time() - t0 < 0.35
+
+
+def test_pipeline_raises_stage_errors():
+    def transform(x):
+        if x == 3:
+            raise ValueError("bad item")
+        return [x]
+
+    with Pipeline() as pipeline:
+        outputs = pipeline.flat_map(
+            "transform", transform, pipeline.source("fetch", range(100))
+        )
+        with pytest.raises(ValueError):
+            list(pipeline.sink("write", outputs))
+    assert not any(
+        t.is_alive() for t in threading.enumerate() if t.name.startswith("fetch")
+    )
+
+
+def test_pipeline_stops_generators():
+    produced = []
+    closed = []
+
+    def expand(x):
+        try:
+            for i in range(1000):
+                produced.append(i)
+                yield i
+        finally:
+            closed.append(x)
+
+    with Pipeline(maxsize=1) as pipeline:
+        outputs = pipeline.flat_map("expand", expand, pipeline.source("fetch", [0]))
+        assert next(pipeline.sink("write", outputs)) == 0
+    assert closed == [0]
+    assert len(produced) < 10
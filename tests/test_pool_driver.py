@@ -1,3 +1,5 @@
+import os
+
 from pydent import AqSession
 
 from aqneodriver.driver import AquariumETLDriver
@@ -9,3 +11,43 @@ def test_pooled(aq: AqSession, etl: AquariumETLDriver):
     models = aq.Sample.last(10)
     node_payloads = aq_samples_to_cypher(aq, models)
     etl.pool(12).write(node_payloads)
+
+
+def test_persistent_pool_reuses_worker_drivers(config):
+    """Each worker should open exactly one driver and keep it across calls."""
+    etl = AquariumETLDriver(
+        config.neo.uri, config.neo.user, config.neo.password, setup=False
+    )
+
+    def whoami(driver: AquariumETLDriver, _):
+        return os.getpid(), id(driver)
+
+    with etl.pool(2) as pool:
+        results1 = pool(whoami, [(i,) for i in range(20)])
+        results2 = pool(whoami, [(i,) for i in range(20)])
+    assert not pool.is_open
+
+    workers = set(results1 + results2)
+    pids = {pid for pid, _ in workers}
+    assert len(pids) <= 2
+    assert os.getpid() not in pids
+    assert len(workers) == len(pids)
+
+
+def test_thread_pool_shares_driver(config):
+    """Threads should share the binder's driver and need no serialization."""
+    etl = AquariumETLDriver(
+        config.neo.uri, config.neo.user, config.neo.password, setup=False
+    )
+    seen = []
+
+    # a closure over a local list cannot be pickled or sent to a process
+    def whoami(driver: AquariumETLDriver, i):
+        seen.append(i)
+        return os.getpid(), id(driver.driver)
+
+    with etl.pool(4, mode="thread") as pool:
+        results = pool(whoami, [(i,) for i in range(20)], chunksize=3)
+    assert not pool.is_open
+    assert set(results) == {(os.getpid(), id(etl.driver))}
+    assert sorted(seen) == list(range(20))
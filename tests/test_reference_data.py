@@ -0,0 +1,71 @@
+from aqneodriver.structured_queries.aquarium import ReferenceData
+
+
+ROWS = {
+    "SampleType": [{"id": 1, "name": "Primer"}, {"id": 2, "name": "Plasmid"}],
+    "FieldType": [
+        {"id": 10, "name": "Anneal", "parent_class": "SampleType", "parent_id": 1},
+        {"id": 11, "name": "Template", "parent_class": "OperationType", "parent_id": 1},
+        {"id": 12, "name": "Overhang", "parent_class": "SampleType", "parent_id": 1},
+    ],
+    "ObjectType": [{"id": 20, "name": "Primer Aliquot", "sample_type_id": 1}],
+    "OperationType": [{"id": 1, "name": "Make PCR Fragment"}],
+}
+
+
+def test_reference_data_links_models(fake_browser):
+    models = ReferenceData(ROWS).models(fake_browser())
+    primer = models["SampleType"][1]
+    assert [ft.id for ft in primer.field_types] == [10, 12]
+    assert primer.is_deserialized("field_types")
+    assert models["SampleType"][2].field_types == []
+    assert [ft.id for ft in models["OperationType"][1].field_types] == [11]
+
+    assert models["FieldType"][10].sample_type is primer
+    assert models["FieldType"][11].operation_type is models["OperationType"][1]
+    assert not models["FieldType"][11].is_deserialized("sample_type")
+    assert models["ObjectType"][20].sample_type is primer
+
+
+def test_reference_data_inject(fake_browser):
+    browser = fake_browser()
+    models = ReferenceData(ROWS).inject(browser)
+    assert len(models) == 7
+    assert set(browser.model_cache) == set(ROWS)
+    assert browser.model_cache["FieldType"][10].name == "Anneal"
+
+
+class FakeInterface:
+    def __init__(self, load, name, rows):
+        self.load = load
+        self.name = name
+        self.rows = rows
+
+    def all(self):
+        return self.load(self.name, self.rows)
+
+
+class FakeSession:
+    def __init__(self, load):
+        self.load = load
+        self.requests = 0
+
+    def __getattr__(self, name):
+        self.requests += 1
+        return FakeInterface(self.load, name, ROWS[name])
+
+
+def test_reference_data_snapshot(tmp_path, load_model):
+    path = str(tmp_path / "types.json")
+    aq = FakeSession(load_model)
+    reference_data = ReferenceData.load_or_fetch(aq, path)
+    assert aq.requests == 4
+    assert len(reference_data) == 7
+    assert "rid" not in reference_data.rows["SampleType"][0]
+
+    loaded = ReferenceData.load_or_fetch(aq, path)
+    assert aq.requests == 4
+    assert loaded.rows == reference_data.rows
+
+    assert ReferenceData.load(path, max_age=-1) is None
+    assert ReferenceData.load(str(tmp_path / "missing.json")) is None
@@ -0,0 +1,116 @@
+import sys
+from contextlib import contextmanager
+
+from aqneodriver.structured_queries.aquarium._relationship_network import (
+    iter_relationships,
+)
+from aqneodriver.structured_queries.aquarium._relationship_network import (
+    relationship_network,
+)
+
+
+class Node:
+    def __init__(self, i):
+        self.i = i
+
+
+class FakeBrowser:
+    """Browser stand in for synthetic graphs of :class:`Node`."""
+
+    def __init__(self, adjacency):
+        self.adjacency = adjacency
+        self.nodes = {}
+
+    def node(self, i):
+        return self.nodes.setdefault(i, Node(i))
+
+    @contextmanager
+    def session(self, **kwargs):
+        yield self
+
+
+def make_get_models(browser):
+    def get_models(_, model):
+        for j in browser.adjacency.get(model.i, []):
+            yield browser.node(j), {"type": "next"}
+
+    return get_models
+
+
+def key_func(model):
+    return ("Node", model.i), {"model": model}
+
+
+def network(adjacency, seeds=(0,), **kwargs):
+    browser = FakeBrowser(adjacency)
+    return relationship_network(
+        browser,
+        [browser.node(i) for i in seeds],
+        get_models=make_get_models(browser),
+        key_func=key_func,
+        **kwargs
+    )
+
+
+def test_long_lineage_does_not_recurse():
+    n = sys.getrecursionlimit() * 2
+    g = network({i: [i + 1] for i in range(n - 1)})
+    assert g.number_of_nodes() == n
+    assert g.number_of_edges() == n - 1
+    assert g.has_edge(("Node", 1), ("Node", 0))
+
+
+def test_cycles_and_shared_nodes_visited_once():
+    adjacency = {0: [1, 2], 1: [3], 2: [3], 3: [0]}
+    new_nodes = []
+    g = network(
+        adjacency, new_node_callback=lambda k, d: new_nodes.append(k), reverse=True
+    )
+    assert sorted(new_nodes) == [("Node", i) for i in range(4)]
+    assert g.number_of_edges() == 5
+    assert g.has_edge(("Node", 0), ("Node", 1))
+
+
+def test_max_depth():
+    g = network({i: [i + 1] for i in range(10)}, max_depth=3)
+    assert sorted(g.nodes) == [("Node", i) for i in range(4)]
+
+
+def test_max_frontier():
+    adjacency = {0: list(range(1, 11)), **{i: [100 + i] for i in range(1, 11)}}
+    cached = []
+    g = network(
+        adjacency,
+        cache_func=lambda _, models: cached.append(len(models)),
+        max_frontier=4,
+    )
+    assert g.number_of_nodes() == 21
+    assert max(cached) == 4
+    assert sum(cached) == 21
+
+
+def test_iter_relationships_yields_levels_lazily():
+    adjacency = {0: [1, 2], 1: [3], 2: [3], 3: [0]}
+    browser = FakeBrowser(adjacency)
+    fetched = []
+
+    def get_models(b, model):
+        fetched.append(model.i)
+        yield from make_get_models(browser)(b, model)
+
+    levels = iter_relationships(
+        browser, [browser.node(0)], get_models=get_models, key_func=key_func
+    )
+    level = next(levels)
+    assert level.depth == 0
+    assert [k for k, _, _ in level.nodes] == [("Node", 0)]
+    assert fetched == []
+
+    level = next(levels)
+    assert level.depth == 1
+    assert sorted(k for k, _, _ in level.nodes) == [("Node", 1), ("Node", 2)]
+    assert fetched == [0]
+
+    rest = list(levels)
+    assert [k for lvl in rest for k, _, _ in lvl.nodes] == [("Node", 3)]
+    assert sum(len(lvl.edges) for lvl in rest) == 3
@@ -0,0 +1,86 @@
+import pytest
+
+from aqneodriver.tasks._update_samples import UpdateSampleDatabase
+from aqneodriver.tasks._watermarks import max_watermark
+from aqneodriver.tasks._watermarks import read_watermark
+from aqneodriver.tasks._watermarks import Watermark
+from aqneodriver.tasks._watermarks import write_watermark
+
+
+class Model:
+    def __init__(self, id, updated_at=None):
+        self.id = id
+        self.updated_at = updated_at
+
+
+def test_max_watermark():
+    models = [
+        Model(1, "2020-01-01T12:00:00.000-08:00"),
+        Model(3, "2020-01-02T12:00:00.000-08:00"),
+        Model(2, "2020-01-02T12:00:00.000-08:00"),
+        Model(4),
+    ]
+    assert max_watermark(models) == Watermark("2020-01-02T12:00:00.000-08:00", 3)
+    assert max_watermark([]) is None
+
+    current = Watermark("2020-02-01T12:00:00.000-08:00", 1)
+    assert max_watermark(models, current) == current
+
+
+def test_max_watermark_compares_instants():
+    # 01:30 PDT is before 01:10 PST
+    models = [
+        Model(1, "2020-11-01T01:30:00.000-07:00"),
+        Model(2, "2020-11-01T01:10:00.000-08:00"),
+    ]
+    assert max_watermark(models).id == 2
+
+
+def test_watermark_criteria():
+    criteria = Watermark("2020-01-02T12:00:00.000-08:00", 3).criteria()
+    assert criteria == (
+        "updated_at > '2020-01-02 20:00:00' OR "
+        "(updated_at = '2020-01-02 20:00:00' AND id > 3)"
+    )
+    criteria = Watermark("2020-01-02T23:30:00.250+05:30", 3).criteria()
+    assert criteria.startswith("updated_at > '2020-01-02 18:00:00.250000' OR")
+    assert "'2020-01-02 18:00:00' " in Watermark("2020-01-02T18:00:00Z", 3).criteria()
+    with pytest.raises(ValueError):
+        Watermark("2020'", 3).criteria()
+
+
+class FakeETL:
+    def __init__(self):
+        self.watermarks = {}
+
+    def read(self, query, data):
+        key = (data["model"], data["name"])
+        if key in self.watermarks:
+            return [list(self.watermarks[key])]
+        return []
+
+    def write(self, query, data):
+        key = (data["model"], data["name"])
+        self.watermarks[key] = (data["updated_at"], data["id"])
+
+
+def test_read_write_watermark():
+    etl = FakeETL()
+    assert read_watermark(etl, "Sample", "update_samples") is None
+    watermark = Watermark("2020-01-02T12:00:00.000-08:00", 3)
+    write_watermark(etl, "Sample", "update_samples", watermark)
+    assert read_watermark(etl, "Sample", "update_samples") == watermark
+    assert read_watermark(etl, "Item", "update_samples") is None
+
+
+def test_failed_writes_do_not_advance_the_watermark():
+    etl = FakeETL()
+    watermark = Watermark("2020-01-02T12:00:00.000-08:00", 3)
+    new_watermark = Watermark("2020-01-03T12:00:00.000-08:00", 4)
+    UpdateSampleDatabase._update_watermark(
+        etl, "update_samples", None, watermark, n_errors=0
+    )
+    UpdateSampleDatabase._update_watermark(
+        etl, "update_samples", watermark, new_watermark, n_errors=2
+    )
+    assert read_watermark(etl, "Sample", "update_samples") == watermark